@@ -0,0 +1,319 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则匹配基准测试
+离线重放合成的进程名/路径语料，测量不同匹配策略的单次查找开销、延迟分位数和内存占用，
+结果写成JSON，便于在增加规则后对比是否退化。
+"""
+
+import argparse
+import atexit
+import gc
+import hashlib
+import json
+import os
+import platform
+import random
+import re
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_binary import CompiledRuleSet, compile_rule_set
+from rules.rule_compiler import CompiledRuleMatcher, RuleMatcher, load_rules
+
+Query = Tuple[Optional[str], Optional[str]]
+
+# 常见的非游戏进程，作为未命中样本
+SYSTEM_PROCESSES = [
+    'explorer.exe', 'svchost.exe', 'chrome.exe', 'msedge.exe', 'firefox.exe', 'System',
+    'RuntimeBroker.exe', 'SearchHost.exe', 'dwm.exe', 'csrss.exe', 'Code.exe', 'WeChat.exe',
+    'QQ.exe', 'Telegram.exe', 'OneDrive.exe', 'python.exe', 'git.exe', 'powershell.exe',
+]
+ANDROID_SYSTEM_PACKAGES = [
+    'com.android.chrome', 'com.google.android.gms', 'com.tencent.mm', 'com.android.systemui',
+    'com.eg.android.AlipayGphone', 'com.ss.android.ugc.aweme', 'com.google.android.youtube',
+    'org.telegram.messenger', 'com.android.settings', 'com.whatsapp', 'com.spotify.music',
+]
+PATH_ROOTS = [
+    'C:\\Program Files', 'C:\\Program Files (x86)', 'D:\\Games', 'E:\\SteamLibrary',
+    'C:\\Users\\player\\AppData\\Local', 'C:\\Windows\\System32',
+]
+PATH_DIRS = [
+    'Steam\\steamapps\\common', 'Epic Games', 'Riot Games', 'Battle.net', 'WeGameApps',
+    'Microsoft\\Edge\\Application', 'Google\\Chrome\\Application', 'Tencent\\QQ\\Bin',
+]
+# 只查 PROCESS-NAME 的精确策略结果应完全一致；完整规则匹配的命中等于精确命中或正则命中
+EXACT_NAME_STRATEGIES = ('linear_scan', 'hash_set', 'binary_mmap')
+FULL_RULE_STRATEGIES = ('rule_by_rule', 'compiled_automaton')
+
+
+def load_process_names(yaml_path: str) -> List[str]:
+    """与扫描器相同的方式读取 `- PROCESS-NAME,` 行"""
+    names = []
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip().startswith('- PROCESS-NAME,'):
+                names.append(line.split(',')[1].split('#')[0].strip())
+    return names
+
+
+def _near_miss(rng: random.Random, name: str) -> str:
+    """生成与规则只差一点的名字"""
+    choice = rng.randrange(4)
+    if choice == 0:
+        return name.swapcase()
+    if choice == 1 and len(name) > 1:
+        pos = rng.randrange(len(name))
+        return name[:pos] + name[pos + 1:]
+    if choice == 2:
+        stem, dot, ext = name.rpartition('.')
+        return f'{stem}_x64.{ext}' if dot else name + '_x64'
+    return 'my' + name
+
+
+def _path_for(rng: random.Random, name: str, long_path: bool = False) -> str:
+    parts = [rng.choice(PATH_ROOTS), rng.choice(PATH_DIRS)]
+    if long_path:
+        parts.extend(f'sub{rng.randrange(1000)}_{"x" * rng.randrange(4, 24)}' for _ in range(rng.randrange(8, 20)))
+    else:
+        parts.append(f'Game{rng.randrange(100)}')
+    parts.append(name)
+    return '\\'.join(parts)
+
+
+def build_corpus(names: List[str], windows: bool, size: int, seed: int, pool_size: int = 20000) -> Tuple[List[Query], Dict[str, int]]:
+    """
+    生成语料：命中、近似未命中、长路径和普通未命中四类按比例混合。
+    先生成有限的样本池再按随机顺序重放到 size 条，避免一百万条独立字符串占用过多内存。
+    """
+    rng = random.Random(seed)
+    misses = SYSTEM_PROCESSES if windows else ANDROID_SYSTEM_PACKAGES
+    kinds = [('hit', 20), ('near_miss', 30), ('long_path', 10), ('miss', 40)]
+    pool: List[Query] = []
+    pool_kinds: List[str] = []
+    for _ in range(pool_size):
+        kind = rng.choices([k for k, _ in kinds], weights=[w for _, w in kinds])[0]
+        if kind == 'hit':
+            name = rng.choice(names)
+        elif kind == 'near_miss':
+            name = _near_miss(rng, rng.choice(names))
+        elif kind == 'long_path':
+            name = rng.choice(names + misses)
+        else:
+            name = rng.choice(misses)
+        path = _path_for(rng, name, kind == 'long_path') if windows else None
+        pool.append((name, path))
+        pool_kinds.append(kind)
+
+    corpus = [pool[rng.randrange(pool_size)] for _ in range(size)]
+    mix = {kind: pool_kinds.count(kind) for kind, _ in kinds}
+    return corpus, mix
+
+
+def make_strategies(yaml_path: str, windows: bool) -> Dict[str, Callable[[], Callable[[Optional[str], Optional[str]], object]]]:
+    """返回 策略名 -> 构建函数，构建函数返回单次查找的可调用对象"""
+    names = load_process_names(yaml_path)
+    rules = load_rules(yaml_path)
+    flags = re.IGNORECASE if windows else 0
+    # Windows 规则不区分大小写，每种策略的键和查询都折叠大小写
+    fold = str.casefold if windows else str
+    path_patterns = [rule.value for rule in rules if rule.rule_type == 'PROCESS-PATH-REGEX']
+    name_patterns = [rule.value for rule in rules if rule.rule_type == 'PROCESS-NAME-REGEX']
+
+    def noop():
+        return lambda name, path: None
+
+    def linear_scan():
+        entries = [fold(entry) for entry in names]
+
+        def lookup(name, path):
+            name = fold(name)
+            for entry in entries:
+                if entry == name:
+                    return entry
+            return None
+        return lookup
+
+    def hash_set():
+        entries = frozenset(fold(entry) for entry in names)
+        return lambda name, path: fold(name) in entries
+
+    def regex_list():
+        path_regexes = [re.compile(p, flags) for p in path_patterns]
+        name_regexes = [re.compile(p, flags) for p in name_patterns]
+
+        def lookup(name, path):
+            for regex in name_regexes:
+                if regex.search(name):
+                    return regex
+            if path is not None:
+                for regex in path_regexes:
+                    if regex.search(path):
+                        return regex
+            return None
+        return lookup
+
+    def rule_by_rule():
+        return RuleMatcher(rules, ignore_case=windows).match
+
+    def compiled_automaton():
+        return CompiledRuleMatcher(rules, ignore_case=windows).match
+
+    def binary_mmap():
+        fd, bin_path = tempfile.mkstemp(suffix='.bin')
+        os.close(fd)
+        compile_rule_set([(yaml_path, windows)], bin_path)
+        rule_set = CompiledRuleSet(bin_path)
+
+        def cleanup():
+            rule_set.close()
+            os.remove(bin_path)
+        atexit.register(cleanup)
+        return lambda name, path: name in rule_set
+
+    return {
+        'noop_baseline': noop,
+        'linear_scan': linear_scan,
+        'hash_set': hash_set,
+        'binary_mmap': binary_mmap,
+        'regex_list': regex_list,
+        'rule_by_rule': rule_by_rule,
+        'compiled_automaton': compiled_automaton,
+    }
+
+
+def verify_strategies(strategies: Dict[str, Callable], corpus: List[Query]) -> int:
+    """
+    在去重后的查询上比较各策略的命中结果，不一致时抛出 AssertionError，返回比较的查询数
+    """
+    queries = sorted(set(corpus), key=lambda q: (q[0] or '', q[1] or ''))
+    hits = {}
+    for strategy, build in strategies.items():
+        if strategy != 'noop_baseline':
+            lookup = build()
+            hits[strategy] = [bool(lookup(name, path)) for name, path in queries]
+
+    def expect(strategy: str, expected: List[bool], description: str):
+        wrong = [query for query, got, want in zip(queries, hits[strategy], expected) if got != want]
+        if wrong:
+            raise AssertionError(f'{strategy} 与{description}不一致的查询 {len(wrong)} 条，例如 {wrong[:3]}')
+
+    exact = hits[EXACT_NAME_STRATEGIES[0]]
+    for strategy in EXACT_NAME_STRATEGIES[1:]:
+        expect(strategy, exact, EXACT_NAME_STRATEGIES[0])
+    full = [e or r for e, r in zip(exact, hits['regex_list'])]
+    for strategy in FULL_RULE_STRATEGIES:
+        expect(strategy, full, '精确匹配或正则命中')
+    return len(queries)
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run_strategy(build: Callable, corpus: List[Query], latency_samples: int) -> Dict[str, float]:
+    """测量构建内存、整体吞吐和单次查找延迟分位数"""
+    gc.collect()
+    tracemalloc.start()
+    lookup = build()
+    memory_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    start = time.perf_counter_ns()
+    for name, path in corpus:
+        lookup(name, path)
+    total_ns = time.perf_counter_ns() - start
+
+    # 单次计时本身有开销，先测出空计时的中位数再扣除
+    clock = time.perf_counter_ns
+    empty = []
+    for _ in range(1000):
+        t0 = clock()
+        empty.append(clock() - t0)
+    overhead = sorted(empty)[len(empty) // 2]
+    latencies = []
+    for name, path in corpus[:latency_samples]:
+        t0 = clock()
+        lookup(name, path)
+        latencies.append(max(clock() - t0 - overhead, 0))
+    latencies.sort()
+
+    return {
+        'ns_per_lookup': round(total_ns / max(len(corpus), 1), 1),
+        'p50_ns': _percentile(latencies, 50),
+        'p99_ns': _percentile(latencies, 99),
+        'memory_bytes': memory_bytes,
+    }
+
+
+def _file_digest(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def run_benchmark(targets: List[Tuple[str, str, bool]], size: int, seed: int, latency_samples: int,
+                  only: Optional[List[str]] = None) -> Dict:
+    results = {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'corpus_size': size,
+        'seed': seed,
+        'rule_sets': {},
+    }
+    for label, yaml_path, windows in targets:
+        names = load_process_names(yaml_path)
+        corpus, mix = build_corpus(names, windows, size, seed)
+        entry = {
+            'file': os.path.relpath(yaml_path, ROOT_DIR),
+            'sha1': _file_digest(yaml_path),
+            'process_names': len(names),
+            'corpus_mix': mix,
+            'strategies': {},
+        }
+        strategies = make_strategies(yaml_path, windows)
+        entry['verified_queries'] = verify_strategies(strategies, corpus)
+        print(f'[{label}] 各策略在 {entry["verified_queries"]} 条不同查询上结果一致')
+        for strategy, build in strategies.items():
+            if only and strategy not in only and strategy != 'noop_baseline':
+                continue
+            stats = run_strategy(build, corpus, latency_samples)
+            entry['strategies'][strategy] = stats
+            print(f'[{label}] {strategy:<20} {stats["ns_per_lookup"]:>10.1f} ns/lookup  '
+                  f'p50 {stats["p50_ns"]:>7} ns  p99 {stats["p99_ns"]:>7} ns  '
+                  f'mem {stats["memory_bytes"] / 1024:.1f} KB')
+        results['rule_sets'][label] = entry
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description='规则匹配基准测试')
+    parser.add_argument('--size', type=int, default=1_000_000, help='重放的查询条数（默认100万）')
+    parser.add_argument('--seed', type=int, default=20240601, help='语料随机种子')
+    parser.add_argument('--latency-samples', type=int, default=100_000, help='逐条计时的样本数')
+    parser.add_argument('--strategy', action='append', help='只运行指定策略，可重复')
+    parser.add_argument('-o', '--output', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'rule_match_results.json'),
+                        help='结果JSON文件')
+    args = parser.parse_args()
+
+    targets = [
+        ('android', os.path.join(ROOT_DIR, 'android.yaml'), False),
+        ('windows', os.path.join(ROOT_DIR, 'windows.yaml'), True),
+    ]
+    results = run_benchmark(targets, args.size, args.seed, args.latency_samples, args.strategy)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f'结果已保存到 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则文件解析基准测试
+生成数MB的合成规则文件，对比 yaml.safe_load 与流式规则解析器的耗时和峰值内存。
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict
+
+import yaml
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_parser import iter_rules, load_rules
+
+CATEGORIES = ['射击类游戏', 'MOBA类游戏', 'RPG类游戏', '休闲益智类游戏', '动作冒险类游戏', '策略类游戏', '其他热门游戏']
+
+
+def write_synthetic_rules(path: str, entries: int, seed: int):
+    """按分类写出 entries 条规则，夹杂正则规则和注释掉的规则"""
+    rng = random.Random(seed)
+    per_section = max(entries // len(CATEGORIES), 1)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('payload:\n')
+        written = 0
+        section = 0
+        while written < entries:
+            f.write(f'\n# {CATEGORIES[section % len(CATEGORIES)]}\n')
+            section += 1
+            for _ in range(min(per_section, entries - written)):
+                roll = rng.random()
+                if roll < 0.02:
+                    f.write(f"- PROCESS-PATH-REGEX,'.*\\\\Vendor{rng.randrange(10**6)}\\\\.*' # 厂商目录\n")
+                elif roll < 0.03:
+                    f.write(f'#- PROCESS-NAME,disabled{written}.exe #已停用\n')
+                else:
+                    f.write(f'- PROCESS-NAME,com.vendor{rng.randrange(5000)}.game{written} #游戏{written}\n')
+                written += 1
+
+
+def measure(func: Callable[[], int]) -> Dict[str, float]:
+    tracemalloc.start()
+    start = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {'seconds': round(elapsed, 4), 'peak_bytes': peak, 'items': count}
+
+
+def run(entries: int, seed: int) -> Dict:
+    fd, path = tempfile.mkstemp(suffix='.yaml')
+    os.close(fd)
+    try:
+        write_synthetic_rules(path, entries, seed)
+
+        def pyyaml():
+            with open(path, 'r', encoding='utf-8') as f:
+                return len(yaml.safe_load(f)['payload'])
+
+        def stream_count():
+            # 只统计，不保留规则对象
+            return sum(1 for _ in iter_rules(path))
+
+        def stream_load():
+            return len(load_rules(path))
+
+        results = {
+            'entries': entries,
+            'file_bytes': os.path.getsize(path),
+            'parsers': {},
+        }
+        for name, func in (('pyyaml_safe_load', pyyaml), ('stream_count', stream_count), ('stream_load', stream_load)):
+            stats = measure(func)
+            results['parsers'][name] = stats
+            print(f'{name:<18} {stats["seconds"]:>8.3f} s  peak {stats["peak_bytes"] / 1024 / 1024:>8.1f} MB  {stats["items"]} 条')
+        return results
+    finally:
+        os.remove(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='对比 PyYAML 与流式规则解析器')
+    parser.add_argument('--entries', type=int, default=100_000, help='合成规则条数（默认10万，约5MB）')
+    parser.add_argument('--seed', type=int, default=20240601)
+    parser.add_argument('-o', '--output', help='结果JSON文件')
+    args = parser.parse_args()
+
+    results = run(args.entries, args.seed)
+    print(f'文件大小: {results["file_bytes"] / 1024 / 1024:.1f} MB')
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print(f'结果已保存到 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
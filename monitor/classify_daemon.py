@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地进程分类服务
+常驻进程只加载一次规则文件，规则文件修改时间变化后自动重新加载；
+通过本机 HTTP（或 Unix 套接字）批量查询进程名/路径，返回命中的规则和所属分类。
+
+    POST /classify  {"platform": "windows", "queries": ["TslGame.exe", {"path": "D:\\\\Games\\\\x.exe"}]}
+    GET  /metrics   吞吐量和延迟统计
+    GET  /health
+"""
+
+import argparse
+import json
+import os
+import re
+import socketserver
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from typing import Dict, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import CompiledRuleMatcher
+from rules.rule_parser import Rule, load_rules
+
+DEFAULT_PORT = 7893
+MAX_BATCH = 10000
+MAX_BODY_BYTES = 4 * 1024 * 1024
+# 延迟样本只保留最近的若干条，用于计算分位数
+LATENCY_WINDOW = 4096
+
+
+class RuleSet:
+    """一个规则文件及其编译后的匹配器，文件修改后重新加载"""
+
+    def __init__(self, path: str, ignore_case: bool, check_interval: float = 1.0):
+        self.path = path
+        self.ignore_case = ignore_case
+        self.check_interval = check_interval
+        self.matcher: Optional[CompiledRuleMatcher] = None
+        self.rule_count = 0
+        self.loaded_at = 0.0
+        self.reloads = 0
+        self.failed_reloads = 0
+        self._mtime_ns = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.reload_if_changed(force=True)
+
+    def reload_if_changed(self, force: bool = False) -> bool:
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            if not force and now - self._checked_at < self.check_interval:
+                return False
+            self._checked_at = now
+            try:
+                mtime_ns = os.stat(self.path).st_mtime_ns
+            except OSError as e:
+                if self.matcher is None:
+                    raise
+                print(f'无法读取 {self.path}，继续使用已加载的规则: {e}')
+                return False
+            if mtime_ns == self._mtime_ns:
+                return False
+            try:
+                rules = load_rules(self.path)
+                matcher = CompiledRuleMatcher(rules, ignore_case=self.ignore_case)
+            except (OSError, UnicodeDecodeError, re.error) as e:
+                if self.matcher is None:
+                    raise
+                # 记下这次的修改时间，文件再次修改前不再重复编译同一份坏规则
+                self._mtime_ns = mtime_ns
+                self.failed_reloads += 1
+                print(f'重新加载 {self.path} 失败，继续使用已加载的规则: {e}')
+                return False
+            # 直接替换引用，正在处理的请求继续使用旧匹配器
+            self.matcher = matcher
+            self.rule_count = len(rules)
+            self._mtime_ns = mtime_ns
+            self.loaded_at = time.time()
+            if not force:
+                self.reloads += 1
+                print(f'已重新加载 {self.path}（{len(rules)} 条规则）')
+            return True
+
+
+class Metrics:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.requests = 0
+        self.queries = 0
+        self.hits = 0
+        self.errors = 0
+        self.busy_seconds = 0.0
+        self._latencies: List[float] = []
+        self._cursor = 0
+        self._lock = threading.Lock()
+
+    def record(self, queries: int, hits: int, seconds: float):
+        with self._lock:
+            self.requests += 1
+            self.queries += queries
+            self.hits += hits
+            self.busy_seconds += seconds
+            if len(self._latencies) < LATENCY_WINDOW:
+                self._latencies.append(seconds)
+            else:
+                self._latencies[self._cursor] = seconds
+                self._cursor = (self._cursor + 1) % LATENCY_WINDOW
+
+    def record_error(self):
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            uptime = time.monotonic() - self.started
+
+            def percentile(pct: float) -> Optional[float]:
+                if not latencies:
+                    return None
+                index = min(len(latencies) - 1, int(pct * len(latencies)))
+                return round(latencies[index] * 1e6, 1)
+
+            return {
+                'uptime_seconds': round(uptime, 1),
+                'requests': self.requests,
+                'queries': self.queries,
+                'hits': self.hits,
+                'errors': self.errors,
+                'queries_per_second': round(self.queries / uptime, 1) if uptime else 0.0,
+                # 只计处理时间，不含网络和排队
+                'us_per_query': round(self.busy_seconds / self.queries * 1e6, 2) if self.queries else None,
+                'batch_p50_us': percentile(0.5),
+                'batch_p99_us': percentile(0.99),
+            }
+
+
+def rule_category(section: Optional[str]) -> Optional[str]:
+    """`=== Windows热门游戏进程名 ===` 这样的横幅标题不是分类"""
+    if section is None or section.startswith('==='):
+        return None
+    return section
+
+
+def rule_payload(rule: Optional[Rule]) -> Optional[Dict]:
+    if rule is None:
+        return None
+    return {
+        'type': rule.rule_type,
+        'value': rule.value,
+        'comment': rule.comment,
+        'category': rule_category(rule.section),
+        'line': rule.line_no,
+    }
+
+
+class Classifier:
+    def __init__(self, rule_sets: Dict[str, RuleSet]):
+        self.rule_sets = rule_sets
+        self.metrics = Metrics()
+
+    def classify(self, platform: str, queries: List) -> List[Dict]:
+        rule_set = self.rule_sets.get(platform) if isinstance(platform, str) else None
+        if rule_set is None:
+            raise ValueError(f'未知平台: {platform}')
+        rule_set.reload_if_changed()
+        matcher = rule_set.matcher
+        start = time.perf_counter()
+        results = []
+        hits = 0
+        for query in queries:
+            if isinstance(query, str):
+                name, path = query, None
+            elif isinstance(query, dict):
+                name, path = query.get('name'), query.get('path')
+            else:
+                raise ValueError(f'无效的查询: {query!r}')
+            if name is None and path is None or not all(isinstance(v, (str, type(None))) for v in (name, path)):
+                raise ValueError(f'无效的查询: {query!r}')
+            rule = matcher.match(name=name, path=path)
+            if rule is not None:
+                hits += 1
+            results.append({'query': query, 'match': rule_payload(rule)})
+        self.metrics.record(len(queries), hits, time.perf_counter() - start)
+        return results
+
+    def status(self) -> Dict:
+        return {
+            'rule_files': {
+                platform: {
+                    'path': rule_set.path,
+                    'rules': rule_set.rule_count,
+                    'loaded_at': rule_set.loaded_at,
+                    'reloads': rule_set.reloads,
+                    'failed_reloads': rule_set.failed_reloads,
+                }
+                for platform, rule_set in self.rule_sets.items()
+            },
+            'metrics': self.metrics.snapshot(),
+        }
+
+
+class ClassifyHandler(BaseHTTPRequestHandler):
+    server_version = 'GameRuleClassifier/1.0'
+    protocol_version = 'HTTP/1.1'
+
+    @property
+    def classifier(self) -> Classifier:
+        return self.server.classifier
+
+    def _send_json(self, status: int, payload: Dict):
+        body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/health':
+            self._send_json(200, {'status': 'ok'})
+        elif self.path == '/metrics':
+            self._send_json(200, self.classifier.status())
+        else:
+            self._send_json(404, {'error': 'not found'})
+
+    def do_POST(self):
+        if self.path != '/classify':
+            self._send_json(404, {'error': 'not found'})
+            return
+        try:
+            length = int(self.headers.get('Content-Length') or 0)
+            if length <= 0 or length > MAX_BODY_BYTES:
+                raise ValueError(f'请求体长度无效: {length}')
+            request = json.loads(self.rfile.read(length))
+            if not isinstance(request, dict):
+                raise ValueError('请求体必须是JSON对象')
+            queries = request.get('queries')
+            if not isinstance(queries, list) or len(queries) > MAX_BATCH:
+                raise ValueError(f'queries 必须是不超过 {MAX_BATCH} 项的列表')
+            platform = request.get('platform', 'windows')
+            if not isinstance(platform, str):
+                raise ValueError(f'platform 必须是字符串: {platform!r}')
+            results = self.classifier.classify(platform, queries)
+        except ValueError as e:
+            # json.JSONDecodeError 也是 ValueError
+            self.classifier.metrics.record_error()
+            self._send_json(400, {'error': str(e)})
+            return
+        self._send_json(200, {'results': results})
+
+    def log_message(self, format, *args):
+        # 每个请求都打印日志会明显拖慢批量查询
+        pass
+
+
+class ClassifyHTTPServer(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, classifier: Classifier):
+        super().__init__(address, ClassifyHandler)
+        self.classifier = classifier
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class ClassifyUnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+        def __init__(self, path: str, classifier: Classifier):
+            super().__init__(path, ClassifyHandler)
+            self.classifier = classifier
+
+        def get_request(self):
+            # BaseHTTPRequestHandler 需要 (host, port) 形式的客户端地址
+            request, _ = super().get_request()
+            return request, ('unix', 0)
+
+
+def build_classifier(windows_path: str, android_path: str, check_interval: float = 1.0) -> Classifier:
+    return Classifier({
+        'windows': RuleSet(windows_path, ignore_case=True, check_interval=check_interval),
+        'android': RuleSet(android_path, ignore_case=False, check_interval=check_interval),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description='本地进程分类服务')
+    parser.add_argument('--host', default='127.0.0.1', help='监听地址（默认只监听本机）')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'监听端口（默认{DEFAULT_PORT}）')
+    parser.add_argument('--unix', help='改为监听 Unix 套接字路径')
+    parser.add_argument('--windows', default=os.path.join(ROOT_DIR, 'windows.yaml'), help='Windows 规则文件')
+    parser.add_argument('--android', default=os.path.join(ROOT_DIR, 'android.yaml'), help='Android 规则文件')
+    parser.add_argument('--check-interval', type=float, default=1.0, help='检查规则文件修改的最小间隔（秒）')
+    args = parser.parse_args()
+
+    classifier = build_classifier(args.windows, args.android, args.check_interval)
+    if args.unix:
+        if not hasattr(socketserver, 'UnixStreamServer'):
+            parser.error('当前系统不支持 Unix 套接字')
+        if os.path.exists(args.unix):
+            os.remove(args.unix)
+        server = ClassifyUnixServer(args.unix, classifier)
+        where = args.unix
+    else:
+        server = ClassifyHTTPServer((args.host, args.port), classifier)
+        where = f'http://{args.host}:{args.port}'
+    for platform, rule_set in classifier.rule_sets.items():
+        print(f'{platform}: {rule_set.path}（{rule_set.rule_count} 条规则）')
+    print(f'分类服务已启动: {where}')
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print('\n正在停止...')
+    finally:
+        server.server_close()
+        if args.unix and os.path.exists(args.unix):
+            os.remove(args.unix)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+进程表采样器
+定时读取本机进程列表（优先用 psutil，没有时读 Linux 的 /proc），用编译后的匹配器对每个进程分类，
+统计哪些规则真正命中、哪些从未命中，结果写成命中画像JSON，供清理死规则和调整规则顺序使用。
+同一进程在后续采样中直接复用上次的分类结果，每次采样只需匹配新出现的进程。
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import CompiledRuleMatcher
+from rules.rule_parser import Rule, load_rules
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'hit_profile.json')
+
+# (pid, 进程名, 可执行文件路径)
+Process = Tuple[int, Optional[str], Optional[str]]
+
+
+def _iter_psutil() -> Iterator[Process]:
+    for proc in psutil.process_iter(['pid', 'name', 'exe']):
+        info = proc.info
+        yield info['pid'], info.get('name'), info.get('exe')
+
+
+def _iter_proc() -> Iterator[Process]:
+    with os.scandir('/proc') as entries:
+        for entry in entries:
+            if not entry.name.isdigit():
+                continue
+            pid = int(entry.name)
+            try:
+                exe = os.readlink(f'/proc/{pid}/exe')
+            except OSError:
+                # 内核线程或无权限的进程没有 exe
+                exe = None
+            name = os.path.basename(exe) if exe else None
+            if name is None:
+                try:
+                    with open(f'/proc/{pid}/comm', 'r', encoding='utf-8', errors='replace') as f:
+                        name = f.read().strip() or None
+                except OSError:
+                    continue
+            yield pid, name, exe
+
+
+def iter_processes() -> Iterator[Process]:
+    if psutil is not None:
+        return _iter_psutil()
+    if os.path.isdir('/proc'):
+        return _iter_proc()
+    raise RuntimeError('无法读取进程列表：请安装 psutil（pip install psutil）')
+
+
+class HitProfiler:
+    """对一份规则文件统计命中次数"""
+
+    def __init__(self, yaml_path: str, ignore_case: bool):
+        self.yaml_path = yaml_path
+        self.rules: List[Rule] = load_rules(yaml_path)
+        self.matcher = CompiledRuleMatcher(self.rules, ignore_case=ignore_case)
+        self.hits: Counter = Counter()
+        self.processes: Counter = Counter()
+
+    def classify(self, name: Optional[str], path: Optional[str]) -> Optional[Rule]:
+        return self.matcher.match(name=name, path=path)
+
+    def record(self, rule: Rule, name: str):
+        self.hits[rule] += 1
+        self.processes[(rule, name)] += 1
+
+    def report(self) -> Dict:
+        examples: Dict[Rule, List[str]] = {}
+        for hit_rule, name in sorted(self.processes, key=lambda key: key[1]):
+            examples.setdefault(hit_rule, []).append(name)
+        rules = []
+        for rule in self.rules:
+            rules.append({
+                'type': rule.rule_type,
+                'value': rule.value,
+                'comment': rule.comment,
+                'section': rule.section,
+                'line': rule.line_no,
+                'hits': self.hits[rule],
+                'processes': examples.get(rule, [])[:10],
+            })
+        return {
+            'path': os.path.relpath(self.yaml_path, ROOT_DIR),
+            'rules': rules,
+            'never_fired': [f'{r["type"]},{r["value"]}' for r in rules if not r['hits']],
+        }
+
+
+class ProcessSampler:
+    def __init__(self, profilers: Dict[str, HitProfiler]):
+        self.profilers = profilers
+        self.samples = 0
+        self.observations = 0
+        self.classified = 0
+        self.sample_seconds = 0.0
+        # pid -> (进程名, 路径, {平台: 命中规则})，进程名或路径变化（pid 复用）时重新分类
+        self._known: Dict[int, Tuple[Optional[str], Optional[str], Dict[str, Optional[Rule]]]] = {}
+
+    def sample(self):
+        start = time.perf_counter()
+        seen = {}
+        for pid, name, path in iter_processes():
+            known = self._known.get(pid)
+            if known is not None and known[0] == name and known[1] == path:
+                matches = known[2]
+            else:
+                matches = {platform: profiler.classify(name, path) for platform, profiler in self.profilers.items()}
+                self.classified += 1
+            seen[pid] = (name, path, matches)
+            self.observations += 1
+            for platform, rule in matches.items():
+                if rule is not None:
+                    self.profilers[platform].record(rule, name or path)
+        # 只保留仍在运行的进程，避免缓存无限增长
+        self._known = seen
+        self.samples += 1
+        self.sample_seconds += time.perf_counter() - start
+
+    def run(self, interval: float, count: int):
+        for i in range(count):
+            if i:
+                time.sleep(interval)
+            self.sample()
+
+    def report(self, interval: float) -> Dict:
+        return {
+            'generated_at': time.strftime('%Y-%m-%d %H:%M:%S'),
+            'backend': 'psutil' if psutil is not None else 'procfs',
+            'samples': self.samples,
+            'interval_seconds': interval,
+            'observations': self.observations,
+            'classified': self.classified,
+            'ms_per_sample': round(self.sample_seconds / self.samples * 1000, 3) if self.samples else None,
+            'rule_files': {platform: profiler.report() for platform, profiler in self.profilers.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='采样本机进程并统计规则命中情况')
+    parser.add_argument('--platform', choices=['windows', 'android', 'both'], default='windows',
+                        help='使用哪份规则文件分类（默认 windows）')
+    parser.add_argument('--interval', type=float, default=5.0, help='采样间隔（秒）')
+    parser.add_argument('--samples', type=int, default=12, help='采样次数')
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='命中画像JSON文件')
+    args = parser.parse_args()
+
+    platforms = ['windows', 'android'] if args.platform == 'both' else [args.platform]
+    profilers = {
+        platform: HitProfiler(os.path.join(ROOT_DIR, f'{platform}.yaml'), ignore_case=platform == 'windows')
+        for platform in platforms
+    }
+    sampler = ProcessSampler(profilers)
+    print(f'开始采样：每 {args.interval} 秒一次，共 {args.samples} 次')
+    try:
+        sampler.run(args.interval, args.samples)
+    except KeyboardInterrupt:
+        print(f'\n已中断，保存前 {sampler.samples} 次采样的结果')
+
+    report = sampler.report(args.interval)
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+
+    print(f'采样 {report["samples"]} 次，观察到 {report["observations"]} 个进程，'
+          f'实际分类 {report["classified"]} 次，平均每次采样 {report["ms_per_sample"]} ms')
+    for platform, result in report['rule_files'].items():
+        fired = sorted((r for r in result['rules'] if r['hits']), key=lambda r: -r['hits'])
+        print(f'\n[{platform}] 命中 {len(fired)} 条规则，{len(result["never_fired"])} 条从未命中')
+        for r in fired[:10]:
+            print(f'  {r["hits"]:>6}  {r["type"]},{r["value"]}  {", ".join(r["processes"][:3])}')
+    print(f'\n命中画像已保存到 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
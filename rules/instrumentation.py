@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+分阶段计时与计数
+爬虫、扫描器和统计脚本共用的埋点：上下文管理器计时、计数器和内存峰值采样，
+结束时输出 JSON 或 Prometheus 文本格式的报告。默认关闭，关闭时计时器是空操作，
+各工具通过 --metrics 参数打开。
+
+    from rules.instrumentation import metrics
+    with metrics.timer('spider.fetch'):
+        ...
+    metrics.count('spider.pages')
+"""
+
+import argparse
+import atexit
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Dict, Iterable, Iterator, Optional, TypeVar
+
+try:
+    import psutil
+except ImportError:  # 没有 psutil 时 Linux 读 /proc，其他系统只能取进程级峰值
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+REPORT_FORMATS = ('json', 'prometheus')
+PROMETHEUS_PREFIX = 'game_rules'
+DEFAULT_SAMPLE_INTERVAL = 0.05
+
+T = TypeVar('T')
+_NULL_TIMER = nullcontext()
+
+
+def current_rss() -> Optional[int]:
+    """当前进程的常驻内存字节数，取不到时返回 None"""
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm', 'rb') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+def process_peak_rss() -> Optional[int]:
+    """进程启动以来的内存峰值，Linux 上 ru_maxrss 以 KB 计，macOS 以字节计"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+
+class StageStats:
+    __slots__ = ('calls', 'total', 'max', 'peak_rss')
+
+    def __init__(self):
+        self.calls = 0
+        self.total = 0.0
+        self.max = 0.0
+        # 该阶段运行期间采样到的最大常驻内存
+        self.peak_rss = 0
+
+    def as_dict(self) -> Dict:
+        return {
+            'calls': self.calls,
+            'seconds': round(self.total, 6),
+            'max_seconds': round(self.max, 6),
+            'mean_seconds': round(self.total / self.calls, 6) if self.calls else 0.0,
+            'peak_rss': self.peak_rss or None,
+        }
+
+
+class Instrumentation:
+    def __init__(self, enabled: bool = False, sample_interval: float = DEFAULT_SAMPLE_INTERVAL):
+        self.enabled = enabled
+        self.sample_interval = sample_interval
+        self._lock = threading.Lock()
+        self._stages: Dict[str, StageStats] = {}
+        self._counters: Dict[str, int] = {}
+        # 正在运行的阶段及其嵌套层数，采样线程据此把内存峰值记到对应阶段
+        self._active: Dict[str, int] = {}
+        self._peak_rss = 0
+        self._started = time.perf_counter()
+        self._sampler: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    def enable(self, sample_memory: bool = True):
+        """打开埋点，并在后台线程中定时采样内存"""
+        self.enabled = True
+        self._started = time.perf_counter()
+        if sample_memory and self._sampler is None and current_rss() is not None:
+            self._stop.clear()
+            self._sampler = threading.Thread(target=self._sample_loop, name='metrics-sampler', daemon=True)
+            self._sampler.start()
+
+    def stop(self):
+        if self._sampler is not None:
+            self._stop.set()
+            self._sampler.join()
+            self._sampler = None
+        self._sample()
+
+    def reset(self):
+        with self._lock:
+            self._stages.clear()
+            self._counters.clear()
+            self._peak_rss = 0
+        self._started = time.perf_counter()
+
+    def _sample_loop(self):
+        while not self._stop.wait(self.sample_interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss()
+        if rss is None:
+            return
+        with self._lock:
+            self._peak_rss = max(self._peak_rss, rss)
+            for stage in self._active:
+                stats = self._stages.get(stage)
+                if stats is not None and rss > stats.peak_rss:
+                    stats.peak_rss = rss
+
+    def _stage(self, stage: str) -> StageStats:
+        stats = self._stages.get(stage)
+        if stats is None:
+            stats = self._stages[stage] = StageStats()
+        return stats
+
+    def timer(self, stage: str):
+        """计时上下文；关闭时返回空操作的上下文，几乎没有开销"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return self._timer(stage)
+
+    @contextmanager
+    def _timer(self, stage: str):
+        with self._lock:
+            self._stage(stage)
+            self._active[stage] = self._active.get(stage, 0) + 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            # 短于采样间隔的阶段也至少采样一次
+            self._sample()
+            with self._lock:
+                depth = self._active[stage] - 1
+                if depth:
+                    self._active[stage] = depth
+                else:
+                    del self._active[stage]
+            self.record(stage, elapsed)
+
+    def record(self, stage: str, seconds: float, calls: int = 1):
+        """记录在别处测得的耗时，例如进程池工作进程返回的解析时间"""
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self._stage(stage)
+            stats.calls += calls
+            stats.total += seconds
+            if seconds > stats.max:
+                stats.max = seconds
+
+    def timed_iter(self, stage: str, iterable: Iterable[T]) -> Iterator[T]:
+        """只统计在迭代器内部花的时间，适合与处理逻辑交替进行的目录遍历"""
+        if not self.enabled:
+            yield from iterable
+            return
+        it = iter(iterable)
+        total = 0.0
+        items = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(it)
+                except StopIteration:
+                    total += time.perf_counter() - start
+                    break
+                total += time.perf_counter() - start
+                items += 1
+                yield item
+        finally:
+            self.record(stage, total)
+            self.count(f'{stage}.items', items)
+
+    def count(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def snapshot(self) -> Dict:
+        self._sample()
+        with self._lock:
+            stages = {stage: stats.as_dict() for stage, stats in sorted(self._stages.items())}
+            counters = dict(sorted(self._counters.items()))
+            peak = self._peak_rss
+        return {
+            'wall_seconds': round(time.perf_counter() - self._started, 6),
+            'peak_rss': max(peak, process_peak_rss() or 0) or None,
+            'stages': stages,
+            'counters': counters,
+        }
+
+    def to_json(self) -> str:
+        return json.dumps(self.snapshot(), ensure_ascii=False, indent=2)
+
+    def to_prometheus(self) -> str:
+        snap = self.snapshot()
+        p = PROMETHEUS_PREFIX
+        lines = [
+            f'# HELP {p}_wall_seconds Wall time since instrumentation was enabled.',
+            f'# TYPE {p}_wall_seconds gauge',
+            f'{p}_wall_seconds {snap["wall_seconds"]}',
+        ]
+        if snap['peak_rss']:
+            lines += [f'# TYPE {p}_peak_rss_bytes gauge', f'{p}_peak_rss_bytes {snap["peak_rss"]}']
+        metrics = [
+            ('stage_seconds_total', 'counter', 'seconds'),
+            ('stage_calls_total', 'counter', 'calls'),
+            ('stage_seconds_max', 'gauge', 'max_seconds'),
+            ('stage_peak_rss_bytes', 'gauge', 'peak_rss'),
+        ]
+        for name, kind, field in metrics:
+            samples = [(stage, stats[field]) for stage, stats in snap['stages'].items() if stats[field] is not None]
+            if samples:
+                lines.append(f'# TYPE {p}_{name} {kind}')
+                lines += [f'{p}_{name}{{stage="{_escape(stage)}"}} {value}' for stage, value in samples]
+        if snap['counters']:
+            lines.append(f'# TYPE {p}_events_total counter')
+            lines += [f'{p}_events_total{{name="{_escape(name)}"}} {value}' for name, value in snap['counters'].items()]
+        return '\n'.join(lines) + '\n'
+
+    def report(self, fmt: str = 'json') -> str:
+        if fmt not in REPORT_FORMATS:
+            raise ValueError(f'未知的报告格式: {fmt}')
+        return self.to_json() if fmt == 'json' else self.to_prometheus()
+
+    def write_report(self, fmt: str = 'json', path: Optional[str] = None):
+        """写出报告；不指定路径时输出到 stderr，不影响工具本身的标准输出"""
+        self.stop()
+        text = self.report(fmt)
+        if path:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+        else:
+            sys.stderr.write(text)
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# 各工具共用的实例
+metrics = Instrumentation()
+
+
+def add_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument('--metrics', choices=REPORT_FORMATS, help='结束时输出各阶段耗时、计数和内存峰值报告')
+    parser.add_argument('--metrics-output', help='报告写入的文件（默认输出到 stderr）')
+
+
+def configure(args: argparse.Namespace):
+    """按命令行参数打开埋点，进程退出时写出报告"""
+    if getattr(args, 'metrics', None):
+        metrics.enable()
+        atexit.register(metrics.write_report, args.metrics, args.metrics_output)
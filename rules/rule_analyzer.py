@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则冲突、遮蔽与冗余分析
+规则集对外只表示"进程是否属于该集合"，一条规则能匹配的进程如果都已被另一条保留的规则匹配，删掉它不改变结果：
+    duplicate    与前面的规则完全相同（Windows 忽略大小写）
+    unreachable  被前面的规则完全覆盖，逐条匹配时永远轮不到它
+    subsumed     被后面的规则完全覆盖
+精确名与正则之间直接用正则判断；正则与正则之间把两条正则转成自动机，判断语言包含关系。
+路径正则只在不以 ^ 开头时才能覆盖进程名规则：完整路径以进程名结尾，能在进程名中搜到的子串在路径中同样能搜到。
+含 \\b、反向引用、环视等依赖上下文的正则不做包含判断，只会被当作"无法分析"。
+"""
+
+import argparse
+import ast
+import os
+import re
+import sys
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Set, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_document import RuleDocument
+from rules.rule_parser import Rule, load_rules
+
+# 自动机子集构造的状态数上限，超过后放弃判断
+MAX_DFA_STATES = 20000
+MAX_RANGE = 512
+MAX_REPEAT = 32
+# 正则中没有显式出现的字符，按 \d \w \s 的归属各取一个代表
+REPRESENTATIVES = ('中', '٣', '　', '\x01', '€')
+
+
+class UnsupportedPattern(ValueError):
+    pass
+
+
+class _Parser:
+    """把正则解析成语法树，只支持与上下文无关的子集"""
+
+    def __init__(self, pattern: str):
+        self.pattern = pattern
+        self.pos = 0
+        self.chars: Set[str] = set()
+
+    def parse(self):
+        anchored_start = anchored_end = False
+        if self.pattern.startswith('^'):
+            anchored_start = True
+            self.pos = 1
+        end = len(self.pattern)
+        if self.pattern.endswith('$') and not self._escaped(end - 1):
+            anchored_end = True
+            self.pattern = self.pattern[:-1]
+        node = self._alternation()
+        if self.pos != len(self.pattern):
+            raise UnsupportedPattern(f'无法解析的位置 {self.pos}')
+        return node, anchored_start, anchored_end
+
+    def _escaped(self, index: int) -> bool:
+        count = 0
+        while index > 0 and self.pattern[index - 1] == '\\':
+            count += 1
+            index -= 1
+        return count % 2 == 1
+
+    def _peek(self) -> Optional[str]:
+        return self.pattern[self.pos] if self.pos < len(self.pattern) else None
+
+    def _alternation(self):
+        branches = [self._concat()]
+        while self._peek() == '|':
+            self.pos += 1
+            branches.append(self._concat())
+        return branches[0] if len(branches) == 1 else ('alt', branches)
+
+    def _concat(self):
+        items = []
+        while self._peek() is not None and self._peek() not in '|)':
+            items.append(self._repeat())
+        return ('cat', items)
+
+    def _repeat(self):
+        node = self._atom()
+        while True:
+            c = self._peek()
+            if c == '*':
+                node, self.pos = ('rep', node, 0, None), self.pos + 1
+            elif c == '+':
+                node, self.pos = ('rep', node, 1, None), self.pos + 1
+            elif c == '?':
+                node, self.pos = ('rep', node, 0, 1), self.pos + 1
+            elif c == '{':
+                match = re.match(r'\{(\d*)(,?)(\d*)\}', self.pattern[self.pos:])
+                if not match or not match.group(1):
+                    raise UnsupportedPattern('无法解析的 {} 量词')
+                low = int(match.group(1))
+                high = low if not match.group(2) else (int(match.group(3)) if match.group(3) else None)
+                if low > MAX_REPEAT or (high is not None and high > MAX_REPEAT):
+                    raise UnsupportedPattern('重复次数过大')
+                node = ('rep', node, low, high)
+                self.pos += match.end()
+            else:
+                return node
+            # 非贪婪后缀不改变可匹配的语言
+            if self._peek() == '?':
+                self.pos += 1
+
+    def _atom(self):
+        c = self._peek()
+        if c == '(':
+            self.pos += 1
+            if self.pattern.startswith('?:', self.pos):
+                self.pos += 2
+            elif self._peek() == '?':
+                raise UnsupportedPattern('不支持 (? 扩展语法')
+            node = self._alternation()
+            if self._peek() != ')':
+                raise UnsupportedPattern('括号不匹配')
+            self.pos += 1
+            return node
+        if c == '[':
+            return self._char_class()
+        if c == '.':
+            self.pos += 1
+            return ('set', '.')
+        if c == '\\':
+            return self._escape()
+        if c in '*+?{^$':
+            raise UnsupportedPattern(f'不支持此处的 {c}')
+        self.pos += 1
+        self.chars.add(c)
+        return ('set', re.escape(c))
+
+    def _escape(self):
+        if self.pos + 1 >= len(self.pattern):
+            raise UnsupportedPattern('结尾的反斜杠')
+        c = self.pattern[self.pos + 1]
+        self.pos += 2
+        if c in 'dDwWsS':
+            return ('set', '\\' + c)
+        if c in 'bBAZz' or c.isdigit() or c in 'xuUNpP':
+            raise UnsupportedPattern(f'不支持 \\{c}')
+        literal = {'t': '\t', 'n': '\n', 'r': '\r', 'f': '\f', 'v': '\v'}.get(c, c)
+        self.chars.add(literal)
+        return ('set', re.escape(literal))
+
+    def _char_class(self):
+        start = self.pos
+        self.pos += 1
+        if self._peek() == '^':
+            self.pos += 1
+        first = True
+        previous = None
+        while True:
+            c = self._peek()
+            if c is None:
+                raise UnsupportedPattern('字符类不完整')
+            if c == ']' and not first:
+                break
+            first = False
+            if c == '\\':
+                if self.pos + 1 >= len(self.pattern):
+                    raise UnsupportedPattern('结尾的反斜杠')
+                e = self.pattern[self.pos + 1]
+                self.pos += 2
+                if e in 'dDwWsS':
+                    previous = None
+                    continue
+                if e.isalnum() and e not in 'tnrfv':
+                    raise UnsupportedPattern(f'不支持字符类中的 \\{e}')
+                c = {'t': '\t', 'n': '\n', 'r': '\r', 'f': '\f', 'v': '\v'}.get(e, e)
+            else:
+                self.pos += 1
+            if c == '-' and previous is not None and self._peek() not in (None, ']'):
+                end = self._peek()
+                if end == '\\':
+                    raise UnsupportedPattern('不支持转义的范围端点')
+                self.pos += 1
+                if ord(end) - ord(previous) > MAX_RANGE:
+                    raise UnsupportedPattern('字符范围过大')
+                self.chars.update(chr(i) for i in range(ord(previous), ord(end) + 1))
+                previous = None
+                continue
+            self.chars.add(c)
+            previous = c
+        self.pos += 1
+        return ('set', self.pattern[start:self.pos])
+
+
+class RegexAutomaton:
+    """按搜索语义（未锚定的一端前后可接任意字符）构造的 NFA"""
+
+    def __init__(self, pattern: str, ignore_case: bool):
+        parser = _Parser(pattern)
+        node, self.anchored_start, self.anchored_end = parser.parse()
+        self.pattern = pattern
+        self.flags = re.IGNORECASE if ignore_case else 0
+        self.chars = parser.chars
+        self.predicates: List[str] = []
+        self.edges: List[List[Tuple[int, int]]] = []
+        self.epsilon: List[List[int]] = []
+        if not self.anchored_start:
+            node = ('cat', [('rep', ('set', '(?s:.)'), 0, None), node])
+        if not self.anchored_end:
+            node = ('cat', [node, ('rep', ('set', '(?s:.)'), 0, None)])
+        self.start = self._new_state()
+        self.accept = self._build(node, self.start)
+
+    def _new_state(self) -> int:
+        self.edges.append([])
+        self.epsilon.append([])
+        return len(self.edges) - 1
+
+    def _predicate(self, source: str) -> int:
+        if source not in self.predicates:
+            self.predicates.append(source)
+        return self.predicates.index(source)
+
+    def _build(self, node, start: int) -> int:
+        """从 start 开始构造 node，返回其结束状态"""
+        kind = node[0]
+        if kind == 'set':
+            end = self._new_state()
+            self.edges[start].append((self._predicate(node[1]), end))
+            return end
+        if kind == 'cat':
+            for item in node[1]:
+                start = self._build(item, start)
+            return start
+        if kind == 'alt':
+            end = self._new_state()
+            for branch in node[1]:
+                entry = self._new_state()
+                self.epsilon[start].append(entry)
+                self.epsilon[self._build(branch, entry)].append(end)
+            return end
+        _, inner, low, high = node
+        for _ in range(low):
+            start = self._build(inner, start)
+        if high is None:
+            loop = self._new_state()
+            self.epsilon[start].append(loop)
+            self.epsilon[self._build(inner, loop)].append(loop)
+            return loop
+        end = self._new_state()
+        self.epsilon[start].append(end)
+        for _ in range(high - low):
+            start = self._build(inner, start)
+            self.epsilon[start].append(end)
+        return end
+
+    def closure(self, states) -> FrozenSet[int]:
+        stack = list(states)
+        seen = set(stack)
+        while stack:
+            for target in self.epsilon[stack.pop()]:
+                if target not in seen:
+                    seen.add(target)
+                    stack.append(target)
+        return frozenset(seen)
+
+    def bind(self, alphabet: List[str]):
+        """计算每个谓词在字母表上接受的符号"""
+        self._accepts = [
+            frozenset(i for i, ch in enumerate(alphabet) if re.fullmatch(source, ch, self.flags))
+            for source in self.predicates
+        ]
+
+    def step(self, states: FrozenSet[int], symbol: int) -> FrozenSet[int]:
+        targets = [target for state in states for predicate, target in self.edges[state]
+                   if symbol in self._accepts[predicate]]
+        return self.closure(targets) if targets else frozenset()
+
+
+def _alphabet(automata: List[RegexAutomaton]) -> List[str]:
+    chars = set(REPRESENTATIVES)
+    for automaton in automata:
+        chars |= automaton.chars
+        if automaton.flags & re.IGNORECASE:
+            chars |= {c.swapcase() for c in automaton.chars}
+    return sorted(chars)
+
+
+def contains(outer: RegexAutomaton, inner: RegexAutomaton) -> Optional[bool]:
+    """outer 能匹配的字符串是否包含 inner 能匹配的全部字符串；状态过多时返回 None"""
+    alphabet = _alphabet([outer, inner])
+    outer.bind(alphabet)
+    inner.bind(alphabet)
+    start = (inner.closure([inner.start]), outer.closure([outer.start]))
+    seen = {start}
+    queue = [start]
+    while queue:
+        inner_states, outer_states = queue.pop()
+        if inner.accept in inner_states and outer.accept not in outer_states:
+            return False
+        for symbol in range(len(alphabet)):
+            next_inner = inner.step(inner_states, symbol)
+            if not next_inner:
+                continue
+            pair = (next_inner, outer.step(outer_states, symbol))
+            if pair not in seen:
+                if len(seen) >= MAX_DFA_STATES:
+                    return None
+                seen.add(pair)
+                queue.append(pair)
+    return True
+
+
+class Finding(NamedTuple):
+    rule: Rule
+    kind: str
+    by: Optional[Rule]
+
+
+class RuleAnalyzer:
+    def __init__(self, rules: List[Rule], ignore_case: bool):
+        self.rules = rules
+        self.ignore_case = ignore_case
+        self.flags = re.IGNORECASE if ignore_case else 0
+        self.automata: Dict[int, RegexAutomaton] = {}
+        self.unsupported: Dict[int, str] = {}
+        for i, rule in enumerate(rules):
+            if rule.rule_type.endswith('-REGEX'):
+                try:
+                    self.automata[i] = RegexAutomaton(rule.value, ignore_case)
+                except UnsupportedPattern as e:
+                    self.unsupported[i] = str(e)
+        self._contains_cache: Dict[Tuple[int, int], Optional[bool]] = {}
+
+    def _key(self, rule: Rule) -> Tuple[str, str]:
+        return rule.rule_type, rule.value.casefold() if self.ignore_case else rule.value
+
+    def _search(self, index: int, text: str) -> bool:
+        return re.search(self.rules[index].value, text, self.flags) is not None
+
+    def _regex_contains(self, outer: int, inner: int) -> bool:
+        key = (outer, inner)
+        if key not in self._contains_cache:
+            self._contains_cache[key] = contains(self.automata[outer], self.automata[inner])
+        return bool(self._contains_cache[key])
+
+    def covers(self, outer: int, inner: int) -> bool:
+        """outer 能匹配的进程是否包含 inner 能匹配的全部进程"""
+        a, b = self.rules[outer], self.rules[inner]
+        if self._key(a) == self._key(b):
+            return True
+        if a.rule_type == 'PROCESS-NAME-REGEX':
+            if b.rule_type == 'PROCESS-NAME':
+                return self._search(outer, b.value)
+            if b.rule_type == 'PROCESS-NAME-REGEX' and outer in self.automata and inner in self.automata:
+                return self._regex_contains(outer, inner)
+        elif a.rule_type == 'PROCESS-PATH-REGEX':
+            # 路径以进程名结尾，未以 ^ 锚定且与上下文无关的路径正则在进程名中能搜到，在路径中同样能搜到
+            if outer not in self.automata:
+                return False
+            if b.rule_type == 'PROCESS-NAME':
+                return not self.automata[outer].anchored_start and self._search(outer, b.value)
+            if inner not in self.automata:
+                return False
+            if b.rule_type == 'PROCESS-NAME-REGEX':
+                return not self.automata[outer].anchored_start and self._regex_contains(outer, inner)
+            if b.rule_type == 'PROCESS-PATH-REGEX':
+                return self._regex_contains(outer, inner)
+        return False
+
+    def analyze(self) -> List[Finding]:
+        findings = []
+        removed: Set[int] = set()
+        for i, rule in enumerate(self.rules):
+            for j, other in enumerate(self.rules):
+                if i == j or j in removed or not self.covers(j, i):
+                    continue
+                # 互相覆盖时保留靠前的一条
+                if j > i and self.covers(i, j):
+                    continue
+                if self._key(other) == self._key(rule):
+                    kind = 'duplicate'
+                else:
+                    kind = 'unreachable' if j < i else 'subsumed'
+                findings.append(Finding(rule, kind, other))
+                removed.add(i)
+                break
+        return findings
+
+
+def find_duplicate_dict_keys(source_path: str, case_insensitive: bool) -> List[Tuple[int, str, int]]:
+    """查找 Python 源码里字典字面量中重复的字符串键，返回 (行号, 键, 首次出现的行号)"""
+    with open(source_path, 'r', encoding='utf-8') as f:
+        tree = ast.parse(f.read(), source_path)
+    duplicates = []
+    for node in ast.walk(tree):
+        if not isinstance(node, ast.Dict):
+            continue
+        seen: Dict[str, int] = {}
+        for key in node.keys:
+            if isinstance(key, ast.Constant) and isinstance(key.value, str):
+                normalized = key.value.casefold() if case_insensitive else key.value
+                if normalized in seen:
+                    duplicates.append((key.lineno, key.value, seen[normalized]))
+                else:
+                    seen[normalized] = key.lineno
+    return duplicates
+
+
+KIND_LABELS = {
+    'duplicate': '重复',
+    'unreachable': '被前面的规则覆盖',
+    'subsumed': '被后面的规则覆盖',
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='找出重复、被遮蔽或被覆盖、可以安全删除的规则')
+    parser.add_argument('yaml_path', nargs='?', default=os.path.join(ROOT_DIR, 'windows.yaml'),
+                        help='规则文件（默认 windows.yaml）')
+    parser.add_argument('--exact', action='store_true', help='区分大小写（Android 包名）；默认按 Windows 规则忽略大小写')
+    parser.add_argument('--write', action='store_true', help='直接删除可移除的规则并写回文件')
+    parser.add_argument('--sources', action='store_true', help='同时检查爬虫内置游戏列表中的重复键')
+    args = parser.parse_args()
+
+    rules = load_rules(args.yaml_path)
+    analyzer = RuleAnalyzer(rules, ignore_case=not args.exact)
+    findings = analyzer.analyze()
+
+    for i, reason in analyzer.unsupported.items():
+        print(f'  无法分析 第 {rules[i].line_no} 行 {rules[i].value}: {reason}')
+    for finding in findings:
+        rule, by = finding.rule, finding.by
+        print(f'  第 {rule.line_no} 行 {rule.rule_type},{rule.value}: {KIND_LABELS[finding.kind]}'
+              f'（第 {by.line_no} 行 {by.rule_type},{by.value}）')
+    print(f'{len(rules)} 条规则中有 {len(findings)} 条可以删除')
+
+    if args.sources:
+        for path, case_insensitive in (('spider/game_package_spider.py', False), ('spider/windows_game_collector.py', True)):
+            for line_no, key, first in find_duplicate_dict_keys(os.path.join(ROOT_DIR, path), case_insensitive):
+                print(f'  {path}:{line_no} 重复的键 {key}（首次出现在第 {first} 行）')
+
+    if findings and args.write:
+        # 经 RuleDocument 删除并原子替换，段落和注释保持不变
+        doc = RuleDocument.load(args.yaml_path, case_insensitive=not args.exact)
+        removed = doc.remove_line_numbers(finding.rule.line_no for finding in findings)
+        doc.save()
+        print(f'已从 {args.yaml_path} 删除 {removed} 条规则')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+二进制规则集
+把 android.yaml / windows.yaml 中的 PROCESS-NAME 编译为紧凑的二进制文件：
+排序后的字符串表、偏移数组、每条目的分类编号和预先计算好的哈希桶。
+加载时直接 mmap，查询只读取涉及的几个字节，不解析文本，也不为每个条目创建Python对象。
+
+文件布局（小端）：
+    文件头   magic, version, 条目数, 分类数, 桶数, 各区段偏移
+    字符串表 所有键按字节序排序后首尾相接（UTF-8）
+    偏移数组 uint32 × (条目数 + 1)
+    条目属性 uint32 × 条目数，低16位为分类编号，第16位表示键已做大小写折叠
+    哈希桶   uint32 × 桶数，存条目下标 + 1，0 表示空；crc32 线性探测
+    分类表   uint32 偏移 × (分类数 + 1) 后接分类名
+"""
+
+import argparse
+import bisect
+import mmap
+import os
+import struct
+import sys
+import zlib
+from typing import Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_parser import iter_rules
+
+MAGIC = b'GPRS'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIIIIIII')
+FOLDED_FLAG = 1 << 16
+CATEGORY_MASK = 0xFFFF
+_U32 = struct.Struct('<I')
+_U32_PAIR = struct.Struct('<II')
+
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'compiled_rules.bin')
+
+
+def _bucket_count(entries: int) -> int:
+    """桶数取不小于两倍条目数的2的幂，负载因子不超过0.5"""
+    count = 8
+    while count < entries * 2:
+        count <<= 1
+    return count
+
+
+def collect_entries(sources: List[Tuple[str, bool]]) -> List[Tuple[bytes, bool, str]]:
+    """从各规则文件收集 (键, 是否折叠大小写, 分类)，相同键只保留第一次出现"""
+    entries = {}
+    for yaml_path, case_insensitive in sources:
+        for rule in iter_rules(yaml_path):
+            if rule.rule_type != 'PROCESS-NAME':
+                continue
+            value = rule.value.casefold() if case_insensitive else rule.value
+            entries.setdefault((value.encode('utf-8'), case_insensitive), rule.section or '')
+    return sorted((key, folded, category) for (key, folded), category in entries.items())
+
+
+def compile_rule_set(sources: List[Tuple[str, bool]], output: str) -> int:
+    """编译规则文件，返回写入的条目数"""
+    entries = collect_entries(sources)
+    categories = sorted({category for _, _, category in entries})
+    category_ids = {category: i for i, category in enumerate(categories)}
+
+    strings = b''.join(key for key, _, _ in entries)
+    offsets = [0]
+    for key, _, _ in entries:
+        offsets.append(offsets[-1] + len(key))
+    attributes = [category_ids[category] | (FOLDED_FLAG if folded else 0) for _, folded, category in entries]
+
+    bucket_count = _bucket_count(len(entries))
+    buckets = [0] * bucket_count
+    mask = bucket_count - 1
+    for index, (key, _, _) in enumerate(entries):
+        slot = zlib.crc32(key) & mask
+        while buckets[slot]:
+            slot = (slot + 1) & mask
+        buckets[slot] = index + 1
+
+    category_blobs = [category.encode('utf-8') for category in categories]
+    category_offsets = [0]
+    for blob in category_blobs:
+        category_offsets.append(category_offsets[-1] + len(blob))
+
+    strings_offset = HEADER.size
+    offsets_offset = strings_offset + len(strings)
+    attributes_offset = offsets_offset + 4 * len(offsets)
+    buckets_offset = attributes_offset + 4 * len(attributes)
+    categories_offset = buckets_offset + 4 * bucket_count
+
+    with open(output, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, 0, len(entries), len(categories), bucket_count,
+                            strings_offset, offsets_offset, attributes_offset, buckets_offset, categories_offset))
+        f.write(strings)
+        f.write(struct.pack(f'<{len(offsets)}I', *offsets))
+        f.write(struct.pack(f'<{len(attributes)}I', *attributes))
+        f.write(struct.pack(f'<{bucket_count}I', *buckets))
+        f.write(struct.pack(f'<{len(category_offsets)}I', *category_offsets))
+        f.write(b''.join(category_blobs))
+    return len(entries)
+
+
+class CompiledRuleSet:
+    """mmap 加载的二进制规则集，只读"""
+
+    def __init__(self, path: str = DEFAULT_OUTPUT):
+        self.path = path
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _, self.entry_count, category_count, self.bucket_count,
+         self._strings, self._offsets, self._attributes, self._buckets, categories_offset) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f'{path} 不是可识别的二进制规则集')
+        self._mask = self.bucket_count - 1
+        # 分类只有十几个，加载时解码一次
+        bounds = struct.unpack_from(f'<{category_count + 1}I', self._mm, categories_offset)
+        names_start = categories_offset + 4 * (category_count + 1)
+        self.categories = [self._mm[names_start + bounds[i]:names_start + bounds[i + 1]].decode('utf-8')
+                           for i in range(category_count)]
+
+    def _key_at(self, index: int) -> bytes:
+        start, end = _U32_PAIR.unpack_from(self._mm, self._offsets + 4 * index)
+        return self._mm[self._strings + start:self._strings + end]
+
+    def _attribute_at(self, index: int) -> int:
+        return _U32.unpack_from(self._mm, self._attributes + 4 * index)[0]
+
+    def _find(self, key: bytes, folded: bool) -> int:
+        mm = self._mm
+        slot = zlib.crc32(key) & self._mask
+        while True:
+            stored, = _U32.unpack_from(mm, self._buckets + 4 * slot)
+            if not stored:
+                return -1
+            index = stored - 1
+            if self._key_at(index) == key and bool(self._attribute_at(index) & FOLDED_FLAG) == folded:
+                return index
+            slot = (slot + 1) & self._mask
+
+    def find(self, name: str) -> int:
+        """返回匹配条目的下标，先按原样匹配包名，再按折叠大小写匹配Windows进程名"""
+        index = self._find(name.encode('utf-8'), False)
+        if index < 0:
+            index = self._find(name.casefold().encode('utf-8'), True)
+        return index
+
+    def __contains__(self, name: str) -> bool:
+        return self.find(name) >= 0
+
+    def __len__(self) -> int:
+        return self.entry_count
+
+    def category(self, name: str) -> Optional[str]:
+        index = self.find(name)
+        if index < 0:
+            return None
+        return self.categories[self._attribute_at(index) & CATEGORY_MASK]
+
+    def names_with_prefix(self, prefix: str) -> Iterator[str]:
+        """在排序后的字符串表上二分，列出以 prefix 开头的键"""
+        key = prefix.encode('utf-8')
+        lo = bisect.bisect_left(range(self.entry_count), key, key=self._key_at)
+        for index in range(lo, self.entry_count):
+            stored = self._key_at(index)
+            if not stored.startswith(key):
+                break
+            yield stored.decode('utf-8')
+
+    def close(self):
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self) -> 'CompiledRuleSet':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='编译或查询二进制规则集')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    build = sub.add_parser('compile', help='把规则文件编译为二进制规则集')
+    build.add_argument('--android', action='append', help='Android 规则文件，包名区分大小写（默认 android.yaml）')
+    build.add_argument('--windows', action='append', help='Windows 规则文件，进程名忽略大小写（默认 windows.yaml）')
+    build.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='输出文件')
+
+    query = sub.add_parser('query', help='查询进程名是否在规则集中')
+    query.add_argument('names', nargs='+')
+    query.add_argument('-i', '--input', default=DEFAULT_OUTPUT, help='二进制规则集文件')
+    args = parser.parse_args()
+
+    if args.command == 'compile':
+        android = args.android or ([] if args.windows else [os.path.join(ROOT_DIR, 'android.yaml')])
+        windows = args.windows or ([] if args.android else [os.path.join(ROOT_DIR, 'windows.yaml')])
+        sources = [(path, False) for path in android] + [(path, True) for path in windows]
+        count = compile_rule_set(sources, args.output)
+        print(f'已编译 {count} 条规则到 {args.output}（{os.path.getsize(args.output) / 1024:.1f} KB）')
+    else:
+        with CompiledRuleSet(args.input) as rule_set:
+            for name in args.names:
+                category = rule_set.category(name)
+                print(f'{name}: {"命中 " + (category or "未分类") if category is not None else "未命中"}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则编译器
+把规则文件中逐条求值的 *-REGEX 规则合并为一条交替正则，并提供基于
+Aho-Corasick 字面量预过滤的进程匹配器，用于和逐条求值的方式对比开销。
+"""
+
+import argparse
+import os
+import re
+import sys
+from collections import deque
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_parser import Rule, load_rules
+
+REGEX_TYPES = ('PROCESS-NAME-REGEX', 'PROCESS-PATH-REGEX')
+
+# 正则中会打断字面量的元字符
+_BREAK_CHARS = set('.^$|()[]{}*+?')
+# 在量词作用下，前一个字符变为可选
+_OPTIONAL_QUANTIFIERS = set('*?{')
+# 紧跟在 .* 后面时会改变其含义的字符（惰性、占有或再次重复）
+_QUANTIFIER_CHARS = set('?+*{')
+# 开头的 (?i) 之类全局标志只能出现在正则最前面，不能放进交替分支
+_GLOBAL_FLAGS = re.compile(r'\(\?[aiLmsux]+\)')
+
+
+def extract_literal(pattern: str) -> Optional[str]:
+    """
+    取出正则中必然出现的最长字面量片段，例如
+    `.*\\\\steamapps\\\\common\\\\.*` -> `\\steamapps\\common\\`。
+    顶层存在 | 分支或找不到字面量时返回 None。
+    """
+    runs = []
+    current = []
+    depth = 0
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\' and i + 1 < len(pattern):
+            nxt = pattern[i + 1]
+            i += 2
+            if depth == 0 and not nxt.isalnum():
+                current.append(nxt)
+                continue
+            # \d \w \b 等字符类或断言
+            runs.append(''.join(current))
+            current = []
+            continue
+        if ch == '[':
+            # 跳过字符类
+            runs.append(''.join(current))
+            current = []
+            i += 1
+            if i < len(pattern) and pattern[i] == '^':
+                i += 1
+            if i < len(pattern) and pattern[i] == ']':
+                i += 1
+            while i < len(pattern) and pattern[i] != ']':
+                i += 2 if pattern[i] == '\\' else 1
+            i += 1
+            continue
+        if ch in _BREAK_CHARS:
+            if ch in _OPTIONAL_QUANTIFIERS and current:
+                current.pop()
+            if ch == '{':
+                # 跳过 {m,n} 量词本身
+                end = pattern.find('}', i)
+                i = len(pattern) if end < 0 else end
+            elif ch == '(':
+                depth += 1
+            elif ch == ')':
+                depth = max(depth - 1, 0)
+            elif ch == '|' and depth == 0:
+                return None
+            runs.append(''.join(current))
+            current = []
+            i += 1
+            continue
+        if depth == 0:
+            current.append(ch)
+        i += 1
+    runs.append(''.join(current))
+    best = max(runs, key=len)
+    return best or None
+
+
+def has_global_flags(pattern: str) -> bool:
+    return _GLOBAL_FLAGS.match(pattern) is not None
+
+
+def strip_wildcards(pattern: str) -> str:
+    """去掉首尾多余的 `.*`（开头也可以是 `^.*`），在非锚定搜索语义下二者等价"""
+    core = pattern
+    for prefix in ('^.*', '.*'):
+        # `.*?foo` 去掉 .* 后只剩量词，不能去
+        if core.startswith(prefix) and core[len(prefix):len(prefix) + 1] not in _QUANTIFIER_CHARS:
+            core = core[len(prefix):]
+            break
+    if core.endswith('.*'):
+        # `\\.*` 中的点是转义过的字面量，不能去掉
+        backslashes = len(core[:-2]) - len(core[:-2].rstrip('\\'))
+        if backslashes % 2 == 0:
+            core = core[:-2]
+    return core
+
+
+def pure_literal(pattern: str) -> Optional[str]:
+    """正则不含任何元字符时返回其字面含义，否则返回 None"""
+    chars = []
+    i = 0
+    while i < len(pattern):
+        ch = pattern[i]
+        if ch == '\\':
+            if i + 1 >= len(pattern) or pattern[i + 1].isalnum():
+                return None
+            chars.append(pattern[i + 1])
+            i += 2
+            continue
+        if ch in _BREAK_CHARS:
+            return None
+        chars.append(ch)
+        i += 1
+    return ''.join(chars)
+
+
+def _literal_of_anchored(pattern: str) -> Optional[str]:
+    """`^literal$` 形式的正则等价于精确匹配，返回其字面量"""
+    if not (pattern.startswith('^') and pattern.endswith('$')):
+        return None
+    return pure_literal(pattern[1:-1]) or None
+
+
+class AhoCorasick:
+    """纯Python实现的 Aho-Corasick 自动机，转移表已展开为确定性自动机"""
+
+    def __init__(self, patterns: Iterable[Tuple[str, int]]):
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for word, payload in patterns:
+            state = 0
+            for ch in word:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    outputs.append(set())
+                state = nxt
+            outputs[state].add(payload)
+
+        # 广度优先计算失败指针，并把失败转移合并进转移表
+        fail = [0] * len(goto)
+        delta: List[Dict[str, int]] = [dict() for _ in goto]
+        delta[0] = dict(goto[0])
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            delta[state] = dict(delta[fail[state]])
+            delta[state].update(goto[state])
+            outputs[state] |= outputs[fail[state]]
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                queue.append(nxt)
+
+        self._delta = delta
+        self._outputs = [tuple(sorted(out)) for out in outputs]
+
+    def search(self, text: str) -> Set[int]:
+        """返回文本中出现的全部模式的 payload"""
+        found = set()
+        delta = self._delta
+        outputs = self._outputs
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if outputs[state]:
+                found.update(outputs[state])
+        return found
+
+
+def split_path(path: str) -> str:
+    """从完整路径中取出进程名"""
+    return re.split(r'[\\/]', path)[-1]
+
+
+class RuleMatcher:
+    """按文件顺序逐条求值，与代理逐条匹配的行为一致"""
+
+    def __init__(self, rules: Iterable[Rule], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        flags = re.IGNORECASE if ignore_case else 0
+        self._checks = []
+        for rule in rules:
+            if rule.rule_type == 'PROCESS-NAME':
+                value = rule.value.lower() if ignore_case else rule.value
+                self._checks.append((rule, 'name', value, None))
+            elif rule.rule_type in REGEX_TYPES:
+                field = 'name' if rule.rule_type == 'PROCESS-NAME-REGEX' else 'path'
+                self._checks.append((rule, field, None, re.compile(rule.value, flags)))
+
+    def match(self, name: Optional[str] = None, path: Optional[str] = None) -> Optional[Rule]:
+        if name is None and path is not None:
+            name = split_path(path)
+        folded = name.lower() if name is not None and self.ignore_case else name
+        for rule, field, value, regex in self._checks:
+            if regex is None:
+                if folded == value:
+                    return rule
+                continue
+            target = name if field == 'name' else path
+            if target is not None and regex.search(target):
+                return rule
+        return None
+
+
+class CompiledRuleMatcher:
+    """
+    编译后的匹配器：精确规则走哈希表，正则规则先用 Aho-Corasick 查找其必含的
+    字面量片段，只有命中片段时才执行完整正则确认。结果与 RuleMatcher 一致。
+    """
+
+    def __init__(self, rules: Iterable[Rule], ignore_case: bool = True):
+        self.ignore_case = ignore_case
+        flags = re.IGNORECASE if ignore_case else 0
+        self._exact: Dict[str, Tuple[int, Rule]] = {}
+        self._regexes: List[Tuple[int, Rule, re.Pattern]] = []
+        literals = {'name': [], 'path': []}
+        self._unfiltered = {'name': [], 'path': []}
+
+        for order, rule in enumerate(rules):
+            if rule.rule_type == 'PROCESS-NAME':
+                key = rule.value.lower() if ignore_case else rule.value
+                self._exact.setdefault(key, (order, rule))
+            elif rule.rule_type in REGEX_TYPES:
+                field = 'name' if rule.rule_type == 'PROCESS-NAME-REGEX' else 'path'
+                index = len(self._regexes)
+                # 开头的 .* 在长路径上会导致回溯，去掉后搜索结果不变
+                self._regexes.append((order, rule, re.compile(strip_wildcards(rule.value), flags)))
+                # 带全局标志的正则（如 (?i)）与预过滤的大小写处理不一致，不参与预过滤
+                literal = None if has_global_flags(rule.value) else extract_literal(rule.value)
+                if literal:
+                    literals[field].append((literal.lower() if ignore_case else literal, index))
+                else:
+                    self._unfiltered[field].append(index)
+
+        self._automata = {field: AhoCorasick(words) for field, words in literals.items()}
+
+    def _candidates(self, field: str, text: str) -> Iterable[int]:
+        hits = self._automata[field].search(text.lower() if self.ignore_case else text)
+        if self._unfiltered[field]:
+            hits.update(self._unfiltered[field])
+        return hits
+
+    def match(self, name: Optional[str] = None, path: Optional[str] = None) -> Optional[Rule]:
+        if name is None and path is not None:
+            name = split_path(path)
+        best = None
+        if name is not None:
+            best = self._exact.get(name.lower() if self.ignore_case else name)
+
+        for field, text in (('name', name), ('path', path)):
+            if text is None:
+                continue
+            for index in sorted(self._candidates(field, text)):
+                order, rule, regex = self._regexes[index]
+                if best is not None and best[0] < order:
+                    break
+                if regex.search(text):
+                    best = (order, rule)
+                    break
+        return best[1] if best else None
+
+
+def merge_regexes(patterns: List[str]) -> List[str]:
+    """
+    把多条正则合并为一条非锚定的交替正则。
+    带 (?i) 等全局标志的正则放进分支后不再合法，原样单独保留在合并结果之后
+    """
+    cores = []
+    standalone = []
+    for pattern in patterns:
+        if has_global_flags(pattern):
+            if pattern not in standalone:
+                standalone.append(pattern)
+            continue
+        core = strip_wildcards(pattern)
+        if core not in cores:
+            cores.append(core)
+    if len(cores) > 1:
+        cores = ['(?:' + '|'.join(cores) + ')']
+    return cores + standalone
+
+
+def compile_rules(rules: List[Rule]) -> List[str]:
+    """生成优化后的规则文件内容：精确规则在前，每类正则合并为一条"""
+    names: List[Rule] = []
+    seen: Set[str] = set()
+    regexes: Dict[str, List[Rule]] = {rule_type: [] for rule_type in REGEX_TYPES}
+    others: List[Rule] = []
+
+    for rule in rules:
+        if rule.rule_type == 'PROCESS-NAME-REGEX':
+            literal = _literal_of_anchored(rule.value)
+            if literal is not None:
+                rule = rule._replace(rule_type='PROCESS-NAME', value=literal)
+        if rule.rule_type == 'PROCESS-NAME':
+            if rule.value not in seen:
+                seen.add(rule.value)
+                names.append(rule)
+        elif rule.rule_type in regexes:
+            regexes[rule.rule_type].append(rule)
+        else:
+            others.append(rule)
+
+    lines = ['payload:']
+    for rule in names + others:
+        suffix = f' #{rule.comment}' if rule.comment else ''
+        lines.append(f'- {rule.rule_type},{rule.value}{suffix}')
+    for rule_type, group in regexes.items():
+        if group:
+            lines.append(f'# 由 {len(group)} 条 {rule_type} 合并')
+            lines.extend(f'- {rule_type},{pattern}' for pattern in merge_regexes([rule.value for rule in group]))
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description='编译规则文件：合并正则并去除重复的精确规则')
+    parser.add_argument('yaml_path', nargs='?', default=os.path.join(ROOT_DIR, 'windows.yaml'),
+                        help='输入规则文件（默认 windows.yaml）')
+    parser.add_argument('-o', '--output', help='输出文件（默认写到输入文件旁的 *_optimized.yaml）')
+    args = parser.parse_args()
+
+    output = args.output or os.path.splitext(args.yaml_path)[0] + '_optimized.yaml'
+    rules = load_rules(args.yaml_path)
+    lines = compile_rules(rules)
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(lines) + '\n')
+
+    regex_count = sum(1 for rule in rules if rule.rule_type in REGEX_TYPES)
+    merged_count = sum(1 for line in lines if line.startswith('- ') and 'REGEX,' in line)
+    print(f'输入规则: {len(rules)} 条（正则 {regex_count} 条）')
+    print(f'输出规则: {sum(1 for line in lines if line.startswith("- "))} 条（正则 {merged_count} 条）')
+    print(f'已保存到 {output}')
+
+
+if __name__ == '__main__':
+    main()
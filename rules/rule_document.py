@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则文档模型
+把规则文件按 `# 分类` 注释切分为若干段，增删和移动条目只改动涉及的段，
+其余段的原始文本（注释、空行、顺序）原样保留。写回时先写临时文件再改名，保证原子性。
+"""
+
+import os
+import shutil
+import sys
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_parser import parse_rule_line, section_title
+
+# 新建段落和自动添加的条目使用的段名
+DEFAULT_SECTION = '其他热门游戏'
+
+
+class Section:
+    def __init__(self, title: Optional[str], lines: List[str]):
+        # title 为 None 表示第一个标题之前的内容（payload: 及未分类条目）
+        self.title = title
+        self.lines = lines
+        self.dirty = False
+
+    def entry_positions(self) -> List[int]:
+        return [i for i, line in enumerate(self.lines) if parse_rule_line(line)]
+
+    def insert_entry(self, line: str):
+        """插到本段最后一条规则之后；段内还没有规则时紧跟标题"""
+        positions = self.entry_positions()
+        if positions:
+            index = positions[-1] + 1
+        elif self.title is not None:
+            index = 1
+        else:
+            index = len(self.lines)
+        # 前一行可能是文件末尾没有换行的最后一行
+        if index > 0 and not self.lines[index - 1].endswith('\n'):
+            self.lines[index - 1] += '\n'
+        self.lines.insert(index, line + '\n')
+        self.dirty = True
+
+    def remove_line(self, index: int):
+        del self.lines[index]
+        self.dirty = True
+
+
+class RuleDocument:
+    def __init__(self, sections: List[Section], path: Optional[str] = None, case_insensitive: bool = False):
+        self.sections = sections
+        self.path = path
+        self.case_insensitive = case_insensitive
+        self._index: Dict[Tuple[str, str], Section] = {}
+        self._build_index()
+
+    def _build_index(self):
+        self._index = {}
+        for section in self.sections:
+            for line in section.lines:
+                rule = parse_rule_line(line)
+                if rule:
+                    self._index.setdefault(self._key(rule.rule_type, rule.value), section)
+
+    @classmethod
+    def load(cls, path: str, case_insensitive: bool = False) -> 'RuleDocument':
+        with open(path, 'r', encoding='utf-8', newline='') as f:
+            return cls.parse(f.readlines(), path, case_insensitive)
+
+    @classmethod
+    def parse(cls, lines: List[str], path: Optional[str] = None, case_insensitive: bool = False) -> 'RuleDocument':
+        sections = [Section(None, [])]
+        for line in lines:
+            title = section_title(line)
+            if title is not None:
+                sections.append(Section(title, [line]))
+            else:
+                sections[-1].lines.append(line)
+        return cls(sections, path, case_insensitive)
+
+    def _key(self, rule_type: str, value: str) -> Tuple[str, str]:
+        value = value.strip()
+        return rule_type, value.casefold() if self.case_insensitive else value
+
+    def __contains__(self, item: Tuple[str, str]) -> bool:
+        return self._key(*item) in self._index
+
+    def section(self, title: Optional[str]) -> Optional[Section]:
+        for section in self.sections:
+            if section.title == title:
+                return section
+        return None
+
+    def titles(self) -> List[Optional[str]]:
+        return [section.title for section in self.sections]
+
+    def _ensure_section(self, title: str) -> Section:
+        section = self.section(title)
+        if section is None:
+            last = self.sections[-1]
+            if last.lines and not last.lines[-1].endswith('\n'):
+                last.lines[-1] += '\n'
+            prefix = '' if not last.lines or last.lines[-1].strip() == '' else '\n'
+            section = Section(title, [f'{prefix}# {title}\n'])
+            section.dirty = True
+            self.sections.append(section)
+        return section
+
+    def add(self, rule_type: str, value: str, comment: str = '', title: str = DEFAULT_SECTION) -> bool:
+        """添加条目到标题为 title 的段，已存在时返回 False"""
+        key = self._key(rule_type, value)
+        if key in self._index:
+            return False
+        section = self._ensure_section(title)
+        suffix = f' #{comment}' if comment else ''
+        section.insert_entry(f'- {rule_type},{value}{suffix}')
+        self._index[key] = section
+        return True
+
+    def _locate(self, rule_type: str, value: str) -> Optional[Tuple[Section, int]]:
+        key = self._key(rule_type, value)
+        section = self._index.get(key)
+        if section is None:
+            return None
+        for i, line in enumerate(section.lines):
+            rule = parse_rule_line(line)
+            if rule and self._key(rule.rule_type, rule.value) == key:
+                return section, i
+        return None
+
+    def remove(self, rule_type: str, value: str) -> bool:
+        """删除条目，不存在时返回 False"""
+        found = self._locate(rule_type, value)
+        if found is None:
+            return False
+        section, index = found
+        section.remove_line(index)
+        del self._index[self._key(rule_type, value)]
+        return True
+
+    def remove_line_numbers(self, line_numbers: Iterable[int]) -> int:
+        """
+        按原文件行号（从1开始，即 Rule.line_no）删除规则行，返回删除的行数。
+        同一规则重复出现时可以精确删掉后面那条；须在其他修改之前调用，行号才与文件一致
+        """
+        drop = set(line_numbers)
+        removed = 0
+        line_no = 0
+        for section in self.sections:
+            kept = []
+            for line in section.lines:
+                line_no += 1
+                if line_no in drop and parse_rule_line(line):
+                    removed += 1
+                    continue
+                kept.append(line)
+            if len(kept) != len(section.lines):
+                section.lines = kept
+                section.dirty = True
+        if removed:
+            self._build_index()
+        return removed
+
+    def move(self, rule_type: str, value: str, title: str) -> bool:
+        """把条目移动到标题为 title 的段，保留其注释"""
+        found = self._locate(rule_type, value)
+        if found is None:
+            return False
+        section, index = found
+        if section.title == title:
+            return False
+        line = section.lines[index].rstrip('\r\n')
+        section.remove_line(index)
+        target = self._ensure_section(title)
+        target.insert_entry(line.strip())
+        self._index[self._key(rule_type, value)] = target
+        return True
+
+    def merge_names(self, games: Dict[str, str], title: str = DEFAULT_SECTION) -> List[str]:
+        """把尚不存在的 PROCESS-NAME 加入标题为 title 的段，返回新增的名字"""
+        added = []
+        for name, comment in games.items():
+            if self.add('PROCESS-NAME', name, comment, title):
+                added.append(name)
+        return added
+
+    @property
+    def dirty(self) -> bool:
+        return any(section.dirty for section in self.sections)
+
+    def render(self) -> str:
+        return ''.join(''.join(section.lines) for section in self.sections)
+
+    def save(self, path: Optional[str] = None) -> bool:
+        """
+        有改动时写回：未改动段落直接复用原始文本，整体写入同目录临时文件后原子替换。
+        没有改动时不写文件，返回 False。
+        """
+        path = path or self.path
+        if not self.dirty and path == self.path:
+            return False
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(prefix='.rules-', suffix='.tmp', dir=directory)
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(self.render())
+                f.flush()
+                os.fsync(f.fileno())
+            if os.path.exists(path):
+                shutil.copymode(path, tmp_path)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        for section in self.sections:
+            section.dirty = False
+        self.path = path
+        return True
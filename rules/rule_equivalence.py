@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则集等价性检查
+合并正则、去重、重排、分片等变换都可能悄悄改变匹配结果。这里对原规则文件和变换后的规则文件
+（可以是多个分片）用同一批输入分别求值，任何一个进程的归属不同即判为不等价并以非零状态退出。
+原规则用逐条求值的参考匹配器 RuleMatcher，变换后的规则用 CompiledRuleMatcher，
+编译器本身的错误也会表现为不一致，而不是在两边同时出现、互相抵消。
+
+输入由三部分组成：
+    两边规则中的全部精确名及其大小写变体
+    爬虫内置的游戏列表（GamePackageSpider.get_known_games / WindowsGameCollector.get_windows_games）
+    以正则中必含的字面量片段为种子随机生成的进程名和路径，以及对它们做增删改的近似样本
+"""
+
+import argparse
+import ast
+import os
+import random
+import string
+import sys
+import time
+from typing import Iterator, List, Optional, Set, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import REGEX_TYPES, CompiledRuleMatcher, RuleMatcher, extract_literal
+from rules.rule_parser import Rule, load_rules
+
+Query = Tuple[Optional[str], Optional[str]]
+
+# 内置游戏列表所在的源文件和函数，按源码读取，不需要安装爬虫依赖
+KNOWN_GAME_SOURCES = (
+    ('spider/game_package_spider.py', 'get_known_games'),
+    ('spider/windows_game_collector.py', 'get_windows_games'),
+)
+PATH_ROOTS = ['C:\\Program Files', 'D:\\Games', 'E:\\SteamLibrary\\steamapps\\common', 'C:\\Users\\player\\AppData\\Local']
+NAME_CHARS = string.ascii_letters + string.digits + '._- '
+
+
+def known_game_names() -> List[str]:
+    """读取爬虫源码中内置游戏字典的全部键"""
+    names = []
+    for rel_path, func_name in KNOWN_GAME_SOURCES:
+        with open(os.path.join(ROOT_DIR, rel_path), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), rel_path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.FunctionDef) and node.name == func_name:
+                for inner in ast.walk(node):
+                    if isinstance(inner, ast.Dict):
+                        names.extend(key.value for key in inner.keys
+                                     if isinstance(key, ast.Constant) and isinstance(key.value, str))
+    return names
+
+
+def _mutate(rng: random.Random, text: str) -> str:
+    if not text:
+        return rng.choice(NAME_CHARS)
+    i = rng.randrange(len(text))
+    roll = rng.random()
+    if roll < 0.3:
+        return text[:i] + text[i + 1:]
+    if roll < 0.6:
+        return text[:i] + rng.choice(NAME_CHARS) + text[i:]
+    if roll < 0.8:
+        return text[:i] + text[i].swapcase() + text[i + 1:]
+    return text[:i] + rng.choice(NAME_CHARS) + text[i + 1:]
+
+
+def _random_word(rng: random.Random, low: int = 1, high: int = 8) -> str:
+    return ''.join(rng.choice(NAME_CHARS) for _ in range(rng.randint(low, high)))
+
+
+def literal_seeds(rules: List[Rule]) -> Tuple[Set[str], Set[str]]:
+    """返回 (精确名, 正则中必含的字面量片段)"""
+    names, fragments = set(), set()
+    for rule in rules:
+        if rule.rule_type == 'PROCESS-NAME':
+            names.add(rule.value)
+        elif rule.rule_type in REGEX_TYPES:
+            literal = extract_literal(rule.value)
+            if literal:
+                fragments.add(literal)
+    return names, fragments
+
+
+def generate_queries(rules: List[Rule], fuzz: int, seed: int) -> Iterator[Query]:
+    names, fragments = literal_seeds(rules)
+    names.update(known_game_names())
+    rng = random.Random(seed)
+
+    # 全部已知名字及其大小写变体，有路径和无路径各一次
+    for name in sorted(names):
+        for variant in {name, name.lower(), name.upper(), name.swapcase()}:
+            yield variant, None
+            yield None, f'{rng.choice(PATH_ROOTS)}\\{_random_word(rng)}\\{variant}'
+
+    ordered_names = sorted(names)
+    ordered_fragments = sorted(fragments)
+    for _ in range(fuzz):
+        roll = rng.random()
+        if ordered_fragments and roll < 0.4:
+            # 把字面量片段嵌入随机名字或路径
+            fragment = rng.choice(ordered_fragments)
+            if rng.random() < 0.3:
+                fragment = _mutate(rng, fragment)
+            if '\\' in fragment or '/' in fragment:
+                yield None, f'{rng.choice(PATH_ROOTS)}{fragment}{_random_word(rng)}\\{_random_word(rng)}.exe'
+            else:
+                yield f'{_random_word(rng, 0, 6)}{fragment}{_random_word(rng, 0, 6)}', None
+        elif ordered_names and roll < 0.8:
+            name = rng.choice(ordered_names)
+            for _ in range(rng.randint(1, 3)):
+                name = _mutate(rng, name)
+            if rng.random() < 0.5:
+                yield name, None
+            else:
+                yield None, f'{rng.choice(PATH_ROOTS)}\\{_random_word(rng)}\\{name}'
+        else:
+            name = _random_word(rng, 3, 16) + rng.choice(['.exe', '', '.app', '.game'])
+            yield None, f'{rng.choice(PATH_ROOTS)}\\{_random_word(rng)}\\{name}'
+
+
+def check(original: List[Rule], transformed: List[Rule], ignore_case: bool, fuzz: int, seed: int,
+          max_reports: int = 20) -> Tuple[int, List[Tuple[Query, Optional[Rule], Optional[Rule]]]]:
+    """返回 (检查的输入数, 不一致的输入)"""
+    left = RuleMatcher(original, ignore_case=ignore_case)
+    right = CompiledRuleMatcher(transformed, ignore_case=ignore_case)
+    seen: Set[Query] = set()
+    mismatches = []
+    for query in generate_queries(original + transformed, fuzz, seed):
+        if query in seen:
+            continue
+        seen.add(query)
+        name, path = query
+        a = left.match(name=name, path=path)
+        b = right.match(name=name, path=path)
+        if (a is None) != (b is None):
+            mismatches.append((query, a, b))
+            if len(mismatches) >= max_reports:
+                break
+    return len(seen), mismatches
+
+
+def _describe(rule: Optional[Rule]) -> str:
+    return f'{rule.rule_type},{rule.value}' if rule else '未命中'
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查变换后的规则文件与原文件的匹配结果是否一致')
+    parser.add_argument('original', help='原规则文件')
+    parser.add_argument('transformed', nargs='+', help='变换后的规则文件，多个文件（分片）按并集计算')
+    parser.add_argument('--exact', action='store_true', help='区分大小写（Android 包名）；默认按 Windows 规则忽略大小写')
+    parser.add_argument('--fuzz', type=int, default=20000, help='随机生成的输入条数（默认2万）')
+    parser.add_argument('--seed', type=int, default=20240601)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    original = load_rules(args.original)
+    transformed = [rule for path in args.transformed for rule in load_rules(path)]
+    total, mismatches = check(original, transformed, not args.exact, args.fuzz, args.seed)
+    elapsed = time.perf_counter() - start
+
+    if mismatches:
+        print(f'不等价：发现 {len(mismatches)} 个结果不同的输入（已检查 {total} 个，{elapsed:.2f} 秒）')
+        for (name, path), a, b in mismatches:
+            print(f'  {name if name is not None else path!r}: 原文件 {_describe(a)}，变换后 {_describe(b)}')
+        sys.exit(1)
+    print(f'等价：{total} 个输入的匹配结果一致（{elapsed:.2f} 秒）')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+PROCESS-NAME 精确匹配索引
+Windows 进程名不区分大小写，按 casefold 归一化；Android 包名区分大小写，保持原样。
+索引为不可变哈希集合，提供 O(1) 成员判断；去重导出规则用模块级的 export_payload，不需要先建索引。
+"""
+
+import argparse
+import os
+import sys
+from typing import Dict, Iterable, Iterator, List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_document import RuleDocument
+from rules.rule_parser import iter_rules, parse_rule_line
+
+
+def normalize(name: str, case_insensitive: bool) -> str:
+    name = name.strip()
+    return name.casefold() if case_insensitive else name
+
+
+class RuleIndex:
+    def __init__(self, names: Iterable[str], case_insensitive: bool = False):
+        self.case_insensitive = case_insensitive
+        canonical: Dict[str, str] = {}
+        for name in names:
+            canonical.setdefault(self.normalize(name), name.strip())
+        # 保留首次出现的写法，用于导出
+        self._canonical = canonical
+        self._keys = frozenset(canonical)
+
+    @classmethod
+    def for_windows(cls, names: Iterable[str]) -> 'RuleIndex':
+        return cls(names, case_insensitive=True)
+
+    @classmethod
+    def for_android(cls, names: Iterable[str]) -> 'RuleIndex':
+        return cls(names, case_insensitive=False)
+
+    @classmethod
+    def from_rule_file(cls, yaml_path: str, case_insensitive: bool = False) -> 'RuleIndex':
+        """读取规则文件中全部 PROCESS-NAME 条目"""
+        names = (rule.value for rule in iter_rules(yaml_path) if rule.rule_type == 'PROCESS-NAME')
+        return cls(names, case_insensitive)
+
+    def normalize(self, name: str) -> str:
+        return normalize(name, self.case_insensitive)
+
+    def __contains__(self, name: str) -> bool:
+        return self.normalize(name) in self._keys
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._canonical.values())
+
+    def canonical(self, name: str) -> Optional[str]:
+        """返回索引中该名字首次出现时的写法"""
+        return self._canonical.get(self.normalize(name))
+
+
+def dedupe(games: Dict[str, str], case_insensitive: bool) -> Dict[str, str]:
+    """按归一化后的名字去重，保留首次出现的条目和顺序"""
+    result = {}
+    seen = set()
+    for name, game_name in games.items():
+        key = normalize(name, case_insensitive)
+        if key not in seen:
+            seen.add(key)
+            result[name] = game_name
+    return result
+
+
+def export_payload(games: Dict[str, str], case_insensitive: bool) -> str:
+    """按给定顺序导出去重后的 PROCESS-NAME 规则"""
+    rules = ["payload:"]
+    for name, game_name in dedupe(games, case_insensitive).items():
+        rules.append(f"- PROCESS-NAME,{name} #{game_name}")
+    return "\n".join(rules)
+
+
+def find_duplicate_lines(lines: List[str], case_insensitive: bool) -> List[int]:
+    """返回重复的 PROCESS-NAME 行号（从0开始），保留每个名字第一次出现的行"""
+    seen = set()
+    duplicates = []
+    for i, line in enumerate(lines):
+        rule = parse_rule_line(line)
+        if not rule or rule.rule_type != 'PROCESS-NAME':
+            continue
+        key = normalize(rule.value, case_insensitive)
+        if key in seen:
+            duplicates.append(i)
+        else:
+            seen.add(key)
+    return duplicates
+
+
+def main():
+    parser = argparse.ArgumentParser(description='检查并去除规则文件中重复的 PROCESS-NAME 条目')
+    parser.add_argument('yaml_path', help='规则文件')
+    parser.add_argument('--exact', action='store_true', help='区分大小写（Android 包名）；默认按 Windows 规则忽略大小写')
+    parser.add_argument('--write', action='store_true', help='直接删除重复行并写回文件')
+    args = parser.parse_args()
+
+    with open(args.yaml_path, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+    duplicates = find_duplicate_lines(lines, case_insensitive=not args.exact)
+    if not duplicates:
+        print('没有重复条目。')
+        return
+    for i in duplicates:
+        print(f'  第 {i + 1} 行: {lines[i].strip()}')
+    if args.write:
+        doc = RuleDocument.load(args.yaml_path, case_insensitive=not args.exact)
+        doc.remove_line_numbers(i + 1 for i in duplicates)
+        doc.save()
+        print(f'已从 {args.yaml_path} 删除 {len(duplicates)} 条重复规则')
+    else:
+        print(f'发现 {len(duplicates)} 条重复规则，使用 --write 删除')
+
+
+if __name__ == '__main__':
+    main()
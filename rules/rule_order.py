@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+按命中频率优化规则顺序
+mihomo 对 classical 规则集自上而下逐条求值，排在前面的规则越常命中，平均比较开销越低。
+根据命中画像（采样器输出、"TYPE,value" -> 次数 的JSON，或 mihomo 连接日志）把规则按
+命中概率 / 单条开销 从高到低排序：便宜的精确规则靠前，开销大的路径正则除非很热否则放最后。
+规则集对外只表示"是否属于该集合"，重排不改变任何进程的归属。
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import RuleMatcher
+from rules.rule_parser import Rule, load_rules
+
+# 单条规则的相对求值开销，精确比较记为1
+RULE_COSTS = {
+    'PROCESS-NAME': 1.0,
+    'PROCESS-NAME-REGEX': 5.0,
+    'PROCESS-PATH-REGEX': 10.0,
+}
+DEFAULT_COST = 1.0
+
+# mihomo 日志中源地址后括号里的进程名，例如 `127.0.0.1:50000(TslGame.exe) --> ...`
+_LOG_PROCESS = re.compile(r'\(([^()]+)\)\s+-->')
+
+RuleKey = Tuple[str, str]
+
+
+def rule_key(rule: Rule) -> RuleKey:
+    return rule.rule_type, rule.value
+
+
+def rule_cost(rule: Rule) -> float:
+    return RULE_COSTS.get(rule.rule_type, DEFAULT_COST)
+
+
+def load_hit_profile(profile_path: str, yaml_path: str) -> Counter:
+    """读取命中画像，返回 (类型, 值) -> 命中次数"""
+    with open(profile_path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    hits = Counter()
+    if 'rule_files' in data:
+        # 进程采样器的输出，按文件名找到对应的规则文件
+        name = os.path.basename(yaml_path)
+        for result in data['rule_files'].values():
+            if os.path.basename(result['path']) == name:
+                for entry in result['rules']:
+                    hits[(entry['type'], entry['value'])] += entry['hits']
+                return hits
+        raise ValueError(f'命中画像 {profile_path} 中没有 {name} 的数据')
+    for key, count in data.items():
+        rule_type, _, value = key.partition(',')
+        hits[(rule_type, value)] += int(count)
+    return hits
+
+
+def queries_from_log(log_path: str) -> Counter:
+    """从 mihomo 连接日志中取出进程名，返回 进程名 -> 连接次数"""
+    queries = Counter()
+    with open(log_path, 'r', encoding='utf-8', errors='replace') as f:
+        for line in f:
+            found = _LOG_PROCESS.search(line)
+            if found:
+                queries[found.group(1)] += 1
+    return queries
+
+
+def attribute_hits(rules: List[Rule], queries: Counter, ignore_case: bool) -> Counter:
+    """按逐条求值的语义，把每个查询记到给定顺序下第一条命中的规则上"""
+    matcher = RuleMatcher(rules, ignore_case=ignore_case)
+    hits = Counter()
+    for process, count in queries.items():
+        rule = matcher.match(name=process)
+        if rule is not None:
+            hits[rule_key(rule)] += count
+    return hits
+
+
+def expected_cost(rules: List[Rule], hits: Counter) -> float:
+    """
+    命中查询的平均比较开销：命中第 i 条规则需要求值前 i 条规则。
+    hits 必须是在这个顺序下统计的；重复的规则只有第一条会命中
+    """
+    seen = set()
+    total_hits = 0
+    prefix = 0.0
+    weighted = 0.0
+    for rule in rules:
+        prefix += rule_cost(rule)
+        key = rule_key(rule)
+        if key in seen:
+            continue
+        seen.add(key)
+        total_hits += hits[key]
+        weighted += hits[key] * prefix
+    return weighted / total_hits if total_hits else 0.0
+
+
+def replay_cost(rules: List[Rule], queries: Counter, ignore_case: bool) -> float:
+    """在给定顺序上重放查询，重新确定每个查询第一条命中的规则后计算平均开销"""
+    return expected_cost(rules, attribute_hits(rules, queries, ignore_case))
+
+
+def optimize_order(rules: List[Rule], hits: Counter) -> List[Rule]:
+    """
+    按 命中次数 / 开销 降序排列，使期望开销最小。
+    没有命中记录的规则按开销升序、原顺序排在后面。
+    """
+    order = {id(rule): i for i, rule in enumerate(rules)}
+    return sorted(rules, key=lambda rule: (-hits[rule_key(rule)] / rule_cost(rule), rule_cost(rule), order[id(rule)]))
+
+
+def render(rules: List[Rule], within_sections: bool) -> List[str]:
+    lines = ['payload:']
+    section = object()
+    for rule in rules:
+        if within_sections and rule.section != section:
+            section = rule.section
+            if section is not None:
+                lines.append('')
+                lines.append(f'# {section}')
+        suffix = f' #{rule.comment}' if rule.comment else ''
+        lines.append(f'- {rule.rule_type},{rule.value}{suffix}')
+    return lines
+
+
+def reorder(rules: List[Rule], hits: Counter, within_sections: bool) -> List[Rule]:
+    if not within_sections:
+        return optimize_order(rules, hits)
+    # 只在段内排序，段的先后保持不变
+    sections: Dict[Optional[str], List[Rule]] = {}
+    for rule in rules:
+        sections.setdefault(rule.section, []).append(rule)
+    return [rule for group in sections.values() for rule in optimize_order(group, hits)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按命中频率重排规则，减少逐条匹配的平均开销')
+    parser.add_argument('yaml_path', help='规则文件')
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--profile', help='命中画像JSON（process_sampler.py 输出或 "TYPE,value": 次数）')
+    source.add_argument('--log', help='mihomo 连接日志')
+    parser.add_argument('--exact', action='store_true', help='区分大小写（Android 包名），仅用于 --log')
+    parser.add_argument('--within-sections', action='store_true', help='只在各分类段内重排，保留分类结构')
+    parser.add_argument('-o', '--output', help='输出文件（默认写到输入文件旁的 *_ordered.yaml）')
+    args = parser.parse_args()
+
+    rules = load_rules(args.yaml_path)
+    queries = None
+    if args.profile:
+        hits = load_hit_profile(args.profile, args.yaml_path)
+    else:
+        queries = queries_from_log(args.log)
+        hits = attribute_hits(rules, queries, ignore_case=not args.exact)
+
+    ordered = reorder(rules, hits, args.within_sections)
+    output = args.output or os.path.splitext(args.yaml_path)[0] + '_ordered.yaml'
+    with open(output, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(render(ordered, args.within_sections)) + '\n')
+
+    fired = sum(1 for rule in rules if hits[rule_key(rule)])
+    before = expected_cost(rules, hits)
+    print(f'规则 {len(rules)} 条，其中 {fired} 条有命中记录，共 {sum(hits[key] for key in set(map(rule_key, rules)))} 次命中')
+    if queries is not None:
+        # 重排后可能由另一条规则先命中，需要重放查询重新归属
+        after = replay_cost(ordered, queries, ignore_case=not args.exact)
+        print(f'命中查询的平均开销: 重排前 {before:.2f}，重排后 {after:.2f}'
+              + (f'（降低 {(1 - after / before) * 100:.1f}%）' if before else ''))
+    else:
+        # 画像只记录了原顺序下的归属，没有原始查询；假设重排后仍由同一条规则先命中来预测
+        after = expected_cost(ordered, hits)
+        print(f'命中查询的平均开销: 重排前 {before:.2f}，预测重排后 {after:.2f}'
+              + (f'（降低 {(1 - after / before) * 100:.1f}%）' if before else ''))
+        print('  预测假设每个查询仍由原来那条规则先命中；用 --log 可重放查询得到准确值')
+    # 未命中的查询总要求值全部规则，开销与顺序无关
+    print(f'未命中查询的开销（与顺序无关）: {sum(rule_cost(rule) for rule in rules):.2f}')
+    print(f'已保存到 {output}')
+
+
+if __name__ == '__main__':
+    main()
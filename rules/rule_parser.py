@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则文件流式解析器
+逐行读取，一遍同时识别 `# 分类` 段标题和 `- TYPE,value #comment` 规则，不构建YAML文档树。
+统计、扫描器和爬虫共用这一个解析器；yaml.safe_load 会丢掉注释，分类信息因此无从获取。
+"""
+
+import re
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Union
+
+
+class Rule(NamedTuple):
+    rule_type: str
+    value: str
+    comment: str
+    line_no: int
+    # 规则所在段的标题，第一个标题之前为 None
+    section: Optional[str] = None
+
+
+class SectionHeader(NamedTuple):
+    title: str
+    line_no: int
+
+
+_COMMENT_SPLIT = re.compile(r'\s#')
+
+
+def section_title(line: str) -> Optional[str]:
+    """`# 射击类游戏` 这样的整行注释是段标题；`#- PROCESS-NAME,...` 是被注释掉的规则，不算"""
+    stripped = line.strip()
+    if not stripped.startswith('#'):
+        return None
+    title = stripped.lstrip('#').strip()
+    if not title or title.startswith('-'):
+        return None
+    return title
+
+
+def parse_rule_line(line: str, line_no: int = 0, section: Optional[str] = None) -> Optional[Rule]:
+    """解析一行 `- TYPE,value #comment`，非规则行返回 None"""
+    line = line.strip()
+    if not line.startswith('- '):
+        return None
+    rule_type, sep, rest = line[2:].partition(',')
+    if not sep:
+        return None
+    # 与YAML一致，只有前面带空白的 # 才是注释
+    parts = _COMMENT_SPLIT.split(rest, maxsplit=1)
+    value = parts[0].strip()
+    comment = parts[1].strip() if len(parts) > 1 else ''
+    # 值两侧的引号视为作者的引用写法，去掉后才是真正的正则
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '\'"':
+        value = value[1:-1]
+    return Rule(rule_type.strip(), value, comment, line_no, section)
+
+
+def tokenize(lines: Iterable[str]) -> Iterator[Union[SectionHeader, Rule]]:
+    """按顺序产出段标题和规则，其余行（payload:、空行、注释掉的规则）跳过"""
+    section = None
+    for line_no, line in enumerate(lines, 1):
+        first = line.lstrip()[:1]
+        if first == '-':
+            rule = parse_rule_line(line, line_no, section)
+            if rule:
+                yield rule
+        elif first == '#':
+            title = section_title(line)
+            if title is not None:
+                section = title
+                yield SectionHeader(title, line_no)
+
+
+def iter_rule_file(yaml_path: str) -> Iterator[Union[SectionHeader, Rule]]:
+    with open(yaml_path, 'r', encoding='utf-8') as f:
+        yield from tokenize(f)
+
+
+def iter_rules(yaml_path: str) -> Iterator[Rule]:
+    for token in iter_rule_file(yaml_path):
+        if isinstance(token, Rule):
+            yield token
+
+
+def load_rules(yaml_path: str) -> List[Rule]:
+    """按文件顺序读取规则文件中的全部规则"""
+    return list(iter_rules(yaml_path))
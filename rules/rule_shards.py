@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+规则集分片
+README 中每个平台只配置一个完整的规则集，每条连接都要比较全部规则。
+这里把 android.yaml / windows.yaml 按分类和规则类型（精确进程名、进程名正则、路径正则、域名）拆成多个分片，
+并生成对应的 mihomo rule-providers 配置片段，部署时只加载用得到的分片。
+"""
+
+import argparse
+import glob
+import os
+import sys
+from typing import Dict, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_parser import Rule, load_rules
+
+DEFAULT_OUTPUT_DIR = os.path.join(ROOT_DIR, 'shards')
+PLATFORMS = ('android', 'windows')
+
+# 分类标题 -> 分片文件名，文件名和 provider 名只用ASCII
+CATEGORY_SLUGS = {
+    'MOBA类游戏': 'moba',
+    '射击类游戏': 'shooter',
+    '大逃杀类游戏': 'battle-royale',
+    'RPG类游戏': 'rpg',
+    '沙盒建造类游戏': 'sandbox',
+    '竞速类游戏': 'racing',
+    '赛车类游戏': 'racing',
+    '策略类游戏': 'strategy',
+    '休闲益智类游戏': 'casual',
+    '模拟类游戏': 'simulation',
+    '模拟经营类游戏': 'simulation',
+    '动作冒险类游戏': 'action',
+    '体育类游戏': 'sports',
+    '体育竞技类游戏': 'sports',
+    '卡牌类游戏': 'card',
+    '音乐类游戏': 'music',
+    'IO类游戏': 'io',
+    'AR/VR类游戏': 'ar-vr',
+    '其他热门游戏': 'other',
+    '游戏公司正则匹配': 'publisher',
+    '自动扫描添加': 'auto-scan',
+}
+# 文件开头 `# === ... ===` 横幅下的通用规则（如 Steam 目录）
+GENERAL_SLUG = 'general'
+
+TYPE_SLUGS = {
+    'PROCESS-NAME': 'name',
+    'PROCESS-NAME-REGEX': 'name-regex',
+    'PROCESS-PATH-REGEX': 'path-regex',
+}
+DOMAIN_SLUG = 'domain'
+
+
+def category_slug(section: Optional[str], unknown: Dict[str, str]) -> str:
+    if section is None or section.startswith('==='):
+        return GENERAL_SLUG
+    if section in CATEGORY_SLUGS:
+        return CATEGORY_SLUGS[section]
+    # 未登记的分类按出现顺序编号，并在输出中提示
+    return unknown.setdefault(section, f'category-{len(unknown) + 1}')
+
+
+def type_slug(rule_type: str) -> Optional[str]:
+    if rule_type in TYPE_SLUGS:
+        return TYPE_SLUGS[rule_type]
+    if rule_type.startswith('DOMAIN') or rule_type.startswith('IP-CIDR'):
+        return DOMAIN_SLUG
+    return None
+
+
+def split_rules(rules: List[Rule], unknown: Dict[str, str]) -> Dict[Tuple[str, str], List[Rule]]:
+    """按 (分类, 类型) 分组，组内保持原顺序"""
+    shards: Dict[Tuple[str, str], List[Rule]] = {}
+    for rule in rules:
+        kind = type_slug(rule.rule_type)
+        if kind is None:
+            print(f'跳过无法归类的规则（第 {rule.line_no} 行）: {rule.rule_type},{rule.value}')
+            continue
+        shards.setdefault((category_slug(rule.section, unknown), kind), []).append(rule)
+    return shards
+
+
+def render_shard(rules: List[Rule]) -> str:
+    lines = ['payload:']
+    for rule in rules:
+        suffix = f' #{rule.comment}' if rule.comment else ''
+        lines.append(f'- {rule.rule_type},{rule.value}{suffix}')
+    return '\n'.join(lines) + '\n'
+
+
+def provider_name(platform: str, category: str, kind: str) -> str:
+    return f'{platform}-game-{category}-{kind}'
+
+
+def render_providers(entries: List[Tuple[str, str, int]], base_url: Optional[str], policy: str, interval: int) -> str:
+    """
+    生成 rule-providers 和 rules 配置片段，entries 为 (provider名, 相对路径, 条数)。
+    分片不随仓库发布：给出 base_url（自行托管分片的地址）时生成 http provider，
+    否则生成读取本地文件的 file provider，需把分片目录复制到 mihomo 配置目录下的 shards/
+    """
+    lines = ['rule-providers:']
+    for name, rel_path, count in entries:
+        lines.append(f'  {name}:  # {count} 条')
+        if base_url:
+            lines.extend([
+                '    type: http',
+                '    behavior: classical',
+                f'    url: {base_url.rstrip("/")}/{rel_path}',
+                f'    path: ./rule_providers/{name}.yaml',
+                f'    interval: {interval}',
+            ])
+        else:
+            lines.extend([
+                '    type: file',
+                '    behavior: classical',
+                f'    path: ./shards/{rel_path}',
+            ])
+    lines.append('')
+    lines.append('rules:')
+    lines.append('  # 删掉用不到的分片；精确进程名分片开销最低，放在正则分片之前')
+    for name, _, _ in entries:
+        lines.append(f'  - RULE-SET,{name},{policy}')
+    return '\n'.join(lines) + '\n'
+
+
+def generate(platforms: List[str], output_dir: str, base_url: Optional[str], policy: str, interval: int) -> List[Tuple[str, str, int]]:
+    entries = []
+    for platform in platforms:
+        rules = load_rules(os.path.join(ROOT_DIR, f'{platform}.yaml'))
+        unknown: Dict[str, str] = {}
+        shards = split_rules(rules, unknown)
+        for section, slug in unknown.items():
+            print(f'[{platform}] 未登记的分类 "{section}" 使用文件名 {slug}')
+
+        platform_dir = os.path.join(output_dir, platform)
+        os.makedirs(platform_dir, exist_ok=True)
+        # 分片目录由本工具生成，先清掉上次的分片，避免分类改名后留下旧文件
+        for stale in glob.glob(os.path.join(platform_dir, '*.yaml')):
+            os.remove(stale)
+
+        # 精确进程名分片在前，正则分片在后
+        kind_order = list(TYPE_SLUGS.values()) + [DOMAIN_SLUG]
+        for (category, kind), group in sorted(shards.items(), key=lambda item: (kind_order.index(item[0][1]), item[0][0])):
+            rel_path = f'{platform}/{category}-{kind}.yaml'
+            with open(os.path.join(output_dir, rel_path), 'w', encoding='utf-8') as f:
+                f.write(render_shard(group))
+            entries.append((provider_name(platform, category, kind), rel_path, len(group)))
+
+    with open(os.path.join(output_dir, 'providers.yaml'), 'w', encoding='utf-8') as f:
+        f.write(render_providers(entries, base_url, policy, interval))
+    return entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='按分类和规则类型拆分规则集，并生成 mihomo 配置片段')
+    parser.add_argument('--platform', choices=PLATFORMS, action='append', help='只处理指定平台，可重复（默认全部）')
+    parser.add_argument('-o', '--output-dir', default=DEFAULT_OUTPUT_DIR, help='分片输出目录（默认 shards/）')
+    parser.add_argument('--base-url', help='分片自行托管后的URL前缀；不指定时生成读取本地分片的 file provider')
+    parser.add_argument('--policy', default='GAME', help='rules 片段中使用的策略组名')
+    parser.add_argument('--interval', type=int, default=86400, help='provider 更新间隔（秒）')
+    args = parser.parse_args()
+
+    entries = generate(args.platform or list(PLATFORMS), args.output_dir, args.base_url, args.policy, args.interval)
+    for name, rel_path, count in entries:
+        print(f'  {name:<40} {count:>4} 条  {rel_path}')
+    print(f'已生成 {len(entries)} 个分片，配置片段见 {os.path.join(args.output_dir, "providers.yaml")}')
+
+
+if __name__ == '__main__':
+    main()
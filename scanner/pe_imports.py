@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轻量PE导入表读取
+通过 mmap 只访问 DOS/NT 头、节表和导入目录所在的页，不把整个可执行文件读入内存。
+游戏主程序常有几百MB，通过网络共享扫描时差别尤其明显。
+"""
+
+import mmap
+import os
+import struct
+from typing import List, Tuple
+
+PE32_MAGIC = 0x10b
+PE32_PLUS_MAGIC = 0x20b
+IMAGE_DIRECTORY_ENTRY_IMPORT = 1
+
+# 防御畸形文件的上限
+MAX_DESCRIPTORS = 4096
+MAX_THUNKS = 65536
+MAX_NAME_LENGTH = 512
+
+
+class PEFormatError(ValueError):
+    """文件不是可解析的PE，或结构损坏"""
+
+
+def _read_cstring(mm: mmap.mmap, offset: int) -> str:
+    if offset < 0 or offset >= len(mm):
+        raise PEFormatError(f'字符串偏移越界: {offset:#x}')
+    end = mm.find(b'\0', offset, offset + MAX_NAME_LENGTH)
+    if end < 0:
+        raise PEFormatError(f'字符串未结束: {offset:#x}')
+    return mm[offset:end].decode(errors='ignore')
+
+
+def _parse_imports(mm: mmap.mmap) -> List[Tuple[str, List[str]]]:
+    size = len(mm)
+    if size < 0x40 or mm[0:2] != b'MZ':
+        raise PEFormatError('缺少MZ头')
+    e_lfanew, = struct.unpack_from('<I', mm, 0x3C)
+    if e_lfanew + 24 > size or mm[e_lfanew:e_lfanew + 4] != b'PE\0\0':
+        raise PEFormatError('缺少PE签名')
+
+    num_sections, = struct.unpack_from('<H', mm, e_lfanew + 6)
+    opt_size, = struct.unpack_from('<H', mm, e_lfanew + 20)
+    opt = e_lfanew + 24
+    magic, = struct.unpack_from('<H', mm, opt)
+    if magic == PE32_MAGIC:
+        rva_count_offset, thunk_format, ordinal_flag = opt + 92, '<I', 1 << 31
+    elif magic == PE32_PLUS_MAGIC:
+        rva_count_offset, thunk_format, ordinal_flag = opt + 108, '<Q', 1 << 63
+    else:
+        raise PEFormatError(f'未知的可选头类型: {magic:#x}')
+    thunk_size = struct.calcsize(thunk_format)
+
+    rva_count, = struct.unpack_from('<I', mm, rva_count_offset)
+    if rva_count <= IMAGE_DIRECTORY_ENTRY_IMPORT:
+        return []
+    import_rva, _ = struct.unpack_from('<II', mm, rva_count_offset + 4 + IMAGE_DIRECTORY_ENTRY_IMPORT * 8)
+    if import_rva == 0:
+        return []
+
+    sections = []
+    section_table = opt + opt_size
+    for i in range(num_sections):
+        _, virtual_size, virtual_address, raw_size, raw_pointer = struct.unpack_from('<8sIIII', mm, section_table + i * 40)
+        sections.append((virtual_address, max(virtual_size, raw_size), raw_pointer))
+
+    def rva_to_offset(rva: int) -> int:
+        for virtual_address, span, raw_pointer in sections:
+            if virtual_address <= rva < virtual_address + span:
+                return rva - virtual_address + raw_pointer
+        raise PEFormatError(f'RVA不在任何节中: {rva:#x}')
+
+    imports = []
+    descriptor = rva_to_offset(import_rva)
+    for _ in range(MAX_DESCRIPTORS):
+        if descriptor + 20 > size:
+            raise PEFormatError('导入描述符越界')
+        original_thunk, _, _, name_rva, first_thunk = struct.unpack_from('<IIIII', mm, descriptor)
+        if not (original_thunk or name_rva or first_thunk):
+            break
+        descriptor += 20
+        dll = _read_cstring(mm, rva_to_offset(name_rva))
+
+        names = []
+        thunk = rva_to_offset(original_thunk or first_thunk)
+        for _ in range(MAX_THUNKS):
+            if thunk + thunk_size > size:
+                raise PEFormatError('导入thunk越界')
+            value, = struct.unpack_from(thunk_format, mm, thunk)
+            if value == 0:
+                break
+            thunk += thunk_size
+            if value & ordinal_flag:
+                continue
+            # IMAGE_IMPORT_BY_NAME: 2字节Hint后是函数名
+            names.append(_read_cstring(mm, rva_to_offset(value & 0x7FFFFFFF) + 2))
+        imports.append((dll, names))
+    return imports
+
+
+def read_imports(filepath: str) -> List[Tuple[str, List[str]]]:
+    """
+    返回 [(dll名, [导入函数名, ...]), ...]，按序号导入的函数不含名字被跳过。
+    文件结构无法解析时抛出 PEFormatError，调用方可以换用 pefile 重试。
+    """
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            raise PEFormatError('空文件')
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            try:
+                return _parse_imports(mm)
+            except struct.error as e:
+                raise PEFormatError(str(e)) from e
@@ -3,46 +3,209 @@
 """
 扫描指定目录下的可联网可执行文件，并将其进程名自动加入 windows.yaml 规则文件。
 """
+import argparse
 import os
+import sys
+import time
 import yaml
-import pefile
 import socket
 import struct
-from typing import List, Set
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Iterator, List, Optional, Set, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.instrumentation import add_arguments as add_metrics_arguments, configure as configure_metrics, metrics
+from rules.rule_document import RuleDocument
+from pe_imports import PEFormatError, read_imports
+from scan_cache import ScanCache, ScanRecord, quick_hash
+from scan_ignore import IgnoreMatcher
+from scan_watch import create_watcher, fall_back_to_polling
+
+try:
+    import pefile
+except ImportError:  # 只在内置解析器处理不了的畸形文件上使用
+    pefile = None
+
+# 自动添加的进程名放在这一段
+AUTO_SECTION = '自动扫描添加'
 
 def is_exe_file(filepath: str) -> bool:
     return filepath.lower().endswith('.exe') and os.path.isfile(filepath)
 
-def check_internet_access(filepath: str) -> bool:
+def read_imports_with_pefile(filepath: str) -> List[Tuple[str, List[str]]]:
     """
-    检查exe文件是否有联网行为（简单静态分析：查找常见socket相关API导入）
+    用 pefile 读取导入表，作为畸形文件的后备方案
     """
+    if pefile is None:
+        return []
     try:
         pe = pefile.PE(filepath, fast_load=True)
         pe.parse_data_directories(directories=[pefile.DIRECTORY_ENTRY['IMAGE_DIRECTORY_ENTRY_IMPORT']])
-        if hasattr(pe, 'DIRECTORY_ENTRY_IMPORT'):
-            for entry in pe.DIRECTORY_ENTRY_IMPORT:
-                dll = entry.dll.decode(errors='ignore').lower()
-                if 'ws2_32' in dll or 'wininet' in dll or 'winhttp' in dll:
-                    return True
-                for imp in entry.imports:
-                    if imp.name:
-                        name = imp.name.decode(errors='ignore').lower()
-                        if any(api in name for api in ['socket', 'connect', 'send', 'recv', 'inet', 'http', 'url', 'gethost']):
-                            return True
-        return False
+        imports = []
+        for entry in getattr(pe, 'DIRECTORY_ENTRY_IMPORT', []):
+            names = [imp.name.decode(errors='ignore') for imp in entry.imports if imp.name]
+            imports.append((entry.dll.decode(errors='ignore'), names))
+        return imports
     except Exception:
-        return False
+        return []
+
+def analyze_imports(filepath: str) -> Tuple[bool, List[str]]:
+    """
+    检查exe文件是否有联网行为（简单静态分析：查找常见socket相关API导入），
+    同时返回导入的DLL列表
+    """
+    try:
+        imports = read_imports(filepath)
+    except PEFormatError:
+        imports = read_imports_with_pefile(filepath)
+    except OSError:
+        return False, []
+
+    has_network = False
+    dlls = []
+    for dll, names in imports:
+        dll = dll.lower()
+        dlls.append(dll)
+        if has_network:
+            continue
+        if 'ws2_32' in dll or 'wininet' in dll or 'winhttp' in dll:
+            has_network = True
+            continue
+        for name in names:
+            name = name.lower()
+            if any(api in name for api in ['socket', 'connect', 'send', 'recv', 'inet', 'http', 'url', 'gethost']):
+                has_network = True
+                break
+    return has_network, dlls
+
+def check_internet_access(filepath: str) -> bool:
+    """
+    检查exe文件是否有联网行为
+    """
+    return analyze_imports(filepath)[0]
+
+def analyze_executable(filepath: str, size: int, mtime_ns: int, timings: Optional[List[float]] = None) -> ScanRecord:
+    """
+    进程池中执行的完整分析：导入表检查加快速哈希，结果可直接写入扫描缓存。
+    传入 timings 时追加导入表解析和快速哈希各自的耗时
+    """
+    start = time.perf_counter() if timings is not None else 0.0
+    has_network, dlls = analyze_imports(filepath)
+    if timings is not None:
+        parsed = time.perf_counter()
+        timings.append(parsed - start)
+    try:
+        digest = quick_hash(filepath, size)
+    except OSError:
+        digest = ''
+    if timings is not None:
+        timings.append(time.perf_counter() - parsed)
+    return ScanRecord(filepath, size, mtime_ns, digest, has_network, tuple(dlls))
+
+def analyze_executable_timed(filepath: str, size: int, mtime_ns: int) -> Tuple[ScanRecord, float, float]:
+    """
+    调用 analyze_executable 并返回导入表解析和快速哈希的耗时。
+    工作进程中的计时无法直接汇总，由主进程收到结果后记录
+    """
+    timings = []
+    record = analyze_executable(filepath, size, mtime_ns, timings)
+    return record, timings[0], timings[1]
+
+def iter_exe_files(scan_dir: str, ignore: Optional[IgnoreMatcher] = None) -> Iterator[str]:
+    """
+    用 os.scandir 流式遍历目录，边遍历边产出exe路径，不预先收集整棵目录树。
+    传入忽略规则时，匹配的目录整棵跳过，不再进入。
+    """
+    stack = [(scan_dir, '')]
+    while stack:
+        current, rel_dir = stack.pop()
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if ignore is None or not ignore.skip_dir(rel_path):
+                                stack.append((entry.path, rel_path))
+                        elif entry.name.lower().endswith('.exe') and entry.is_file():
+                            if ignore is None or not ignore.skip_file(rel_path):
+                                yield entry.path
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+def iter_scan_records(scan_dir: str, workers: Optional[int] = None, max_pending: Optional[int] = None,
+                      cache: Optional[ScanCache] = None,
+                      ignore: Optional[IgnoreMatcher] = None) -> Iterator[ScanRecord]:
+    """
+    扫描目录下所有exe文件，用进程池并行做导入表检查，逐个产出分析结果（顺序不固定）。
+    提交队列有上限，遍历速度不会让待分析的任务无限堆积。
+    传入缓存时，大小和修改时间未变的文件直接使用缓存结果，不再解析。
+    """
+    workers = workers or os.cpu_count() or 1
+    max_pending = max_pending or workers * 4
+    pending = {}
+    timed = metrics.enabled
+
+    def collect(done):
+        for future in done:
+            pending.pop(future)
+            if timed:
+                record, parse_seconds, hash_seconds = future.result()
+                metrics.record('scanner.pe_parse', parse_seconds)
+                metrics.record('scanner.hash', hash_seconds)
+            else:
+                record = future.result()
+            if cache is not None:
+                cache.put(record)
+            yield record
+
+    analyze = analyze_executable_timed if timed else analyze_executable
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path in metrics.timed_iter('scanner.walk', iter_exe_files(scan_dir, ignore)):
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            if cache is not None:
+                record = cache.get(path, st.st_size, st.st_mtime_ns)
+                if record is not None:
+                    metrics.count('scanner.cache_hits')
+                    yield record
+                    continue
+            if len(pending) >= max_pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                yield from collect(done)
+            pending[pool.submit(analyze, path, st.st_size, st.st_mtime_ns)] = path
+        yield from collect(wait(pending).done)
+
+    if cache is not None:
+        with metrics.timer('scanner.cache_flush'):
+            cache.flush()
 
-def scan_executables_with_internet_access(scan_dir: str) -> Set[str]:
+def scan_executables_with_internet_access(scan_dir: str, workers: Optional[int] = None,
+                                          max_pending: Optional[int] = None,
+                                          cache: Optional[ScanCache] = None,
+                                          ignore: Optional[IgnoreMatcher] = None) -> Set[str]:
     """
-    扫描目录下所有exe文件，返回进程名集合（仅后缀判断）
+    扫描目录下所有exe文件，返回可联网的进程名集合
     """
     result = set()
-    for root, _, files in os.walk(scan_dir):
-        for file in files:
-            if is_exe_file(os.path.join(root, file)):
-                result.add(file)
+    scanned = 0
+    for record in iter_scan_records(scan_dir, workers, max_pending, cache, ignore):
+        scanned += 1
+        if record.has_network:
+            result.add(os.path.basename(record.path))
+
+    if cache is not None:
+        print(f'缓存命中 {cache.hits} 个，重新分析 {cache.misses} 个')
+    if ignore is not None:
+        print(f'按忽略规则跳过 {ignore.skipped_dirs} 个目录、{ignore.skipped_files} 个exe')
+    print(f'共扫描 {scanned} 个exe，其中 {len(result)} 个进程名可联网')
     return result
 
 def load_windows_yaml(yaml_path: str) -> List[str]:
@@ -55,42 +218,119 @@ def save_windows_yaml(yaml_path: str, lines: List[str]):
         f.writelines(lines)
 
 def update_windows_yaml_with_new_processes(yaml_path: str, new_processes: Set[str]):
-    lines = load_windows_yaml(yaml_path)
-    existing = set()
-    for line in lines:
-        if line.strip().startswith('- PROCESS-NAME,'):
-            proc = line.split(',')[1].split('#')[0].strip()
-            existing.add(proc)
-    to_add = [p for p in new_processes if p not in existing]
+    # Windows 进程名不区分大小写，只差大小写的视为已存在
+    doc = RuleDocument.load(yaml_path, case_insensitive=True)
+    # 加入“自动扫描添加”段，其余段落保持原样
+    to_add = doc.merge_names({p: AUTO_SECTION for p in sorted(new_processes)}, AUTO_SECTION)
     if not to_add:
         print('没有新进程需要添加。')
         return
-    # 在文件末尾添加
-    with open(yaml_path, 'a', encoding='utf-8') as f:
-        for proc in to_add:
-            f.write(f'- PROCESS-NAME,{proc} #自动扫描添加\n')
+    doc.save()
     print(f'已添加 {len(to_add)} 个新进程到 {yaml_path}')
 
+def analyze_changed(paths, cache: Optional[ScanCache] = None) -> Set[str]:
+    """分析监视到的exe，返回其中可联网的进程名"""
+    found = set()
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        record = cache.get(path, st.st_size, st.st_mtime_ns) if cache is not None else None
+        if record is None:
+            record = analyze_executable(path, st.st_size, st.st_mtime_ns)
+            if cache is not None:
+                cache.put(record)
+        if record.has_network:
+            found.add(os.path.basename(path))
+    if cache is not None:
+        cache.flush()
+    return found
+
+def watch_and_update(roots: List[str], yaml_path: str, debounce: float = 5.0, poll_interval: float = 30.0,
+                     cache: Optional[ScanCache] = None, force_polling: bool = False,
+                     ignore: Optional[IgnoreMatcher] = None):
+    """
+    持续监视游戏库目录，新写入或被替换的exe在事件平静 debounce 秒后一起分析，
+    可联网的进程名成批写入 windows.yaml
+    """
+    watcher = create_watcher(roots, lambda root: iter_exe_files(root, ignore), poll_interval, force_polling, ignore)
+    print(f'正在监视（{watcher.backend}）: {", ".join(roots)}，按 Ctrl+C 停止')
+    pending = {}
+    try:
+        while True:
+            timeout = debounce if pending else None
+            try:
+                changed = watcher.events(timeout)
+            except OSError as e:
+                if watcher.backend == 'polling':
+                    raise
+                watcher, changed = fall_back_to_polling(watcher, e, poll_interval)
+            now = time.monotonic()
+            for path in changed:
+                # inotify 事件不经过遍历，需要单独检查是否位于被忽略的子树中
+                if ignore is not None and ignore.skips_event(roots, path):
+                    continue
+                pending[path] = now
+            if pending and time.monotonic() - max(pending.values()) >= debounce:
+                paths = sorted(pending)
+                pending.clear()
+                found = analyze_changed(paths, cache)
+                print(f'检测到 {len(paths)} 个新的或更新的exe，其中 {len(found)} 个可联网')
+                if found:
+                    update_windows_yaml_with_new_processes(yaml_path, found)
+    except KeyboardInterrupt:
+        print('\n停止监视。')
+    finally:
+        watcher.close()
+
 def main():
-    # 交互输入路径
-    scan_dir = input('请输入要扫描的目录路径: ').strip()
-    if not scan_dir:
-        print('未输入目录，退出。')
-        return
-    scan_dir = os.path.abspath(scan_dir)
+    parser = argparse.ArgumentParser(description='扫描目录下可联网的exe并加入 windows.yaml')
+    parser.add_argument('dirs', nargs='*', help='要扫描的目录；不指定时交互输入')
+    parser.add_argument('--watch', action='store_true', help='扫描后持续监视目录，新安装的游戏自动加入规则')
+    parser.add_argument('--debounce', type=float, default=5.0, help='监视模式下事件平静多少秒后再分析（默认5秒）')
+    parser.add_argument('--poll-interval', type=float, default=30.0, help='无法使用 inotify 时的轮询间隔（默认30秒）')
+    parser.add_argument('--poll', action='store_true', help='强制使用轮询')
+    parser.add_argument('--ignore-dir', action='append', default=[], help='额外忽略的目录通配符，可重复，如 Tools 或 Engine/Plugins')
+    parser.add_argument('--ignore-file', action='append', default=[], help='额外忽略的exe通配符，可重复，如 *Setup*.exe')
+    parser.add_argument('--no-default-ignore', action='store_true', help='不使用内置的运行库/反作弊/崩溃上报忽略规则')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args)
+
+    scan_dirs = args.dirs
+    if not scan_dirs:
+        # 交互输入路径
+        scan_dir = input('请输入要扫描的目录路径: ').strip()
+        if not scan_dir:
+            print('未输入目录，退出。')
+            return
+        scan_dirs = [scan_dir]
+    scan_dirs = [os.path.abspath(d) for d in scan_dirs]
     yaml_path = os.path.abspath(os.path.join(os.path.dirname(__file__), '../windows.yaml'))
 
-    print(f'扫描目录: {scan_dir}')
+    print(f'扫描目录: {", ".join(scan_dirs)}')
     print(f'规则文件: {yaml_path}')
 
-    found = scan_executables_with_internet_access(scan_dir)
-    if not found:
-        print('未发现exe文件。')
-        return
-    print(f'发现 {len(found)} 个exe:')
-    for p in found:
-        print('  ', p)
-    update_windows_yaml_with_new_processes(yaml_path, found)
+    if args.no_default_ignore:
+        ignore = IgnoreMatcher(args.ignore_dir, args.ignore_file)
+    else:
+        ignore = IgnoreMatcher.default(args.ignore_dir, args.ignore_file)
+
+    with ScanCache() as cache:
+        found = set()
+        for scan_dir in scan_dirs:
+            ignore.reset()
+            found |= scan_executables_with_internet_access(scan_dir, cache=cache, ignore=ignore)
+        if not found:
+            print('未发现可联网的exe文件。')
+        else:
+            print(f'发现 {len(found)} 个可联网的exe:')
+            for p in found:
+                print('  ', p)
+            update_windows_yaml_with_new_processes(yaml_path, found)
+        if args.watch:
+            watch_and_update(scan_dirs, yaml_path, args.debounce, args.poll_interval, cache, args.poll, ignore)
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+exe扫描缓存
+以路径为键记录 (大小, 修改时间, 快速哈希, 是否联网, 导入的DLL)，
+重复扫描同一个游戏库时，大小和修改时间都没变的文件直接复用上次的分析结果。
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import NamedTuple, Optional, Tuple
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scan_cache.sqlite3')
+
+# 快速哈希只读取文件首尾各一段
+QUICK_HASH_CHUNK = 64 * 1024
+
+
+class ScanRecord(NamedTuple):
+    path: str
+    size: int
+    mtime_ns: int
+    quick_hash: str
+    has_network: bool
+    dlls: Tuple[str, ...]
+
+
+def quick_hash(filepath: str, size: Optional[int] = None) -> str:
+    """文件大小加首尾各64KB的blake2b摘要，足以区分被替换的可执行文件"""
+    if size is None:
+        size = os.path.getsize(filepath)
+    digest = hashlib.blake2b(str(size).encode(), digest_size=16)
+    with open(filepath, 'rb') as f:
+        digest.update(f.read(QUICK_HASH_CHUNK))
+        if size > QUICK_HASH_CHUNK:
+            f.seek(max(size - QUICK_HASH_CHUNK, QUICK_HASH_CHUNK))
+            digest.update(f.read(QUICK_HASH_CHUNK))
+    return digest.hexdigest()
+
+
+class ScanCache:
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH):
+        self.db_path = db_path
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(db_path)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS scan_cache ('
+            ' path TEXT PRIMARY KEY,'
+            ' size INTEGER NOT NULL,'
+            ' mtime_ns INTEGER NOT NULL,'
+            ' quick_hash TEXT NOT NULL,'
+            ' has_network INTEGER NOT NULL,'
+            ' dlls TEXT NOT NULL)'
+        )
+
+    def get(self, path: str, size: int, mtime_ns: int) -> Optional[ScanRecord]:
+        """大小和修改时间都一致时返回缓存记录，否则返回 None"""
+        row = self._conn.execute(
+            'SELECT quick_hash, has_network, dlls FROM scan_cache WHERE path = ? AND size = ? AND mtime_ns = ?',
+            (path, size, mtime_ns),
+        ).fetchone()
+        if row is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return ScanRecord(path, size, mtime_ns, row[0], bool(row[1]), tuple(json.loads(row[2])))
+
+    def put(self, record: ScanRecord):
+        self._conn.execute(
+            'INSERT OR REPLACE INTO scan_cache VALUES (?, ?, ?, ?, ?, ?)',
+            (record.path, record.size, record.mtime_ns, record.quick_hash,
+             int(record.has_network), json.dumps(list(record.dlls))),
+        )
+
+    def flush(self):
+        self._conn.commit()
+
+    def close(self):
+        self._conn.commit()
+        self._conn.close()
+
+    def __enter__(self) -> 'ScanCache':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
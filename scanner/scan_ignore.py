@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描忽略规则
+游戏库中大量目录只放运行库、反作弊、崩溃上报和引擎第三方组件，从不包含游戏本体。
+目录和文件的通配符分别编译成一条正则，遍历时直接剪掉匹配的子树，不再进入、也不解析其中的exe。
+不含 / 的模式匹配名字，含 / 的模式匹配相对扫描根目录的路径结尾。Windows 路径不区分大小写。
+"""
+
+import os
+import re
+from typing import Iterable, List, Optional, Pattern
+
+DEFAULT_IGNORE_DIRS = [
+    '_CommonRedist',
+    'CommonRedist',
+    'Redist',
+    'Redistributables',
+    'DirectX',
+    'vcredist*',
+    'VC_redist*',
+    'dotNetFx*',
+    'PhysX',
+    'EasyAntiCheat',
+    'BattlEye',
+    'CrashReport*',
+    'CrashHandler*',
+    '__Installer',
+    'Installers',
+    'Engine/Binaries/ThirdParty',
+    'Engine/Extras',
+    'steamapps/shadercache',
+    'steamapps/downloading',
+    'steamapps/temp',
+]
+
+DEFAULT_IGNORE_FILES = [
+    'unins*.exe',
+    'vcredist*.exe',
+    'vc_redist*.exe',
+    'dxsetup.exe',
+    'dotNetFx*.exe',
+    'oalinst.exe',
+    'UE4PrereqSetup*.exe',
+    'UEPrereqSetup*.exe',
+    'CrashReportClient*.exe',
+    'crashpad_handler.exe',
+    'UnityCrashHandler*.exe',
+    'EasyAntiCheat*.exe',
+    'BEService*.exe',
+]
+
+
+def _translate(pattern: str) -> str:
+    """通配符转正则：* 和 ? 不跨越 /，[...] 原样保留"""
+    out = []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if c == '*':
+            out.append('[^/]*')
+        elif c == '?':
+            out.append('[^/]')
+        elif c == '[' and ']' in pattern[i + 2:]:
+            end = pattern.index(']', i + 2)
+            body = pattern[i + 1:end].replace('\\', '\\\\')
+            if body.startswith('!'):
+                body = '^' + body[1:]
+            elif body.startswith('^'):
+                body = '\\' + body
+            out.append(f'[{body}]')
+            i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return ''.join(out)
+
+
+def _compile(patterns: Iterable[str]) -> Optional[Pattern]:
+    """把一组通配符合并为一条正则，对相对路径（以 / 分隔）做后缀匹配"""
+    parts = [_translate(p.replace('\\', '/').strip('/')) for p in patterns if p.strip('/\\')]
+    if not parts:
+        return None
+    return re.compile(f'(?:^|/)(?:{"|".join(parts)})$', re.IGNORECASE)
+
+
+def containing_root(roots: Iterable[str], path: str) -> Optional[str]:
+    """返回包含 path 的最深的根目录；不同盘符上的根目录直接跳过"""
+    best = None
+    target = os.path.normcase(os.path.abspath(path))
+    for root in roots:
+        base = os.path.normcase(os.path.abspath(root))
+        try:
+            if os.path.commonpath([base, target]) != base:
+                continue
+        except ValueError:
+            continue
+        if best is None or len(base) > len(os.path.normcase(os.path.abspath(best))):
+            best = root
+    return best
+
+
+class IgnoreMatcher:
+    def __init__(self, dir_patterns: Iterable[str] = (), file_patterns: Iterable[str] = ()):
+        self.dir_patterns: List[str] = list(dir_patterns)
+        self.file_patterns: List[str] = list(file_patterns)
+        self._dirs = _compile(self.dir_patterns)
+        self._files = _compile(self.file_patterns)
+        self.skipped_dirs = 0
+        self.skipped_files = 0
+
+    @classmethod
+    def default(cls, extra_dirs: Iterable[str] = (), extra_files: Iterable[str] = ()) -> 'IgnoreMatcher':
+        return cls(DEFAULT_IGNORE_DIRS + list(extra_dirs), DEFAULT_IGNORE_FILES + list(extra_files))
+
+    def ignores_dir(self, rel_path: str) -> bool:
+        """rel_path 为相对扫描根目录、以 / 分隔的路径；只判断，不计数"""
+        return self._dirs is not None and self._dirs.search(rel_path) is not None
+
+    def skip_dir(self, rel_path: str) -> bool:
+        if self.ignores_dir(rel_path):
+            self.skipped_dirs += 1
+            return True
+        return False
+
+    def skip_file(self, rel_path: str) -> bool:
+        if self._files is not None and self._files.search(rel_path):
+            self.skipped_files += 1
+            return True
+        return False
+
+    def skips_path(self, root: str, path: str) -> bool:
+        """判断某个文件是否位于被忽略的子树中或本身被忽略，用于监视模式收到的单个事件"""
+        try:
+            rel_path = os.path.relpath(path, root).replace(os.sep, '/')
+        except ValueError:  # Windows 上 path 和 root 不在同一个盘符
+            return False
+        if rel_path == '..' or rel_path.startswith('../'):
+            return False
+        if self.ignores_tree(rel_path.rpartition('/')[0]):
+            return True
+        return self._files is not None and self._files.search(rel_path) is not None
+
+    def skips_event(self, roots: Iterable[str], path: str) -> bool:
+        """监视多个根目录时，只用包含该路径的那个根目录判断"""
+        root = containing_root(roots, path)
+        return root is not None and self.skips_path(root, path)
+
+    def ignores_tree(self, rel_dir: str) -> bool:
+        """目录本身或它的任一上级目录被忽略"""
+        parts = rel_dir.split('/') if rel_dir else []
+        return any(self.ignores_dir('/'.join(parts[:i])) for i in range(1, len(parts) + 1))
+
+    def reset(self):
+        self.skipped_dirs = 0
+        self.skipped_files = 0
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+扫描清单
+在多台机器或文件服务器上以非交互方式扫描游戏库，把结果写成自描述的清单文件
+（进程名、相对路径、导入表检查结果、快速哈希），再在本地一次性合并任意多份清单到 windows.yaml，
+无需重新扫描。合并时按进程名（忽略大小写）去重，并统计出现在多少份清单中。
+
+    python scanner/scan_manifest.py scan D:/SteamLibrary E:/Games -o pc1.json.gz
+    python scanner/scan_manifest.py merge pc1.json.gz pc2.json.gz --min-count 2
+"""
+
+import argparse
+import gzip
+import json
+import os
+import platform
+import sys
+import time
+from typing import Dict, Iterator, List, NamedTuple, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.instrumentation import add_arguments as add_metrics_arguments, configure as configure_metrics
+from rules.rule_document import RuleDocument
+from scan_and_update_windows_yaml import AUTO_SECTION, iter_scan_records
+from scan_cache import ScanCache
+from scan_ignore import IgnoreMatcher
+
+MANIFEST_FORMAT = 'game-process-rules/scan-manifest'
+MANIFEST_VERSION = 1
+# 条目按数组存储以减小体积，字段名写在文件头中
+ENTRY_FIELDS = ['name', 'path', 'size', 'quick_hash', 'has_network', 'dlls']
+
+
+class ManifestEntry(NamedTuple):
+    name: str
+    path: str
+    size: int
+    quick_hash: str
+    has_network: bool
+    dlls: List[str]
+
+
+def _open(path: str, mode: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, mode + 't', encoding='utf-8')
+    return open(path, mode, encoding='utf-8')
+
+
+def write_manifest(output: str, roots: List[str], ignore: IgnoreMatcher, cache: Optional[ScanCache] = None,
+                   workers: Optional[int] = None) -> int:
+    """扫描各根目录并写出清单，返回条目数"""
+    count = 0
+    with _open(output, 'w') as f:
+        header = {
+            'format': MANIFEST_FORMAT,
+            'version': MANIFEST_VERSION,
+            'host': platform.node(),
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+            'roots': roots,
+            'ignore': {'dirs': ignore.dir_patterns, 'files': ignore.file_patterns},
+            'fields': ENTRY_FIELDS,
+        }
+        # 第一行是文件头，之后每行一个条目，合并时可以流式读取
+        f.write(json.dumps(header, ensure_ascii=False) + '\n')
+        for root in roots:
+            # 只记录相对路径，带上根目录名作为上下文
+            base = os.path.dirname(os.path.abspath(root))
+            for record in iter_scan_records(root, workers=workers, cache=cache, ignore=ignore):
+                rel_path = os.path.relpath(record.path, base).replace(os.sep, '/')
+                entry = [os.path.basename(record.path), rel_path, record.size, record.quick_hash,
+                         record.has_network, list(record.dlls)]
+                f.write(json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n')
+                count += 1
+    return count
+
+
+def read_manifest(path: str) -> Iterator[ManifestEntry]:
+    with _open(path, 'r') as f:
+        header = json.loads(f.readline())
+        if header.get('format') != MANIFEST_FORMAT:
+            raise ValueError(f'{path} 不是扫描清单')
+        if header.get('version', 0) > MANIFEST_VERSION:
+            raise ValueError(f'{path} 的清单版本 {header["version"]} 过新')
+        fields = header['fields']
+        for line in f:
+            if line.strip():
+                values = dict(zip(fields, json.loads(line)))
+                yield ManifestEntry(**{field: values.get(field) for field in ManifestEntry._fields})
+
+
+class MergedName:
+    __slots__ = ('name', 'manifests', 'occurrences', 'has_network', 'hashes')
+
+    def __init__(self, name: str):
+        self.name = name
+        self.manifests = 0
+        self.occurrences = 0
+        self.has_network = False
+        self.hashes = set()
+
+
+def merge_manifests(paths: List[str]) -> Dict[str, MergedName]:
+    """按进程名（忽略大小写）合并，保留首次出现的写法"""
+    merged: Dict[str, MergedName] = {}
+    for path in paths:
+        seen_here = set()
+        for entry in read_manifest(path):
+            key = entry.name.casefold()
+            item = merged.get(key)
+            if item is None:
+                item = merged[key] = MergedName(entry.name)
+            item.occurrences += 1
+            item.has_network = item.has_network or bool(entry.has_network)
+            if entry.quick_hash:
+                item.hashes.add(entry.quick_hash)
+            if key not in seen_here:
+                seen_here.add(key)
+                item.manifests += 1
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成或合并扫描清单')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    scan = sub.add_parser('scan', help='扫描目录并写出清单')
+    scan.add_argument('dirs', nargs='+', help='要扫描的目录')
+    scan.add_argument('-o', '--output', required=True, help='清单文件，以 .gz 结尾时压缩')
+    scan.add_argument('--workers', type=int, help='分析进程数（默认CPU核数）')
+    scan.add_argument('--ignore-dir', action='append', default=[], help='额外忽略的目录通配符，可重复')
+    scan.add_argument('--ignore-file', action='append', default=[], help='额外忽略的exe通配符，可重复')
+    scan.add_argument('--no-default-ignore', action='store_true', help='不使用内置忽略规则')
+    scan.add_argument('--no-cache', action='store_true', help='不读写本机扫描缓存')
+    add_metrics_arguments(scan)
+
+    merge = sub.add_parser('merge', help='把多份清单合并进 windows.yaml')
+    merge.add_argument('manifests', nargs='+', help='清单文件')
+    merge.add_argument('--yaml', default=os.path.join(ROOT_DIR, 'windows.yaml'), help='规则文件')
+    merge.add_argument('--min-count', type=int, default=1, help='至少出现在多少份清单中才加入（默认1）')
+    merge.add_argument('--dry-run', action='store_true', help='只打印统计，不写规则文件')
+    args = parser.parse_args()
+    configure_metrics(args)
+
+    if args.command == 'scan':
+        if args.no_default_ignore:
+            ignore = IgnoreMatcher(args.ignore_dir, args.ignore_file)
+        else:
+            ignore = IgnoreMatcher.default(args.ignore_dir, args.ignore_file)
+        roots = [os.path.abspath(d) for d in args.dirs]
+        if args.no_cache:
+            count = write_manifest(args.output, roots, ignore, workers=args.workers)
+        else:
+            with ScanCache() as cache:
+                count = write_manifest(args.output, roots, ignore, cache, args.workers)
+        print(f'按忽略规则跳过 {ignore.skipped_dirs} 个目录、{ignore.skipped_files} 个exe')
+        print(f'已写入 {count} 个exe到清单 {args.output}')
+        return
+
+    merged = merge_manifests(args.manifests)
+    candidates = sorted((item for item in merged.values() if item.has_network and item.manifests >= args.min_count),
+                        key=lambda item: (-item.manifests, -item.occurrences, item.name.casefold()))
+    print(f'{len(args.manifests)} 份清单共 {len(merged)} 个不同进程名，'
+          f'{len(candidates)} 个可联网且出现在至少 {args.min_count} 份清单中')
+    for item in candidates[:30]:
+        print(f'  {item.manifests:>4} 份 {item.occurrences:>5} 次 {len(item.hashes):>3} 个版本  {item.name}')
+
+    doc = RuleDocument.load(args.yaml, case_insensitive=True)
+    added = doc.merge_names({item.name: f'{AUTO_SECTION}，{item.manifests}份清单' for item in candidates}, AUTO_SECTION)
+    if args.dry_run:
+        print(f'将添加 {len(added)} 个新进程（--dry-run，未写入）')
+    elif added:
+        doc.save()
+        print(f'已添加 {len(added)} 个新进程到 {args.yaml}')
+    else:
+        print('没有新进程需要添加。')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+游戏库目录监视
+Linux 上用 inotify 订阅目录事件，只报告新写完或被移入/替换的 exe，空闲时阻塞等待，几乎不占CPU；
+其他系统或 inotify 不可用时退回定时轮询，比较两次遍历之间 exe 的大小和修改时间。
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from scan_ignore import IgnoreMatcher
+
+# inotify 事件掩码，见 <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct('iIII')
+
+Walk = Callable[[str], Iterator[str]]
+
+
+def _is_exe(name: str) -> bool:
+    return name.lower().endswith('.exe')
+
+
+def _iter_dirs(top: str, root: str, ignore: Optional[IgnoreMatcher] = None) -> Iterator[str]:
+    """遍历 top 下需要监视的目录；忽略规则按相对 root 的路径判断，与扫描时剪掉的子树一致"""
+    rel_top = '' if top == root else os.path.relpath(top, root).replace(os.sep, '/')
+    if ignore is not None and ignore.ignores_tree(rel_top):
+        return
+    stack = [(top, rel_top)]
+    while stack:
+        current, rel_dir = stack.pop()
+        yield current
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    rel_path = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            if ignore is None or not ignore.ignores_dir(rel_path):
+                                stack.append((entry.path, rel_path))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+class PollingWatcher:
+    """定时遍历，报告新增或大小、修改时间变化的 exe"""
+
+    backend = 'polling'
+
+    def __init__(self, roots: Iterable[str], walk: Walk, interval: float = 30.0):
+        self.roots = list(roots)
+        self.walk = walk
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+        self._next_poll = time.monotonic() + interval
+
+    def _take_snapshot(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for root in self.roots:
+            for path in self.walk(root):
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    continue
+                snapshot[path] = (st.st_size, st.st_mtime_ns)
+        return snapshot
+
+    def events(self, timeout: Optional[float]) -> List[str]:
+        """等到下一次轮询或超时，返回变化的 exe 路径"""
+        wait = self._next_poll - time.monotonic()
+        if timeout is not None and timeout < wait:
+            time.sleep(max(timeout, 0))
+            return []
+        if wait > 0:
+            time.sleep(wait)
+        self._next_poll = time.monotonic() + self.interval
+        snapshot = self._take_snapshot()
+        changed = [path for path, stat in snapshot.items() if self._snapshot.get(path) != stat]
+        self._snapshot = snapshot
+        return changed
+
+    def known_paths(self) -> List[str]:
+        return list(self._snapshot)
+
+    def close(self):
+        pass
+
+
+class InotifyWatcher:
+    """递归监视目录树：新建的子目录会自动加入监视，并补报其中已有的 exe"""
+
+    backend = 'inotify'
+
+    def __init__(self, roots: Iterable[str], walk: Walk, ignore: Optional[IgnoreMatcher] = None):
+        libc_name = ctypes.util.find_library('c')
+        if not sys.platform.startswith('linux') or not libc_name:
+            raise OSError(errno.ENOSYS, '当前系统不支持 inotify')
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise OSError(errno.ENOSYS, '当前系统不支持 inotify')
+        self.roots = list(roots)
+        self.walk = walk
+        self.ignore = ignore
+        self._fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失败')
+        # wd -> (所属扫描根目录, 目录路径)
+        self._dirs: Dict[int, Tuple[str, str]] = {}
+        try:
+            for root in self.roots:
+                self._watch_tree(root, root)
+        except OSError:
+            self.close()
+            raise
+
+    def _add_watch(self, root: str, path: str):
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                # 超过 fs.inotify.max_user_watches，交给调用方退回轮询
+                raise OSError(err, 'inotify 监视数量已达上限')
+            return
+        self._dirs[wd] = (root, path)
+
+    def _watch_tree(self, root: str, top: str):
+        """被忽略规则剪掉的子树（运行库、引擎第三方组件等）不加监视"""
+        for directory in _iter_dirs(top, root, self.ignore):
+            self._add_watch(root, directory)
+
+    def _rescan(self) -> List[str]:
+        return [path for root in self.roots for path in self.walk(root)]
+
+    def events(self, timeout: Optional[float]) -> List[str]:
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return []
+        changed = []
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+                offset += _EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+                if mask & IN_Q_OVERFLOW:
+                    # 事件队列溢出，丢失的事件无法恢复，整体重新遍历一次
+                    changed.extend(self._rescan())
+                    continue
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                watched = self._dirs.get(wd)
+                if watched is None or not name:
+                    continue
+                root, directory = watched
+                path = os.path.join(directory, name)
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO):
+                        # 新目录在加入监视之前可能已经写入了文件
+                        self._watch_tree(root, path)
+                        changed.extend(self.walk(path))
+                elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and _is_exe(name):
+                    changed.append(path)
+        return changed
+
+    def close(self):
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def create_watcher(roots: Iterable[str], walk: Walk, poll_interval: float = 30.0, force_polling: bool = False,
+                   ignore: Optional[IgnoreMatcher] = None):
+    roots = list(roots)
+    if not force_polling:
+        try:
+            return InotifyWatcher(roots, walk, ignore)
+        except OSError as e:
+            print(f'无法使用 inotify（{e.strerror or e}），改为每 {poll_interval:g} 秒轮询一次')
+    return PollingWatcher(roots, walk, poll_interval)
+
+
+def fall_back_to_polling(watcher, error: OSError, poll_interval: float = 30.0) -> Tuple[PollingWatcher, List[str]]:
+    """
+    运行中 inotify 出错（如新目录超出监视数量上限）时改为轮询。
+    出错时正在处理的事件已经丢失，返回全部 exe 供调用方重新检查（有扫描缓存时代价很小）
+    """
+    print(f'inotify 出错（{error.strerror or error}），改为每 {poll_interval:g} 秒轮询一次')
+    watcher.close()
+    polling = PollingWatcher(watcher.roots, watcher.walk, poll_interval)
+    return polling, polling.known_paths()
@@ -0,0 +1,342 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+大规模包名清单挖掘
+设备群上报的已安装包名清单（JSONL/CSV/纯文本，可 gzip 压缩）往往有几百万行。
+按块流式读取，分发到进程池；每个工作进程先丢掉 android.yaml 已经匹配的包名（含 PROCESS-NAME-REGEX
+发行商规则），再用从规则文件推导出的发行商前缀（com.tencent.tmgp. 等）和发行商正则中的名字
+（supercell、garena 等）给剩下的包名打分，只把命中的候选计数返回。
+主进程用有上限的 Top-K 汇总，内存占用与输入大小无关，最后输出排好序的候选新增条目。
+
+    python spider/bulk_classifier.py fleet-2024-06.jsonl.gz fleet-eu.csv --top 200 -o candidates.json
+"""
+
+import argparse
+import csv
+import gzip
+import heapq
+import io
+import json
+import os
+import sys
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import CompiledRuleMatcher, extract_literal
+from rules.rule_index import RuleIndex
+from rules.rule_parser import Rule, load_rules
+
+DEFAULT_CHUNK_SIZE = 50000
+DEFAULT_CAPACITY = 20000
+DEFAULT_TOP = 200
+# 清单中常见的列名，按顺序取第一个存在的
+PACKAGE_FIELDS = ('package', 'package_id', 'package_name', 'packageName', 'pkg', 'id')
+NAME_FIELDS = ('name', 'label', 'app_name', 'appName', 'title')
+COUNT_FIELDS = ('count', 'installs', 'devices')
+# 包名某一段含这些词时加分，用于发现已知发行商之外的游戏
+GAME_TOKENS = ('game', 'games')
+GAME_TOKEN_SCORE = 1
+# 某一段是发行商正则中的名字时加分；规则文件已声明该发行商的包都是游戏
+PUBLISHER_SCORE = 2
+
+
+class Candidate(NamedTuple):
+    package_id: str
+    name: str
+    weight: int
+    rows: int
+    score: int
+    prefix: str
+
+
+def derive_prefixes(package_ids: Iterable[str], min_support: int = 1) -> Dict[str, int]:
+    """
+    统计已知游戏包名的各级前缀（至少两段，不含包名本身），返回 {前缀（小写，以 . 结尾）: 已知游戏数}。
+    com.tencent.tmgp.sgame 会贡献 com.tencent. 和 com.tencent.tmgp. 两个前缀
+    """
+    support = Counter()
+    for package_id in package_ids:
+        parts = package_id.casefold().split('.')
+        for depth in range(2, len(parts)):
+            support['.'.join(parts[:depth]) + '.'] += 1
+    return {prefix: count for prefix, count in support.items() if count >= min_support}
+
+
+def regex_publishers(rules: Iterable[Rule]) -> Set[str]:
+    """从 `.*\\.supercell\\.` 这类 PROCESS-NAME-REGEX 规则中取出发行商名（字面量的第一段，小写）"""
+    publishers = set()
+    for rule in rules:
+        if rule.rule_type != 'PROCESS-NAME-REGEX':
+            continue
+        literal = extract_literal(rule.value)
+        segments = [part for part in (literal or '').casefold().split('.') if part]
+        if segments:
+            publishers.add(segments[0])
+    return publishers
+
+
+def score_package(package_id: str, prefixes: Dict[str, int], publishers: Iterable[str] = ()) -> Tuple[int, str]:
+    """
+    所有命中前缀的已知游戏数之和加上关键词分和发行商分，越深的发行商前缀命中越多；返回 (分数, 最长命中前缀)。
+    两段的厂商前缀（com.tencent.）下既有游戏也有普通应用，只在有其他依据时计入，单独命中不算候选
+    """
+    parts = package_id.casefold().split('.')
+    vendor = 0
+    score = 0
+    matched = ''
+    for depth in range(2, len(parts)):
+        prefix = '.'.join(parts[:depth]) + '.'
+        support = prefixes.get(prefix)
+        if support:
+            if depth == 2:
+                vendor += support
+            else:
+                score += support
+            matched = prefix
+    if any(token in part for part in parts[1:] for token in GAME_TOKENS):
+        score += GAME_TOKEN_SCORE
+    for depth, part in enumerate(parts[1:-1], 2):
+        if part in publishers:
+            score += PUBLISHER_SCORE
+            prefix = '.'.join(parts[:depth]) + '.'
+            if len(prefix) > len(matched):
+                matched = prefix
+            break
+    if not score:
+        return 0, ''
+    return score + vendor, matched
+
+
+def _first(row: Dict, fields: Tuple[str, ...]):
+    for field in fields:
+        value = row.get(field)
+        if value:
+            return value
+    return None
+
+
+def _parse_lines(fmt: str, header: Optional[List[str]], lines: List[str]) -> Iterator[Tuple[str, str, int]]:
+    """产出 (包名, 名字, 次数)，格式不对的行跳过"""
+    if fmt == 'csv':
+        for values in csv.reader(lines):
+            row = dict(zip(header, values))
+            package_id = _first(row, PACKAGE_FIELDS)
+            if package_id:
+                yield package_id.strip(), (_first(row, NAME_FIELDS) or '').strip(), _to_int(_first(row, COUNT_FIELDS))
+    elif fmt == 'jsonl':
+        for line in lines:
+            try:
+                row = json.loads(line)
+            except ValueError:
+                continue
+            if isinstance(row, str):
+                yield row.strip(), '', 1
+            elif isinstance(row, dict):
+                package_id = _first(row, PACKAGE_FIELDS)
+                if isinstance(package_id, str):
+                    yield package_id.strip(), str(_first(row, NAME_FIELDS) or '').strip(), _to_int(_first(row, COUNT_FIELDS))
+    else:
+        for line in lines:
+            fields = line.replace(',', ' ').split()
+            if fields:
+                yield fields[0], '', 1
+
+
+def _to_int(value) -> int:
+    try:
+        return max(int(value), 1)
+    except (TypeError, ValueError):
+        return 1
+
+
+# 工作进程中的前缀表、已知包名和规则匹配器，由 _init_worker 设置，避免每个块都重新传递
+_prefixes: Dict[str, int] = {}
+_publishers: Set[str] = set()
+_known: Set[str] = set()
+_matcher: Optional[CompiledRuleMatcher] = None
+
+
+def _init_worker(prefixes: Dict[str, int], publishers: Set[str], known: Set[str], rules: List[Rule]):
+    global _prefixes, _publishers, _known, _matcher
+    _prefixes = prefixes
+    _publishers = publishers
+    _known = known
+    # 包名区分大小写，与 android.yaml 的匹配方式一致
+    _matcher = CompiledRuleMatcher(rules, ignore_case=False) if rules else None
+
+
+def classify_chunk(fmt: str, header: Optional[List[str]], lines: List[str]) -> Tuple[int, Dict[str, list]]:
+    """在工作进程中解析并打分一个块，返回 (行数, {包名: [权重, 行数, 分数, 名字, 前缀]})"""
+    rows = 0
+    hits: Dict[str, list] = {}
+    for package_id, name, count in _parse_lines(fmt, header, lines):
+        rows += 1
+        if '.' not in package_id or package_id in _known:
+            continue
+        hit = hits.get(package_id)
+        if hit is None:
+            if _matcher is not None and _matcher.match(name=package_id) is not None:
+                continue
+            score, prefix = score_package(package_id, _prefixes, _publishers)
+            if not score:
+                continue
+            hit = hits[package_id] = [0, 0, score, name, prefix]
+        hit[0] += count * hit[2]
+        hit[1] += count
+        if name and not hit[3]:
+            hit[3] = name
+    return rows, hits
+
+
+class TopK:
+    """
+    有上限的加权计数：条目超过两倍容量时只保留权重最高的 capacity 个。
+    被丢弃的最大权重记为 floor，之后才出现的条目权重最多被低估 floor
+    """
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.floor = 0
+        self._items: Dict[str, list] = {}
+
+    def merge(self, hits: Dict[str, list]):
+        items = self._items
+        for package_id, (weight, rows, score, name, prefix) in hits.items():
+            item = items.get(package_id)
+            if item is None:
+                items[package_id] = [weight, rows, score, name, prefix]
+            else:
+                item[0] += weight
+                item[1] += rows
+                if name and not item[3]:
+                    item[3] = name
+        if len(items) > 2 * self.capacity:
+            self._prune()
+
+    def _prune(self):
+        keep = heapq.nlargest(self.capacity, self._items.items(), key=lambda kv: kv[1][0])
+        kept = dict(keep)
+        dropped = max(item[0] for key, item in self._items.items() if key not in kept)
+        self.floor = max(self.floor, dropped)
+        self._items = kept
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def top(self, k: int) -> List[Candidate]:
+        ranked = heapq.nlargest(k, self._items.items(), key=lambda kv: (kv[1][0], kv[1][2], kv[0]))
+        return [Candidate(package_id, name, weight, rows, score, prefix)
+                for package_id, (weight, rows, score, name, prefix) in ranked]
+
+
+def _detect_format(path: str) -> str:
+    name = path[:-3] if path.endswith('.gz') else path
+    ext = os.path.splitext(name)[1].lower()
+    if ext in ('.jsonl', '.ndjson', '.json'):
+        return 'jsonl'
+    if ext == '.csv':
+        return 'csv'
+    return 'text'
+
+
+def iter_chunks(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Tuple[str, Optional[List[str]], List[str]]]:
+    """按行数切块读取清单文件，产出 (格式, CSV表头, 行列表)，解析留给工作进程"""
+    fmt = _detect_format(path)
+    raw = gzip.open(path, 'rb') if path.endswith('.gz') else open(path, 'rb')
+    with io.TextIOWrapper(raw, encoding='utf-8', errors='replace', newline='') as f:
+        header = None
+        if fmt == 'csv':
+            header = next(csv.reader([f.readline()]), [])
+        chunk = []
+        for line in f:
+            if line.strip():
+                chunk.append(line)
+                if len(chunk) >= chunk_size:
+                    yield fmt, header, chunk
+                    chunk = []
+        if chunk:
+            yield fmt, header, chunk
+
+
+class BulkClassifier:
+    def __init__(self, known_ids: Iterable[str], rules: Iterable[Rule] = (), min_support: int = 1,
+                 extra_prefixes: Iterable[str] = (), workers: Optional[int] = None,
+                 chunk_size: int = DEFAULT_CHUNK_SIZE, capacity: int = DEFAULT_CAPACITY):
+        self.known = set(known_ids)
+        # 规则文件中的全部规则：已被匹配的包名不再作为候选
+        self.rules = list(rules)
+        self.prefixes = derive_prefixes(self.known, min_support)
+        self.publishers = regex_publishers(self.rules)
+        for prefix in extra_prefixes:
+            prefix = prefix.casefold().rstrip('.') + '.'
+            self.prefixes[prefix] = max(self.prefixes.get(prefix, 0), 1)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.capacity = capacity
+        self.rows = 0
+
+    @classmethod
+    def from_rule_file(cls, yaml_path: str, **kwargs) -> 'BulkClassifier':
+        return cls(RuleIndex.from_rule_file(yaml_path), load_rules(yaml_path), **kwargs)
+
+    def run(self, paths: Iterable[str]) -> TopK:
+        """读取所有清单并汇总候选；同时在处理的块数有上限，读取速度不会让内存无限增长"""
+        topk = TopK(self.capacity)
+        max_pending = self.workers * 2
+        pending = set()
+
+        def collect(done):
+            for future in done:
+                pending.discard(future)
+                rows, hits = future.result()
+                self.rows += rows
+                topk.merge(hits)
+
+        with ProcessPoolExecutor(max_workers=self.workers, initializer=_init_worker,
+                                 initargs=(self.prefixes, self.publishers, self.known, self.rules)) as pool:
+            for path in paths:
+                for fmt, header, lines in iter_chunks(path, self.chunk_size):
+                    if len(pending) >= max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        collect(done)
+                    pending.add(pool.submit(classify_chunk, fmt, header, lines))
+            collect(wait(pending).done)
+        return topk
+
+
+def main():
+    parser = argparse.ArgumentParser(description='从大规模已安装包名清单中挖掘候选游戏')
+    parser.add_argument('dumps', nargs='+', help='清单文件（.jsonl/.csv/.txt，可加 .gz）')
+    parser.add_argument('--rules', default=os.path.join(ROOT_DIR, 'android.yaml'), help='已知游戏规则文件')
+    parser.add_argument('--top', type=int, default=DEFAULT_TOP, help='输出前多少个候选（默认200）')
+    parser.add_argument('--min-support', type=int, default=1, help='前缀下至少有几个已知游戏才用于打分')
+    parser.add_argument('--prefix', action='append', default=[], help='额外的发行商前缀，可重复，如 com.hoyoverse')
+    parser.add_argument('--workers', type=int, help='工作进程数（默认CPU核数）')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE, help='每块行数')
+    parser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='汇总时最多保留的候选数')
+    parser.add_argument('-o', '--output', help='把候选写入JSON文件')
+    args = parser.parse_args()
+
+    classifier = BulkClassifier.from_rule_file(args.rules, min_support=args.min_support, extra_prefixes=args.prefix,
+                                               workers=args.workers, chunk_size=args.chunk_size,
+                                               capacity=args.capacity)
+    topk = classifier.run(args.dumps)
+    candidates = topk.top(args.top)
+    print(f'读取 {classifier.rows} 行，{len(classifier.prefixes)} 个前缀，{len(classifier.publishers)} 个发行商，保留 {len(topk)} 个候选'
+          + (f'（权重误差上限 {topk.floor}）' if topk.floor else ''))
+    for c in candidates[:30]:
+        print(f'  {c.weight:>10} {c.rows:>8} 次 分数{c.score:>3}  {c.package_id}  {c.name}')
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump([c._asdict() for c in candidates], f, ensure_ascii=False, indent=2)
+        print(f'已保存 {len(candidates)} 个候选到 {args.output}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+并发抓取层
+复用连接池的 requests.Session 加线程池，按主机限制并发，失败时指数退避重试，
+所有请求共享一个总超时预算。配置了 HttpCache 时使用条件请求，
+页面解析在抓取它的工作线程中完成。
+"""
+
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, Iterator, NamedTuple, Optional, Union
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from rules.instrumentation import metrics
+from http_cache import CacheEntry, HttpCache
+
+logger = logging.getLogger(__name__)
+
+# 这些状态码视为暂时性错误，可以重试
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _iter_body(response: requests.Response, chunk_size: int = 16 * 1024) -> Iterator[bytes]:
+    """逐块产出响应内容，生成器关闭时断开连接"""
+    try:
+        yield from response.iter_content(chunk_size)
+    finally:
+        response.close()
+
+
+def _release_on_close(response: requests.Response, slot: threading.BoundedSemaphore):
+    """让 response.close() 同时归还主机并发名额，重复关闭只归还一次"""
+    close = response.close
+    released = False
+
+    def close_and_release():
+        nonlocal released
+        try:
+            close()
+        finally:
+            if not released:
+                released = True
+                slot.release()
+    response.close = close_and_release
+
+
+def _timed_parse(parse: Callable) -> Callable:
+    """给解析函数计时；流式解析时边接收边解析，耗时中包含读取响应体的时间"""
+    def timed(content):
+        with metrics.timer('spider.parse'):
+            return parse(content)
+    return timed
+
+
+class Page(NamedTuple):
+    url: str
+    content: bytes
+    parsed: Optional[Any]
+    from_cache: bool
+
+
+class Fetcher:
+    def __init__(self, headers: Optional[Dict[str, str]] = None, max_workers: int = 8,
+                 per_host_limit: int = 2, retries: int = 2, backoff: float = 0.5,
+                 timeout: float = 10, total_budget: float = 60, cache: Optional[HttpCache] = None):
+        self.cache = cache
+        self.max_workers = max_workers
+        self.per_host_limit = per_host_limit
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.total_budget = total_budget
+
+        self.session = requests.Session()
+        if headers:
+            self.session.headers.update(headers)
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        self._host_slots: Dict[str, threading.BoundedSemaphore] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, url: str) -> threading.BoundedSemaphore:
+        host = urlsplit(url).netloc
+        with self._lock:
+            if host not in self._host_slots:
+                self._host_slots[host] = threading.BoundedSemaphore(self.per_host_limit)
+            return self._host_slots[host]
+
+    def fetch(self, url: str, deadline: Optional[float] = None, **kwargs) -> Optional[requests.Response]:
+        """
+        获取单个URL，暂时性错误按指数退避重试。
+        超出总预算或重试用尽时返回 None；其余状态码原样返回给调用方判断。
+        stream=True 时该主机的并发名额一直占用到响应被 close()，调用方必须关闭响应。
+        """
+        if deadline is None:
+            deadline = time.monotonic() + self.total_budget
+        slot = self._slot(url)
+        for attempt in range(self.retries + 1):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.warning(f"超出抓取时间预算，放弃 {url}")
+                return None
+            slot.acquire()
+            try:
+                with metrics.timer('spider.fetch'):
+                    response = self.session.get(url, timeout=min(self.timeout, remaining), **kwargs)
+            except requests.RequestException as e:
+                slot.release()
+                metrics.count('spider.request_errors')
+                logger.warning(f"{url} 请求失败（第 {attempt + 1} 次）: {e}")
+            except BaseException:
+                slot.release()
+                raise
+            else:
+                metrics.count('spider.requests')
+                # 流式请求等响应体读完、响应关闭时才归还名额；非流式请求返回时响应体已读完
+                _release_on_close(response, slot)
+                if not kwargs.get('stream'):
+                    response.close()
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                # 重试前关闭响应，连接归还连接池
+                response.close()
+                logger.warning(f"{url} 返回 {response.status_code}（第 {attempt + 1} 次）")
+            if attempt < self.retries:
+                delay = self.backoff * (2 ** attempt) * (1 + random.random() * 0.25)
+                time.sleep(max(min(delay, deadline - time.monotonic()), 0))
+        return None
+
+    def fetch_all(self, urls: Iterable[str], **kwargs) -> Dict[str, Optional[requests.Response]]:
+        """并发获取多个URL，返回顺序与输入一致"""
+        urls = list(dict.fromkeys(urls))
+        deadline = time.monotonic() + self.total_budget
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {url: pool.submit(self.fetch, url, deadline, **kwargs) for url in urls}
+        return {url: future.result() for url, future in futures.items()}
+
+    def fetch_page(self, url: str, deadline: Optional[float] = None,
+                   parse: Optional[Callable[[Union[bytes, Iterator[bytes]]], Any]] = None,
+                   parser_key: Optional[str] = None) -> Optional[Page]:
+        """
+        获取页面内容，并在当前工作线程中调用 parse 解析。
+        有效期内直接使用缓存；过期则发送条件请求，304 时复用缓存及其解析结果；
+        请求失败时退回到过期的缓存内容。未配置缓存时响应以字节流交给 parse，
+        解析器够数即可提前断开，此时 Page.content 为空。
+        parser_key 标识解析器及其参数，缓存的解析结果只在标识相同时复用；不指定时使用解析函数的名字。
+        """
+        if parse is not None and parser_key is None:
+            parser_key = f'{parse.__module__}.{parse.__qualname__}'
+        if parse is not None and metrics.enabled:
+            parse = _timed_parse(parse)
+        entry = self.cache.get(url) if self.cache else None
+        if entry is not None and self.cache.is_fresh(entry):
+            return self._page_from_cache(entry, parse, parser_key)
+
+        headers = self.cache.conditional_headers(entry) if self.cache else {}
+        stream = parse is not None and self.cache is None
+        response = self.fetch(url, deadline, headers=headers, stream=stream)
+        if response is None:
+            if entry is not None:
+                logger.warning(f"{url} 获取失败，使用过期缓存")
+                return self._page_from_cache(entry, parse, parser_key)
+            return None
+        if response.status_code == 304 and entry is not None:
+            self.cache.touch(url)
+            return self._page_from_cache(entry, parse, parser_key)
+        if response.status_code != 200:
+            logger.warning(f"{url} 返回 {response.status_code}")
+            response.close()
+            return None
+        if stream:
+            try:
+                return Page(url, b'', parse(_iter_body(response)), False)
+            finally:
+                # 解析器提前结束时也要断开连接、归还名额
+                response.close()
+
+        content = response.content
+        parsed = parse(content) if parse else None
+        if self.cache:
+            self.cache.store(url, content, response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            if parsed is not None:
+                self.cache.store_parsed(url, parsed, parser_key)
+        return Page(url, content, parsed, False)
+
+    def _page_from_cache(self, entry: CacheEntry, parse, parser_key: Optional[str]) -> Page:
+        metrics.count('spider.cache_pages')
+        parsed = entry.parsed if entry.parser == parser_key else None
+        if parsed is None and parse is not None:
+            parsed = parse(entry.body)
+            self.cache.store_parsed(entry.url, parsed, parser_key)
+        return Page(entry.url, entry.body, parsed, True)
+
+    def fetch_pages(self, urls: Iterable[str], parse=None, parser_key: Optional[str] = None) -> Dict[str, Optional[Page]]:
+        """并发获取并解析多个页面，返回顺序与输入一致"""
+        urls = list(dict.fromkeys(urls))
+        deadline = time.monotonic() + self.total_budget
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {url: pool.submit(self.fetch_page, url, deadline, parse, parser_key) for url in urls}
+        return {url: future.result() for url, future in futures.items()}
+
+    def close(self):
+        self.session.close()
+        if self.cache:
+            self.cache.close()
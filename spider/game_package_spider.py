@@ -5,25 +5,58 @@
 用于从各种来源收集热门Android游戏的包名信息
 """
 
-import requests
+import argparse
 import re
 import json
+import os
+import sys
 import time
 from bs4 import BeautifulSoup
-from typing import Dict, List, Set
+from typing import Dict, Iterable, List, Optional, Set, Union
 import logging
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.instrumentation import add_arguments as add_metrics_arguments, configure as configure_metrics, metrics
+from rules.rule_index import RuleIndex, export_payload
+from rules.rule_document import DEFAULT_SECTION, RuleDocument
+from rules.rule_parser import load_rules
+from fetcher import Fetcher
+from http_cache import HttpCache
+from html_extract import extract_apkpure_games
+from merge_engine import MergeStore
+from bulk_classifier import BulkClassifier, Candidate
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 
+# 页面解析后端：bs4 构建完整文档树；stream 边接收边解析，够数即停止
+PARSER_BACKENDS = ('bs4', 'stream')
+# 每个APKPure页面最多提取的游戏数
+APKPURE_PARSE_LIMIT = 50
+
+
 class GamePackageSpider:
-    def __init__(self):
+    def __init__(self, base_url: str = "https://apkpure.com", apkpure_pages: int = 1,
+                 fetcher: Optional[Fetcher] = None, cache: Optional[HttpCache] = None,
+                 parser_backend: str = 'bs4', merge_store: Optional[MergeStore] = None):
+        if parser_backend not in PARSER_BACKENDS:
+            raise ValueError(f"未知的解析后端: {parser_backend}")
+        self.parser_backend = parser_backend
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
         self.games = {}
+        # base_url 可指向本地HTTP服务，用保存的HTML页面离线测试
+        self.base_url = base_url.rstrip('/')
+        self.apkpure_pages = apkpure_pages
+        self.fetcher = fetcher or Fetcher(headers=self.headers, cache=cache)
+        # 不指定时只在内存中合并本次收集的结果
+        self.merge_store = merge_store or MergeStore(':memory:')
         
     def extract_package_from_url(self, url: str) -> str:
         """从Google Play URL中提取包名"""
@@ -130,27 +163,50 @@ class GamePackageSpider:
             "com.king.farmheroessaga": "Farm Heroes Saga"
         }
     
+    def apkpure_chart_urls(self) -> List[str]:
+        """APKPure游戏榜单各分页的地址"""
+        urls = [f"{self.base_url}/cn/game"]
+        urls.extend(f"{self.base_url}/cn/game?page={page}" for page in range(2, self.apkpure_pages + 1))
+        return urls
+    
+    def parse_apkpure_page(self, content: Union[bytes, Iterable[bytes]]) -> Dict[str, str]:
+        """从APKPure页面（整页字节或字节流）中提取包名和游戏名"""
+        if self.parser_backend == 'stream':
+            return extract_apkpure_games(content, limit=APKPURE_PARSE_LIMIT)
+        if not isinstance(content, (bytes, bytearray)):
+            content = b''.join(content)
+        
+        games = {}
+        soup = BeautifulSoup(content, 'html.parser')
+        game_links = soup.find_all('a', href=re.compile(r'/[^/]+/[^/]+'))
+        
+        for link in game_links[:APKPURE_PARSE_LIMIT]:  # 限制数量
+            href = link.get('href', '')
+            if '/com.' in href:
+                # 从APKPure URL提取包名
+                parts = href.split('/')
+                if len(parts) >= 3:
+                    package_name = parts[2]
+                    game_name = link.get_text(strip=True)
+                    if package_name.startswith('com.'):
+                        games[package_name] = game_name
+        
+        return games
+    
     def scrape_apkpure_top_games(self) -> Dict[str, str]:
-        """从APKPure获取热门游戏"""
+        """从APKPure获取热门游戏（各分页并发抓取，内容未变的页面不再解析）"""
         games = {}
         try:
-            url = "https://apkpure.com/cn/game"
-            response = requests.get(url, headers=self.headers, timeout=10)
-            if response.status_code == 200:
-                soup = BeautifulSoup(response.content, 'html.parser')
-                game_links = soup.find_all('a', href=re.compile(r'/[^/]+/[^/]+'))
-                
-                for link in game_links[:50]:  # 限制数量
-                    href = link.get('href', '')
-                    if '/com.' in href:
-                        # 从APKPure URL提取包名
-                        parts = href.split('/')
-                        if len(parts) >= 3:
-                            package_name = parts[2]
-                            game_name = link.get_text(strip=True)
-                            if package_name.startswith('com.'):
-                                games[package_name] = game_name
-                                
+            pages = self.fetcher.fetch_pages(self.apkpure_chart_urls(), parse=self.parse_apkpure_page,
+                                             parser_key=f'apkpure:{self.parser_backend}:{APKPURE_PARSE_LIMIT}')
+            for url, page in pages.items():
+                if page is None:
+                    logger.warning(f"未能获取 {url}")
+                    continue
+                if page.from_cache:
+                    logger.info(f"{url} 未变化，使用缓存")
+                games.update(page.parsed)
+                    
         except Exception as e:
             logger.error(f"获取APKPure数据失败: {e}")
             
@@ -187,32 +243,51 @@ class GamePackageSpider:
         return games
     
     def collect_all_games(self) -> Dict[str, str]:
-        """收集所有游戏包名"""
+        """收集所有游戏包名，各来源按优先级合并，不会因为写入顺序互相覆盖名字"""
         logger.info("开始收集游戏包名...")
-        
-        all_games = {}
+        store = self.merge_store
         
         # 添加已知游戏
-        known_games = self.get_known_games()
-        all_games.update(known_games)
-        logger.info(f"添加了 {len(known_games)} 个已知游戏")
+        count = store.ingest('known', self.get_known_games().items())
+        logger.info(f"添加了 {count} 个已知游戏")
         
         # 尝试从APKPure获取
         try:
-            apkpure_games = self.scrape_apkpure_top_games()
-            all_games.update(apkpure_games)
-            logger.info(f"从APKPure获取了 {len(apkpure_games)} 个游戏")
+            count = store.ingest('apkpure', self.scrape_apkpure_top_games().items())
+            logger.info(f"从APKPure获取了 {count} 个游戏")
         except Exception as e:
             logger.warning(f"APKPure爬取失败: {e}")
         
         # 添加更多热门游戏
-        more_games = self.scrape_google_play_charts()
-        all_games.update(more_games)
-        logger.info(f"添加了 {len(more_games)} 个额外游戏")
+        count = store.ingest('charts', self.scrape_google_play_charts().items())
+        logger.info(f"添加了 {count} 个额外游戏")
+        
+        for package_id, names in store.conflicts():
+            logger.debug(f"{package_id} 在不同来源的名字不一致: {names}")
         
+        all_games = store.games()
         logger.info(f"总共收集到 {len(all_games)} 个游戏包名")
         return all_games
     
+    def ingest_package_dumps(self, paths: Iterable[str], top: int = 200,
+                             rules_path: str = os.path.join(ROOT_DIR, 'android.yaml'), **kwargs) -> List[Candidate]:
+        """从设备群的已安装包名清单中挖掘候选游戏，排名靠前的写入合并库（来源 bulk）"""
+        known = set(self.get_known_games()) | set(RuleIndex.from_rule_file(rules_path))
+        classifier = BulkClassifier(known, load_rules(rules_path), **kwargs)
+        candidates = classifier.run(paths).top(top)
+        count = self.merge_store.ingest('bulk', ((c.package_id, c.name) for c in candidates))
+        logger.info(f"从 {classifier.rows} 行清单中挖掘出 {count} 个候选游戏")
+        return candidates
+    
+    def update_rule_file(self, yaml_path: str, games: Dict[str, str], section_title: str = DEFAULT_SECTION) -> List[str]:
+        """把规则文件中还没有的包名加入指定分类，其余分类和注释保持不变"""
+        with metrics.timer('spider.update_rules'):
+            doc = RuleDocument.load(yaml_path, case_insensitive=False)
+            added = doc.merge_names(games, section_title)
+            doc.save()
+        logger.info(f"向 {yaml_path} 的 {section_title} 添加了 {len(added)} 条规则")
+        return added
+    
     def save_to_json(self, games: Dict[str, str], filename: str):
         """保存游戏列表到JSON文件"""
         with open(filename, 'w', encoding='utf-8') as f:
@@ -220,38 +295,54 @@ class GamePackageSpider:
         logger.info(f"已保存到 {filename}")
     
     def generate_yaml_rules(self, games: Dict[str, str]) -> str:
-        """生成YAML格式的规则"""
-        rules = ["payload:"]
-        
+        """生成YAML格式的规则（包名区分大小写去重）"""
         # 按游戏名称排序
-        sorted_games = sorted(games.items(), key=lambda x: x[1])
-        
-        for package_name, game_name in sorted_games:
-            rules.append(f"- PROCESS-NAME,{package_name} #{game_name}")
+        sorted_games = dict(sorted(games.items(), key=lambda x: x[1]))
         
-        return "\n".join(rules)
+        return export_payload(sorted_games, case_insensitive=False)
 
 
 def main():
-    spider = GamePackageSpider()
+    parser = argparse.ArgumentParser(description='收集热门Android游戏包名，输出 android.yaml 中还没有的候选')
+    parser.add_argument('--apply', action='store_true', help='把候选直接写入 android.yaml（默认只写候选文件，人工审核后再合并）')
+    add_metrics_arguments(parser)
+    args = parser.parse_args()
+    configure_metrics(args)
+    
+    spider_dir = os.path.join(ROOT_DIR, 'spider')
+    database_path = os.path.join(spider_dir, 'games_database.json')
+    generated_path = os.path.join(spider_dir, 'android_rules_generated.yaml')
+    candidates_path = os.path.join(spider_dir, 'android_candidates.json')
+    
+    spider = GamePackageSpider(cache=HttpCache(), merge_store=MergeStore())
     
     # 收集所有游戏
     all_games = spider.collect_all_games()
     
     # 保存到JSON文件
-    spider.save_to_json(all_games, 'f:/code/game-process-rules/spider/games_database.json')
+    spider.save_to_json(all_games, database_path)
     
     # 生成YAML规则
     yaml_rules = spider.generate_yaml_rules(all_games)
     
     # 保存YAML规则
-    with open('f:/code/game-process-rules/spider/android_rules_generated.yaml', 'w', encoding='utf-8') as f:
+    with open(generated_path, 'w', encoding='utf-8') as f:
         f.write(yaml_rules)
     
+    # android.yaml 中还没有的新游戏先写入候选文件；爬取结果未经审核，只有 --apply 时才并入规则文件
+    android_yaml = os.path.join(ROOT_DIR, 'android.yaml')
+    new_games = dict(spider.merge_store.delta(android_yaml))
+    logger.info(f"相对 android.yaml 新增 {len(new_games)} 个候选游戏")
+    spider.save_to_json(new_games, candidates_path)
+    if args.apply:
+        spider.update_rule_file(android_yaml, new_games)
+    
     print(f"✅ 成功收集了 {len(all_games)} 个游戏包名")
     print("📁 文件已保存:")
-    print("   - f:/code/game-process-rules/spider/games_database.json")
-    print("   - f:/code/game-process-rules/spider/android_rules_generated.yaml")
+    for path in (database_path, generated_path, candidates_path):
+        print(f"   - {path}")
+    if not args.apply and new_games:
+        print(f"ℹ️ {len(new_games)} 个候选未写入 android.yaml，审核后加 --apply 重新运行")
     
     return all_games
 
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+流式HTML链接提取
+边接收字节边解析，从 <a href> 中提取包名，达到数量上限后立即停止，
+不构建完整的文档树。输出与 BeautifulSoup 版本的 parse_apkpure_page 一致。
+"""
+
+import codecs
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, List, Optional, Union
+
+# 与 BeautifulSoup 版本的 find_all('a', href=...) 条件一致
+HREF_PATTERN = re.compile(r'/[^/]+/[^/]+')
+
+# 没有结束标签的元素，不入栈
+VOID_ELEMENTS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link', 'meta',
+    'param', 'source', 'track', 'wbr',
+}
+# get_text 不包含这些元素里的文本
+SKIP_TEXT_ELEMENTS = {'script', 'style', 'template'}
+
+
+class _Anchor:
+    __slots__ = ('index', 'href', 'texts')
+
+    def __init__(self, index: int, href: str):
+        self.index = index
+        self.href = href
+        self.texts: List[str] = []
+
+
+class ApkpureLinkExtractor(HTMLParser):
+    def __init__(self, limit: int = 50):
+        super().__init__(convert_charrefs=True)
+        self.limit = limit
+        self.matched = 0
+        self.done = False
+        self._stack: List[Optional[_Anchor]] = []
+        self._tags: List[str] = []
+        self._skip_depth = 0
+        self._links: Dict[int, _Anchor] = {}
+        # 同一段文本可能跨越多个数据块，遇到标签时再整体处理
+        self._pending: List[str] = []
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if self.done:
+            return
+        anchor = None
+        if tag == 'a':
+            href = dict(attrs).get('href') or ''
+            if HREF_PATTERN.search(href) and self.matched < self.limit:
+                anchor = _Anchor(self.matched, href)
+                self._links[anchor.index] = anchor
+                self.matched += 1
+        if tag in VOID_ELEMENTS:
+            return
+        if tag in SKIP_TEXT_ELEMENTS:
+            self._skip_depth += 1
+        self._tags.append(tag)
+        self._stack.append(anchor)
+        self._check_done()
+
+    def handle_startendtag(self, tag, attrs):
+        # <a .../> 自闭合时没有文本，但仍计入数量
+        self.handle_starttag(tag, attrs)
+        if tag not in VOID_ELEMENTS:
+            self.handle_endtag(tag)
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        # 与 BeautifulSoup 相同：弹出到最近的同名标签，没有则忽略
+        if tag not in self._tags:
+            return
+        while self._tags:
+            popped = self._tags.pop()
+            self._stack.pop()
+            if popped in SKIP_TEXT_ELEMENTS:
+                self._skip_depth -= 1
+            if popped == tag:
+                break
+        self._check_done()
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._pending.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def handle_decl(self, decl):
+        self._flush_text()
+
+    def handle_pi(self, data):
+        self._flush_text()
+
+    def close(self):
+        super().close()
+        self._flush_text()
+
+    def _flush_text(self):
+        if not self._pending:
+            return
+        text = ''.join(self._pending).strip()
+        self._pending = []
+        if not text:
+            return
+        for anchor in self._stack:
+            if anchor is not None:
+                anchor.texts.append(text)
+
+    def _check_done(self):
+        """达到上限且所有命中的链接都已闭合时，不再需要后面的内容"""
+        if self.matched >= self.limit and not any(self._stack):
+            self.done = True
+
+    def games(self) -> Dict[str, str]:
+        games = {}
+        for index in sorted(self._links):
+            anchor = self._links[index]
+            if '/com.' not in anchor.href:
+                continue
+            # 从APKPure URL提取包名
+            parts = anchor.href.split('/')
+            if len(parts) >= 3:
+                package_name = parts[2]
+                if package_name.startswith('com.'):
+                    games[package_name] = ''.join(anchor.texts)
+        return games
+
+
+def extract_apkpure_games(source: Union[bytes, Iterable[bytes]], limit: int = 50,
+                          encoding: str = 'utf-8') -> Dict[str, str]:
+    """从整页字节或逐块到达的字节流中提取包名，够数后不再读取剩余内容"""
+    chunks = [source] if isinstance(source, (bytes, bytearray)) else source
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    extractor = ApkpureLinkExtractor(limit)
+    for chunk in chunks:
+        extractor.feed(decoder.decode(chunk))
+        if extractor.done:
+            break
+    else:
+        extractor.feed(decoder.decode(b'', final=True))
+        extractor.close()
+    if hasattr(chunks, 'close'):
+        chunks.close()
+    return extractor.games()
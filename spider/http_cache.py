@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+爬虫HTTP响应缓存
+保存响应内容及其 ETag/Last-Modified，过期后发送条件请求，304 时直接复用上次的解析结果。
+解析结果连同解析器标识一起保存，换了解析后端或参数时不会取到旧的解析结果。
+缓存有有效期，并按最近访问时间做容量上限淘汰。
+"""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'http_cache.sqlite3')
+
+
+class CacheEntry(NamedTuple):
+    url: str
+    body: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    parsed: Optional[Any]
+    # 生成 parsed 的解析器标识
+    parser: Optional[str]
+    fetched_at: float
+
+
+class HttpCache:
+    def __init__(self, db_path: str = DEFAULT_CACHE_PATH, ttl: float = 6 * 3600,
+                 max_bytes: int = 64 * 1024 * 1024):
+        self.db_path = db_path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        # 抓取在线程池中进行，连接由锁保护
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS http_cache ('
+            ' url TEXT PRIMARY KEY,'
+            ' etag TEXT,'
+            ' last_modified TEXT,'
+            ' body BLOB NOT NULL,'
+            ' parsed TEXT,'
+            ' size INTEGER NOT NULL,'
+            ' fetched_at REAL NOT NULL,'
+            ' accessed_at REAL NOT NULL,'
+            ' parser TEXT)'
+        )
+        columns = {row[1] for row in self._conn.execute('PRAGMA table_info(http_cache)')}
+        if 'parser' not in columns:
+            # 旧版缓存没有记录解析器，已有的解析结果无从判断来源，全部作废
+            self._conn.execute('ALTER TABLE http_cache ADD COLUMN parser TEXT')
+            self._conn.execute('UPDATE http_cache SET parsed = NULL')
+        self._conn.commit()
+
+    def get(self, url: str) -> Optional[CacheEntry]:
+        with self._lock:
+            row = self._conn.execute(
+                'SELECT body, etag, last_modified, parsed, parser, fetched_at FROM http_cache WHERE url = ?', (url,)
+            ).fetchone()
+            if row is None:
+                return None
+            self._conn.execute('UPDATE http_cache SET accessed_at = ? WHERE url = ?', (time.time(), url))
+            self._conn.commit()
+        parsed = json.loads(row[3]) if row[3] is not None else None
+        return CacheEntry(url, row[0], row[1], row[2], parsed, row[4], row[5])
+
+    def is_fresh(self, entry: CacheEntry) -> bool:
+        """仍在有效期内的条目无需再发请求"""
+        return time.time() - entry.fetched_at < self.ttl
+
+    def conditional_headers(self, entry: Optional[CacheEntry]) -> Dict[str, str]:
+        headers = {}
+        if entry is not None:
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+        return headers
+
+    def store(self, url: str, body: bytes, etag: Optional[str], last_modified: Optional[str]):
+        """保存新响应；旧的解析结果随之失效"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, NULL, ?, ?, ?, NULL)',
+                (url, etag, last_modified, body, len(body), now, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def store_parsed(self, url: str, parsed: Any, parser: str):
+        """保存解析结果，覆盖其他解析器的结果"""
+        with self._lock:
+            self._conn.execute('UPDATE http_cache SET parsed = ?, parser = ? WHERE url = ?',
+                               (json.dumps(parsed, ensure_ascii=False), parser, url))
+            self._conn.commit()
+
+    def touch(self, url: str):
+        """304 说明内容未变，重新计算有效期"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute('UPDATE http_cache SET fetched_at = ?, accessed_at = ? WHERE url = ?', (now, now, url))
+            self._conn.commit()
+
+    def _evict(self):
+        """按最近访问时间淘汰，直到总大小不超过上限"""
+        total = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM http_cache').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self._conn.execute('SELECT url, size FROM http_cache ORDER BY accessed_at ASC').fetchall()
+        for url, size in rows[:-1]:
+            self._conn.execute('DELETE FROM http_cache WHERE url = ?', (url,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
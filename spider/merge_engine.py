@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多来源合并
+各来源（内置列表、APKPure、榜单、扫描结果）的记录分批流式写入 SQLite，按键去重，
+记录每个键来自哪些来源、首次和最近一次出现的时间。同一个键在不同来源名字不同时，
+按来源优先级决定使用哪个名字，而不是后写入的覆盖先写入的。
+最后只输出规则文件还匹配不到的条目。
+"""
+
+import os
+import sqlite3
+import sys
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import CompiledRuleMatcher
+from rules.rule_parser import load_rules
+
+DEFAULT_DB_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'merge_store.sqlite3')
+
+# 数字越小优先级越高：人工整理的列表最可信，扫描结果次之，爬取的榜单名字可能带宣传后缀，
+# 设备清单里的名字常常缺失或是本地化的应用标签
+SOURCE_PRIORITY = {
+    'known': 0,
+    'scanner': 10,
+    'apkpure': 20,
+    'charts': 30,
+    'bulk': 40,
+}
+DEFAULT_PRIORITY = 100
+BATCH_SIZE = 5000
+
+
+class MergeStore:
+    def __init__(self, db_path: str = DEFAULT_DB_PATH, case_insensitive: bool = False,
+                 priorities: Optional[Dict[str, int]] = None):
+        self.db_path = db_path
+        self.case_insensitive = case_insensitive
+        self.priorities = priorities or SOURCE_PRIORITY
+        self._conn = sqlite3.connect(db_path)
+        if db_path != ':memory:':
+            self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(
+            'CREATE TABLE IF NOT EXISTS packages ('
+            ' key TEXT PRIMARY KEY,'
+            ' package_id TEXT NOT NULL,'
+            ' name TEXT NOT NULL,'
+            ' name_source TEXT NOT NULL,'
+            ' name_rank INTEGER NOT NULL,'
+            ' first_seen REAL NOT NULL,'
+            ' last_seen REAL NOT NULL);'
+            'CREATE TABLE IF NOT EXISTS provenance ('
+            ' key TEXT NOT NULL,'
+            ' source TEXT NOT NULL,'
+            ' name TEXT NOT NULL,'
+            ' first_seen REAL NOT NULL,'
+            ' last_seen REAL NOT NULL,'
+            ' seen_count INTEGER NOT NULL,'
+            ' PRIMARY KEY (key, source));'
+        )
+        self._conn.commit()
+
+    def _key(self, package_id: str) -> str:
+        return package_id.casefold() if self.case_insensitive else package_id
+
+    def ingest(self, source: str, records: Iterable[Tuple[str, str]], now: Optional[float] = None) -> int:
+        """分批写入一个来源的 (包名, 游戏名)，返回写入的记录数"""
+        now = time.time() if now is None else now
+        rank = self.priorities.get(source, DEFAULT_PRIORITY)
+        count = 0
+        batch: List[Tuple[str, str, str]] = []
+        for package_id, name in records:
+            package_id = package_id.strip()
+            if not package_id:
+                continue
+            batch.append((self._key(package_id), package_id, (name or '').strip()))
+            if len(batch) >= BATCH_SIZE:
+                self._write_batch(source, rank, batch, now)
+                count += len(batch)
+                batch = []
+        if batch:
+            self._write_batch(source, rank, batch, now)
+            count += len(batch)
+        return count
+
+    def _write_batch(self, source: str, rank: int, batch: List[Tuple[str, str, str]], now: float):
+        with self._conn:
+            self._conn.executemany(
+                'INSERT INTO provenance VALUES (?, ?, ?, ?, ?, 1) '
+                'ON CONFLICT(key, source) DO UPDATE SET'
+                ' name = CASE WHEN excluded.name != \'\' THEN excluded.name ELSE provenance.name END,'
+                ' last_seen = excluded.last_seen,'
+                ' seen_count = provenance.seen_count + 1',
+                ((key, source, name, now, now) for key, _, name in batch),
+            )
+            # 优先级更高的来源覆盖名字；优先级相同时来源名较小的胜出；同一来源更新自己的名字。
+            # 不同来源之间的结果因此与写入顺序无关
+            wins = ('excluded.name != \'\' AND (excluded.name_rank < packages.name_rank'
+                    ' OR (excluded.name_rank = packages.name_rank AND excluded.name_source < packages.name_source)'
+                    ' OR packages.name = \'\')')
+            self._conn.executemany(
+                'INSERT INTO packages VALUES (?, ?, ?, ?, ?, ?, ?) '
+                'ON CONFLICT(key) DO UPDATE SET'
+                ' last_seen = excluded.last_seen,'
+                f' name = CASE WHEN {wins} OR (excluded.name != \'\' AND excluded.name_source = packages.name_source)'
+                '   THEN excluded.name ELSE packages.name END,'
+                f' name_source = CASE WHEN {wins} THEN excluded.name_source ELSE packages.name_source END,'
+                f' name_rank = CASE WHEN {wins} THEN excluded.name_rank ELSE packages.name_rank END',
+                ((key, package_id, name, source, rank, now, now) for key, package_id, name in batch),
+            )
+
+    def __len__(self) -> int:
+        return self._conn.execute('SELECT COUNT(*) FROM packages').fetchone()[0]
+
+    def iter_games(self) -> Iterator[Tuple[str, str]]:
+        """按首次写入顺序产出 (包名, 游戏名)"""
+        yield from self._conn.execute('SELECT package_id, name FROM packages ORDER BY rowid')
+
+    def games(self) -> Dict[str, str]:
+        return dict(self.iter_games())
+
+    def provenance(self, package_id: str) -> List[Dict]:
+        rows = self._conn.execute(
+            'SELECT source, name, first_seen, last_seen, seen_count FROM provenance WHERE key = ? ORDER BY first_seen, source',
+            (self._key(package_id),),
+        )
+        return [dict(zip(('source', 'name', 'first_seen', 'last_seen', 'seen_count'), row)) for row in rows]
+
+    def conflicts(self) -> Iterator[Tuple[str, List[Tuple[str, str]]]]:
+        """各来源给出不同名字的键，产出 (包名, [(来源, 名字), ...])"""
+        rows = self._conn.execute(
+            'SELECT p.package_id, v.source, v.name FROM provenance v JOIN packages p ON p.key = v.key '
+            'WHERE v.key IN (SELECT key FROM provenance WHERE name != \'\' GROUP BY key HAVING COUNT(DISTINCT name) > 1) '
+            'AND v.name != \'\' ORDER BY p.rowid, v.source'
+        )
+        current, names = None, []
+        for package_id, source, name in rows:
+            if package_id != current:
+                if current is not None:
+                    yield current, names
+                current, names = package_id, []
+            names.append((source, name))
+        if current is not None:
+            yield current, names
+
+    def delta(self, yaml_path: str) -> Iterator[Tuple[str, str]]:
+        """产出规则文件还匹配不到的 (包名, 游戏名)，PROCESS-NAME-REGEX 发行商规则已覆盖的也不输出"""
+        matcher = CompiledRuleMatcher(load_rules(yaml_path), ignore_case=self.case_insensitive)
+        for package_id, name in self.iter_games():
+            if matcher.match(name=package_id) is None:
+                yield package_id, name
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> 'MergeStore':
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
@@ -5,43 +5,44 @@
 生成项目的统计信息
 """
 
+import argparse
 import json
-import yaml
 import os
+import sys
 from typing import Dict, List
 
-def read_yaml_rules(file_path: str) -> List[str]:
-    """读取YAML文件中的规则"""
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.instrumentation import add_arguments as add_metrics_arguments, configure as configure_metrics, metrics
+from rules.rule_parser import Rule, load_rules
+
+def read_yaml_rules(file_path: str) -> List[Rule]:
+    """逐行读取规则文件中的规则，保留每条规则所在的分类"""
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            data = yaml.safe_load(f)
-            return data.get('payload', [])
+        with metrics.timer('stats.load'):
+            rules = load_rules(file_path)
+        metrics.count('stats.rules', len(rules))
+        return rules
     except Exception as e:
         print(f"读取 {file_path} 失败: {e}")
         return []
 
-def count_rules(rules: List[str]) -> int:
-    """统计规则数量（排除注释行）"""
-    count = 0
-    for rule in rules:
-        if isinstance(rule, str) and rule.strip().startswith('- PROCESS-NAME,'):
-            count += 1
-    return count
+def count_rules(rules: List[Rule]) -> int:
+    """统计 PROCESS-NAME 规则数量（注释掉的规则不计）"""
+    return sum(1 for rule in rules if rule.rule_type == 'PROCESS-NAME')
 
-def extract_game_categories(rules: List[str]) -> Dict[str, int]:
-    """从规则中提取游戏分类统计"""
+def extract_game_categories(rules: List[Rule]) -> Dict[str, int]:
+    """按所在分类统计 PROCESS-NAME 规则，不属于“xx类游戏”分类的归入“其他”"""
     categories = {}
-    current_category = "其他"
     
-    for rule in rules:
-        if isinstance(rule, str):
-            rule = rule.strip()
-            if rule.startswith('#') and '类游戏' in rule:
-                current_category = rule.replace('#', '').strip()
-                if current_category not in categories:
-                    categories[current_category] = 0
-            elif rule.startswith('- PROCESS-NAME,'):
-                categories[current_category] = categories.get(current_category, 0) + 1
+    with metrics.timer('stats.categorize'):
+        for rule in rules:
+            if rule.rule_type != 'PROCESS-NAME':
+                continue
+            category = rule.section if rule.section and '类游戏' in rule.section else "其他"
+            categories[category] = categories.get(category, 0) + 1
     
     return categories
 
@@ -51,7 +52,7 @@ def generate_stats():
     print("=" * 50)
     
     # Android游戏统计
-    android_rules = read_yaml_rules('f:/code/game-process-rules/android.yaml')
+    android_rules = read_yaml_rules(os.path.join(ROOT_DIR, 'android.yaml'))
     android_count = count_rules(android_rules)
     android_categories = extract_game_categories(android_rules)
     
@@ -64,7 +65,7 @@ def generate_stats():
                 print(f"   - {category}: {count} 个")
     
     # Windows游戏统计
-    windows_rules = read_yaml_rules('f:/code/game-process-rules/windows.yaml')
+    windows_rules = read_yaml_rules(os.path.join(ROOT_DIR, 'windows.yaml'))
     windows_count = count_rules(windows_rules)
     windows_categories = extract_game_categories(windows_rules)
     
@@ -82,8 +83,8 @@ def generate_stats():
     
     # 检查数据库文件
     database_files = [
-        'f:/code/game-process-rules/spider/games_database.json',
-        'f:/code/game-process-rules/spider/windows_games_database.json'
+        os.path.join(ROOT_DIR, 'spider', 'games_database.json'),
+        os.path.join(ROOT_DIR, 'spider', 'windows_games_database.json')
     ]
     
     print(f"\n📁 数据库文件:")
@@ -109,7 +110,7 @@ def generate_stats():
     
     print(f"\n📄 项目文件:")
     for file in project_files:
-        full_path = f'f:/code/game-process-rules/{file}'
+        full_path = os.path.join(ROOT_DIR, file)
         if os.path.exists(full_path):
             size = os.path.getsize(full_path)
             size_kb = size / 1024
@@ -118,4 +119,7 @@ def generate_stats():
             print(f"   - {file}: 文件不存在")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='生成规则集统计信息')
+    add_metrics_arguments(parser)
+    configure_metrics(parser.parse_args())
     generate_stats()
@@ -7,8 +7,17 @@ Windows游戏进程名收集器
 
 import json
 import logging
+import os
+import sys
 from typing import Dict, List
 
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_index import export_payload
+from rules.rule_document import DEFAULT_SECTION, RuleDocument
+
 # 设置日志
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
@@ -156,16 +165,19 @@ class WindowsGameCollector:
         }
     
     def generate_yaml_rules(self, games: Dict[str, str]) -> str:
-        """生成YAML格式的Windows游戏规则"""
-        rules = ["payload:"]
-        
+        """生成YAML格式的Windows游戏规则（进程名忽略大小写去重）"""
         # 按游戏名称排序
-        sorted_games = sorted(games.items(), key=lambda x: x[1])
+        sorted_games = dict(sorted(games.items(), key=lambda x: x[1]))
         
-        for process_name, game_name in sorted_games:
-            rules.append(f"- PROCESS-NAME,{process_name} #{game_name}")
-        
-        return "\n".join(rules)
+        return export_payload(sorted_games, case_insensitive=True)
+    
+    def update_rule_file(self, yaml_path: str, games: Dict[str, str], section_title: str = DEFAULT_SECTION) -> List[str]:
+        """把规则文件中还没有的进程名加入指定分类，其余分类和注释保持不变"""
+        doc = RuleDocument.load(yaml_path, case_insensitive=True)
+        added = doc.merge_names(games, section_title)
+        doc.save()
+        logger.info(f"向 {yaml_path} 的 {section_title} 添加了 {len(added)} 条规则")
+        return added
     
     def save_to_json(self, games: Dict[str, str], filename: str):
         """保存游戏列表到JSON文件"""
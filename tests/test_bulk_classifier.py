@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'spider')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import bulk_classifier
+from bulk_classifier import TopK, classify_chunk, derive_prefixes, regex_publishers, score_package
+from rules.rule_parser import Rule
+
+
+def _rule(rule_type, value, line_no=1):
+    return Rule(rule_type, value, '', line_no)
+
+
+def test_derive_prefixes_counts_every_inner_prefix():
+    prefixes = derive_prefixes(['com.tencent.tmgp.sgame', 'com.tencent.tmgp.pubgmhd', 'com.Supercell.clash'])
+    assert prefixes == {'com.tencent.': 2, 'com.tencent.tmgp.': 2, 'com.supercell.': 1}
+    assert derive_prefixes(['com.tencent.tmgp.sgame', 'com.tencent.tmgp.pubgmhd', 'com.foo.bar'], 2) == \
+        {'com.tencent.': 2, 'com.tencent.tmgp.': 2}
+
+
+def test_vendor_prefix_alone_does_not_score():
+    prefixes = derive_prefixes(['com.tencent.tmgp.sgame', 'com.tencent.tmgp.pubgmhd'])
+    assert score_package('com.tencent.mm', prefixes) == (0, '')
+    assert score_package('com.tencent.tmgp.newone', prefixes) == (4, 'com.tencent.tmgp.')
+    assert score_package('com.tencent.minigames', prefixes) == (3, 'com.tencent.')
+    assert score_package('org.example.app', prefixes) == (0, '')
+
+
+def test_publisher_regex_literals_seed_scores():
+    rules = [_rule('PROCESS-NAME-REGEX', '.*\\.supercell\\.'), _rule('PROCESS-NAME-REGEX', '.*\\.garena\\.game\\.'),
+             _rule('PROCESS-NAME', 'com.foo.bar')]
+    publishers = regex_publishers(rules)
+    assert publishers == {'supercell', 'garena'}
+    assert score_package('com.garena.gamecenter', {}, publishers) == (3, 'com.garena.')
+    assert score_package('com.garena', {}, publishers) == (0, '')
+
+
+def test_classify_chunk_drops_ids_the_rules_already_match():
+    rules = [_rule('PROCESS-NAME-REGEX', '.*\\.supercell\\.', 1), _rule('PROCESS-NAME', 'com.tencent.tmgp.sgame', 2)]
+    bulk_classifier._init_worker(derive_prefixes(['com.tencent.tmgp.sgame']), regex_publishers(rules),
+                                 set(), rules)
+    lines = ['com.supercell.newgame\n', 'com.tencent.tmgp.sgame\n', 'com.tencent.mm\n', 'com.tencent.tmgp.x\n']
+    rows, hits = classify_chunk('text', None, lines)
+    assert rows == 4
+    assert set(hits) == {'com.tencent.tmgp.x'}
+
+
+def test_topk_prune_keeps_heaviest_and_records_floor():
+    topk = TopK(capacity=2)
+    topk.merge({'a.b': [5, 1, 5, '', 'a.'], 'c.d': [3, 1, 3, '', 'c.'], 'e.f': [1, 1, 1, '', 'e.']})
+    assert len(topk) == 3 and topk.floor == 0
+    topk.merge({'g.h': [2, 1, 2, '', 'g.'], 'i.j': [4, 1, 4, '', 'i.']})
+    assert len(topk) == 2
+    assert topk.floor == 3
+    assert [c.package_id for c in topk.top(5)] == ['a.b', 'i.j']
+    topk.merge({'a.b': [1, 2, 5, 'A', 'a.']})
+    first = topk.top(1)[0]
+    assert (first.weight, first.rows, first.name) == (6, 3, 'A')
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+import http.client
+import json
+import os
+import sys
+import threading
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from monitor.classify_daemon import MAX_BATCH, ClassifyHTTPServer, Classifier, RuleSet
+
+WINDOWS = ('payload:\n'
+           '# === Windows热门游戏进程名 ===\n'
+           '- PROCESS-NAME,Banner.exe\n'
+           '# 射击类游戏\n'
+           '- PROCESS-NAME,TslGame.exe #绝地求生\n'
+           '- PROCESS-PATH-REGEX,.*\\\\steamapps\\\\common\\\\.*\n')
+
+
+def _write(path, text, mtime_ns):
+    path.write_text(text, encoding='utf-8')
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+@pytest.fixture
+def rule_file(tmp_path):
+    path = tmp_path / 'windows.yaml'
+    _write(path, WINDOWS, 1_000_000_000)
+    return path
+
+
+@pytest.fixture
+def classifier(rule_file):
+    return Classifier({'windows': RuleSet(str(rule_file), ignore_case=True, check_interval=0)})
+
+
+@pytest.fixture
+def post(classifier):
+    server = ClassifyHTTPServer(('127.0.0.1', 0), classifier)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def send(body, headers=None):
+        conn = http.client.HTTPConnection('127.0.0.1', server.server_address[1], timeout=5)
+        conn.putrequest('POST', '/classify')
+        headers = {'Content-Length': str(len(body)), **(headers or {})}
+        for key, value in headers.items():
+            conn.putheader(key, value)
+        conn.endheaders()
+        conn.send(body)
+        response = conn.getresponse()
+        payload = json.loads(response.read())
+        conn.close()
+        return response.status, payload
+
+    yield send
+    server.shutdown()
+    server.server_close()
+
+
+def test_classify_returns_rule_and_category(classifier):
+    results = classifier.classify('windows', ['tslgame.EXE', {'path': 'D:\\steamapps\\common\\x\\x.exe'},
+                                              'Banner.exe', 'explorer.exe'])
+    assert results[0]['match']['value'] == 'TslGame.exe'
+    assert results[0]['match']['category'] == '射击类游戏'
+    assert results[1]['match']['type'] == 'PROCESS-PATH-REGEX'
+    assert results[2]['match']['category'] is None
+    assert results[3]['match'] is None
+
+
+@pytest.mark.parametrize('platform, queries', [
+    ('linux', ['a.exe']),
+    (['windows'], ['a.exe']),
+    ('windows', [1]),
+    ('windows', [{'name': 1}]),
+    ('windows', [{}]),
+])
+def test_classify_rejects_invalid_input(classifier, platform, queries):
+    with pytest.raises(ValueError):
+        classifier.classify(platform, queries)
+
+
+@pytest.mark.parametrize('body, headers', [
+    (b'{"queries": []}', {'Content-Length': 'abc'}),
+    (b'', {}),
+    (b'[1, 2]', {}),
+    (b'{"queries": ', {}),
+    (json.dumps({'queries': ['a.exe'] * (MAX_BATCH + 1)}).encode(), {}),
+    (b'{"queries": "a.exe"}', {}),
+    (b'{"queries": [["a.exe"]]}', {}),
+    (b'{"platform": "linux", "queries": ["a.exe"]}', {}),
+    (b'{"platform": ["windows"], "queries": ["a.exe"]}', {}),
+])
+def test_handler_answers_bad_requests_with_400(post, classifier, body, headers):
+    status, payload = post(body, headers)
+    assert status == 400 and payload['error']
+    assert classifier.metrics.errors == 1
+
+
+def test_handler_classifies_batch(post):
+    status, payload = post(json.dumps({'queries': ['TslGame.exe', 'explorer.exe']}).encode())
+    assert status == 200
+    assert [r['match'] and r['match']['value'] for r in payload['results']] == ['TslGame.exe', None]
+
+
+def test_reloads_when_mtime_changes_and_keeps_rules_on_bad_reload(rule_file, classifier):
+    rule_set = classifier.rule_sets['windows']
+    assert classifier.classify('windows', ['New.exe'])[0]['match'] is None
+
+    _write(rule_file, WINDOWS + '- PROCESS-NAME,New.exe\n', 2_000_000_000)
+    assert classifier.classify('windows', ['New.exe'])[0]['match']['value'] == 'New.exe'
+    assert rule_set.reloads == 1
+
+    _write(rule_file, 'payload:\n- PROCESS-NAME-REGEX,(unclosed\n', 3_000_000_000)
+    assert classifier.classify('windows', ['New.exe'])[0]['match']['value'] == 'New.exe'
+    assert (rule_set.reloads, rule_set.failed_reloads) == (1, 1)
@@ -0,0 +1,141 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'spider')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from fetcher import Fetcher
+from http_cache import HttpCache
+
+
+class StandIn:
+    """本机 HTTP 替身：按路径返回预设的状态码序列，记录请求和同时处理的最大请求数"""
+
+    def __init__(self):
+        self.statuses = {}
+        self.delay = 0.0
+        self.etag = '"v1"'
+        self.requests = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                stand_in.handle(self)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def url(self, path: str) -> str:
+        return f'http://127.0.0.1:{self.server.server_port}{path}'
+
+    def handle(self, handler: BaseHTTPRequestHandler):
+        with self._lock:
+            self.requests.append((handler.path, dict(handler.headers)))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+            queue = self.statuses.get(handler.path)
+            status = queue.pop(0) if queue else 200
+        try:
+            if status == 200 and handler.headers.get('If-None-Match') == self.etag:
+                status = 304
+            body = b'' if status == 304 else b'<a href="/cn/com.example.game">Example</a>' * 64
+            handler.send_response(status)
+            handler.send_header('ETag', self.etag)
+            handler.send_header('Content-Length', str(len(body)))
+            handler.end_headers()
+            handler.wfile.flush()
+            # 响应头之后再等待，模拟较慢的响应体传输
+            time.sleep(self.delay)
+            handler.wfile.write(body)
+        finally:
+            with self._lock:
+                self.active -= 1
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stand_in():
+    server = StandIn()
+    yield server
+    server.close()
+
+
+def _parse(content):
+    if not isinstance(content, (bytes, bytearray)):
+        content = b''.join(content)
+    return {'size': len(content)}
+
+
+def test_retries_transient_status_with_backoff(stand_in):
+    stand_in.statuses['/flaky'] = [503, 502]
+    fetcher = Fetcher(retries=2, backoff=0.05)
+    start = time.monotonic()
+    response = fetcher.fetch(stand_in.url('/flaky'))
+    assert response.status_code == 200
+    assert [path for path, _ in stand_in.requests] == ['/flaky'] * 3
+    # 两次退避：0.05 + 0.1 秒起
+    assert time.monotonic() - start >= 0.15
+
+
+def test_gives_up_after_retries_and_releases_slot(stand_in):
+    stand_in.statuses['/down'] = [503] * 3
+    fetcher = Fetcher(retries=2, backoff=0.01, per_host_limit=1)
+    assert fetcher.fetch(stand_in.url('/down'), stream=True) is None
+    # 重试中的响应都已关闭，名额归还后同一主机的下一个请求不会阻塞
+    page = fetcher.fetch_page(stand_in.url('/ok'), parse=_parse)
+    assert page is not None and page.parsed['size'] > 0
+
+
+def test_conditional_request_reuses_cache_on_304(stand_in, tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'), ttl=0)
+    fetcher = Fetcher(cache=cache)
+    first = fetcher.fetch_page(stand_in.url('/page'), parse=_parse)
+    second = fetcher.fetch_page(stand_in.url('/page'), parse=_parse)
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.parsed == first.parsed
+    assert stand_in.requests[1][1].get('If-None-Match') == '"v1"'
+    cache.close()
+
+
+def test_per_host_limit_covers_body_transfer(stand_in):
+    stand_in.delay = 0.2
+    fetcher = Fetcher(max_workers=6, per_host_limit=2)
+    pages = fetcher.fetch_pages([stand_in.url(f'/p{i}') for i in range(6)], parse=_parse)
+    assert all(page is not None and page.parsed['size'] > 0 for page in pages.values())
+    assert stand_in.max_active <= 2
+
+
+def test_cached_parse_is_keyed_by_parser(stand_in, tmp_path):
+    cache = HttpCache(str(tmp_path / 'cache.sqlite3'))
+    fetcher = Fetcher(cache=cache)
+    url = stand_in.url('/page')
+    first = fetcher.fetch_page(url, parse=_parse, parser_key='size')
+    other = fetcher.fetch_page(url, parse=lambda content: {'other': True}, parser_key='other')
+    again = fetcher.fetch_page(url, parse=lambda content: {'other': True}, parser_key='other')
+    assert other.from_cache and other.parsed == {'other': True}
+    assert again.parsed == {'other': True}
+    assert fetcher.fetch_page(url, parse=_parse, parser_key='size').parsed == first.parsed
+    assert len(stand_in.requests) == 1
+    cache.close()
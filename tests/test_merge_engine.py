@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'spider')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+from merge_engine import MergeStore
+
+
+def _merged_name(order):
+    with MergeStore(':memory:') as store:
+        for source, name in order:
+            store.ingest(source, [('com.example.game', name)])
+        return store.games()['com.example.game']
+
+
+def test_equal_rank_sources_do_not_depend_on_ingest_order():
+    assert _merged_name([('one', 'One'), ('two', 'Two')]) == 'One'
+    assert _merged_name([('two', 'Two'), ('one', 'One')]) == 'One'
+
+
+def test_higher_priority_source_wins_and_same_source_updates():
+    assert _merged_name([('known', 'Known'), ('apkpure', 'Scraped')]) == 'Known'
+    assert _merged_name([('apkpure', 'Scraped'), ('known', 'Known')]) == 'Known'
+    assert _merged_name([('apkpure', ''), ('bulk', 'Label')]) == 'Label'
+    assert _merged_name([('apkpure', 'Old'), ('apkpure', 'New')]) == 'New'
+
+
+def test_delta_skips_ids_covered_by_name_regex(tmp_path):
+    yaml_path = tmp_path / 'android.yaml'
+    yaml_path.write_text('payload:\n'
+                         '- PROCESS-NAME,com.known.game #Known\n'
+                         '- PROCESS-NAME-REGEX,.*\\.supercell\\. # Supercell\n'
+                         '#- PROCESS-NAME-REGEX,.*\\.king\\. # King\n', encoding='utf-8')
+    with MergeStore(':memory:') as store:
+        store.ingest('apkpure', [('com.known.game', 'Known'), ('com.supercell.brandnew', 'New'),
+                                 ('com.King.candy', 'Candy'), ('com.other.game', 'Other')])
+        assert list(store.delta(str(yaml_path))) == [('com.King.candy', 'Candy'), ('com.other.game', 'Other')]
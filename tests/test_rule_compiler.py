@@ -0,0 +1,47 @@
+# -*- coding: utf-8 -*-
+import os
+import re
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_compiler import CompiledRuleMatcher, RuleMatcher, compile_rules, merge_regexes, strip_wildcards
+from rules.rule_parser import Rule
+
+
+def _rule(rule_type, value, line_no=1):
+    return Rule(rule_type, value, '', line_no)
+
+
+def test_strip_wildcards_keeps_quantified_prefix():
+    assert strip_wildcards('.*foo.*') == 'foo'
+    assert strip_wildcards('^.*foo') == 'foo'
+    assert strip_wildcards('.*?foo') == '.*?foo'
+    assert strip_wildcards('^.*+foo') == '^.*+foo'
+    assert strip_wildcards('.*{2}foo') == '.*{2}foo'
+    assert strip_wildcards('foo\\.*') == 'foo\\.*'
+
+
+def test_lazy_wildcard_rule_compiles_and_matches():
+    rules = [_rule('PROCESS-PATH-REGEX', '.*?\\\\Games\\\\.*', 1)]
+    path = 'D:\\Games\\x.exe'
+    assert CompiledRuleMatcher(rules).match(path=path) == rules[0]
+    assert RuleMatcher(rules).match(path=path) == rules[0]
+    for pattern in merge_regexes([rule.value for rule in rules] + ['.*foo']):
+        re.compile(pattern)
+
+
+def test_global_flag_patterns_are_not_merged():
+    patterns = ['.*\\\\Steam\\\\.*', '(?i).*\\\\epic games\\\\.*', '.*\\\\GOG\\\\.*']
+    merged = merge_regexes(patterns)
+    assert merged == ['(?:\\\\Steam\\\\|\\\\GOG\\\\)', '(?i).*\\\\epic games\\\\.*']
+    for pattern in merged:
+        re.compile(pattern)
+
+    rules = [_rule('PROCESS-PATH-REGEX', pattern, i) for i, pattern in enumerate(patterns, 1)]
+    lines = compile_rules(rules)
+    assert '- PROCESS-PATH-REGEX,(?i).*\\\\epic games\\\\.*' in lines
+    matcher = CompiledRuleMatcher(rules, ignore_case=False)
+    assert matcher.match(path='C:\\Epic Games\\x.exe') == rules[1]
@@ -0,0 +1,72 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+import pytest
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+import rules.rule_document as rule_document
+from rules.rule_document import RuleDocument
+
+SAMPLE = ('payload:\n'
+          '# 射击类游戏\n'
+          '- PROCESS-NAME,TslGame.exe #绝地求生\n'
+          '#- PROCESS-NAME,Old.exe # 已下架\n'
+          '\n'
+          '# 其他热门游戏\n'
+          '- PROCESS-NAME,Foo.exe #Foo\n')
+
+
+@pytest.fixture
+def rule_file(tmp_path):
+    path = tmp_path / 'windows.yaml'
+    path.write_text(SAMPLE, encoding='utf-8')
+    return path
+
+
+def test_merge_into_existing_section_keeps_other_lines(rule_file):
+    doc = RuleDocument.load(str(rule_file), case_insensitive=True)
+    assert doc.merge_names({'cs2.exe': 'CS2'}, '射击类游戏') == ['cs2.exe']
+    assert doc.save()
+    assert rule_file.read_text(encoding='utf-8') == SAMPLE.replace(
+        '#绝地求生\n', '#绝地求生\n- PROCESS-NAME,cs2.exe #CS2\n')
+
+
+def test_merge_into_new_section_appends_it(rule_file):
+    doc = RuleDocument.load(str(rule_file), case_insensitive=True)
+    doc.merge_names({'Bar.exe': '自动扫描添加'}, '自动扫描添加')
+    doc.save()
+    assert rule_file.read_text(encoding='utf-8') == SAMPLE + '\n# 自动扫描添加\n- PROCESS-NAME,Bar.exe #自动扫描添加\n'
+    assert RuleDocument.load(str(rule_file)).titles() == [None, '射击类游戏', '其他热门游戏', '自动扫描添加']
+
+
+def test_case_insensitive_dedupe_and_commented_rules(rule_file):
+    doc = RuleDocument.load(str(rule_file), case_insensitive=True)
+    # 被注释掉的规则不算已存在
+    assert doc.merge_names({'tslgame.EXE': 'dup', 'FOO.exe': 'dup', 'Old.exe': '恢复'}) == ['Old.exe']
+    assert ('PROCESS-NAME', 'old.exe') in doc
+    exact = RuleDocument.load(str(rule_file), case_insensitive=False)
+    assert exact.merge_names({'tslgame.EXE': 'x'}) == ['tslgame.EXE']
+
+
+def test_unchanged_document_is_not_written(rule_file):
+    doc = RuleDocument.load(str(rule_file), case_insensitive=True)
+    assert doc.merge_names({'Foo.exe': 'Foo'}) == []
+    assert not doc.save()
+
+
+def test_failed_replace_leaves_file_and_no_temp(rule_file, monkeypatch):
+    doc = RuleDocument.load(str(rule_file), case_insensitive=True)
+    doc.merge_names({'Bar.exe': 'Bar'})
+
+    def fail(src, dst):
+        raise OSError('replace failed')
+    monkeypatch.setattr(rule_document.os, 'replace', fail)
+    with pytest.raises(OSError):
+        doc.save()
+    assert rule_file.read_text(encoding='utf-8') == SAMPLE
+    assert os.listdir(rule_file.parent) == ['windows.yaml']
+    assert doc.dirty
@@ -0,0 +1,24 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_index import RuleIndex, export_payload, find_duplicate_lines
+
+
+def test_export_payload_dedupes_by_platform_case_rules():
+    games = {'Game.exe': 'A', 'game.EXE': 'B', 'com.Foo': 'C', 'com.foo': 'D'}
+    assert export_payload(games, case_insensitive=True).splitlines() == \
+        ['payload:', '- PROCESS-NAME,Game.exe #A', '- PROCESS-NAME,com.Foo #C']
+    assert export_payload(games, case_insensitive=False).count('\n') == 4
+
+
+def test_find_duplicate_lines_keeps_first_occurrence():
+    lines = ['payload:\n', '- PROCESS-NAME,Game.exe #A\n', '#- PROCESS-NAME,game.exe\n', '- PROCESS-NAME,GAME.exe\n']
+    assert find_duplicate_lines(lines, case_insensitive=True) == [3]
+    assert find_duplicate_lines(lines, case_insensitive=False) == []
+    index = RuleIndex.for_windows(['Game.exe', 'GAME.EXE'])
+    assert len(index) == 1 and 'game.exe' in index and index.canonical('GAME.exe') == 'Game.exe'
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import os
+import sys
+from collections import Counter
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from rules.rule_order import attribute_hits, expected_cost, optimize_order, replay_cost
+from rules.rule_parser import Rule
+
+
+def _rule(rule_type, value, line_no):
+    return Rule(rule_type, value, '', line_no)
+
+
+def test_duplicate_rules_are_counted_once():
+    rules = [_rule('PROCESS-NAME', 'a.exe', 1), _rule('PROCESS-NAME', 'a.exe', 2)]
+    hits = attribute_hits(rules, Counter({'a.exe': 4}), ignore_case=True)
+    assert hits == Counter({('PROCESS-NAME', 'a.exe'): 4})
+    assert expected_cost(rules, hits) == 1.0
+
+
+def test_cost_after_reordering_replays_first_match():
+    regex = _rule('PROCESS-NAME-REGEX', '^game', 1)
+    exact = _rule('PROCESS-NAME', 'game.exe', 2)
+    other = _rule('PROCESS-NAME', 'other.exe', 3)
+    rules = [regex, exact, other]
+    queries = Counter({'game.exe': 10, 'other.exe': 30})
+    hits = attribute_hits(rules, queries, ignore_case=True)
+    # 原顺序下 game.exe 全部记在正则上，exact 从未命中
+    assert hits[('PROCESS-NAME', 'game.exe')] == 0
+    ordered = optimize_order(rules, hits)
+    assert ordered == [other, regex, exact]
+    assert replay_cost(rules, queries, ignore_case=True) == expected_cost(rules, hits) == (10 * 5 + 30 * 7) / 40
+    assert replay_cost(ordered, queries, ignore_case=True) == (10 * 6 + 30 * 1) / 40
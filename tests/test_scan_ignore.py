@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+import ntpath
+import os
+import sys
+import types
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+for path in (ROOT_DIR, os.path.join(ROOT_DIR, 'scanner')):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import scan_ignore
+from scan_ignore import IgnoreMatcher, containing_root
+
+
+def test_skips_event_only_checks_the_containing_root(tmp_path):
+    games = str(tmp_path / 'Games')
+    steam = str(tmp_path / 'Steam')
+    ignore = IgnoreMatcher.default()
+    redist = os.path.join(steam, 'Foo', '_CommonRedist', 'vc.exe')
+    game = os.path.join(games, 'Bar', 'Bar.exe')
+    assert containing_root([games, steam], redist) == steam
+    assert ignore.skips_event([games, steam], redist)
+    assert not ignore.skips_event([games, steam], game)
+    assert not ignore.skips_event([games], redist)
+
+
+def test_roots_on_other_drives_are_not_an_error(monkeypatch):
+    monkeypatch.setattr(scan_ignore, 'os', types.SimpleNamespace(path=ntpath, sep='\\'))
+    roots = ['D:\\Games', 'E:\\SteamLibrary']
+    ignore = IgnoreMatcher.default()
+    redist = 'E:\\SteamLibrary\\steamapps\\common\\Foo\\_CommonRedist\\vc.exe'
+    assert containing_root(roots, redist) == 'E:\\SteamLibrary'
+    assert ignore.skips_event(roots, redist)
+    assert not ignore.skips_event(roots, 'E:\\SteamLibrary\\steamapps\\common\\Foo\\Foo.exe')
+    assert not ignore.skips_path('D:\\Games', redist)
+    assert not ignore.skips_event(roots, 'F:\\Other\\_CommonRedist\\vc.exe')